@@ -2,20 +2,30 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-import scipy
-import scipy.stats as stats
-import sklearn
-
-import matplotlib.pyplot as plt
 
 from datetime import datetime
-from scipy.fft import rfft, rfftfreq
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from collections import deque, Counter
+import os
+import glob
+import threading
+import time
+import uuid
+import copy
+import io
+import json
+import logging
+import pickle
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import quote, unquote
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
+from numpy.fft import rfft, rfftfreq
 import math
-from sklearn.metrics.pairwise import cosine_similarity
-from matplotlib import gridspec
-# === Color-coded Future Wave Zones ===
-from matplotlib.collections import LineCollection
 
+from synth import generate_rounds, score_multipliers
+from features import MICRO_BAND, derive_features, frame_chunks, micro_band_peak, write_features
+
+logger = logging.getLogger(__name__)
 
 # Add this at the top after imports
 
@@ -23,9 +33,668 @@ from matplotlib.collections import LineCollection
 st.set_page_config(page_title="CYA Quantum Tracker", layout="wide")
 st.title("🔥 CYA MOMENTUM TRACKER: Phase 1 + 2 + 3 + 4")
 
+# On-disk archive of historical fractal windows, shared by every session
+PATTERN_INDEX_DIR = os.environ.get("CYA_PATTERN_INDEX_DIR", ".pattern_index")
+# Checkpoints + round journals of shared streams, for undo and warm restarts
+ENGINE_STATE_DIR = os.environ.get("CYA_ENGINE_STATE_DIR", ".engine_state")
+# Rounds each shared stream keeps at full resolution, fixed when its engine is
+# created; older rounds are rolled into summary buckets
+HISTORY_RETENTION = int(os.environ.get("CYA_HISTORY_RETENTION", 5000))
+# Local JSON signal API for execution tooling (loopback only)
+SIGNAL_API_HOST = "127.0.0.1"
+SIGNAL_API_PORT = 8765
+
+# matplotlib is only needed once a chart panel renders; importing it up front
+# costs more than the rest of the startup path combined.
+def get_plt():
+    import matplotlib.pyplot as plt
+    return plt
+
+def get_alt():
+    import altair as alt
+    return alt
+
+def cosine_sim(a, b):
+    """Cosine similarity of two vectors (0 when either is all zeros)."""
+    a = np.asarray(a, dtype=float)
+    b = np.asarray(b, dtype=float)
+    denom = np.linalg.norm(a) * np.linalg.norm(b)
+    return float(a @ b / denom) if denom > 0 else 0.0
+
+def shannon_entropy(p):
+    """Natural-log entropy of a distribution, normalised like scipy.stats.entropy."""
+    p = np.asarray(p, dtype=float)
+    p = p / p.sum()
+    p = p[p > 0]
+    return float(-np.sum(p * np.log(p)))
+
+def score_round(mult, pink_threshold):
+    return int(score_multipliers(mult, pink_threshold))
+
+def parse_periods(text):
+    """Pinned periods from "10, 24.5" (cycle lengths of at least 2 rounds)."""
+    periods = []
+    for part in text.replace(";", ",").split(","):
+        try:
+            period = float(part)
+        except ValueError:
+            continue
+        if period >= 2:
+            periods.append(period)
+    return tuple(sorted(set(periods)))
+
+# ================ SHARED STREAM ENGINE ===================
+class RoundHistory:
+    """Fixed-size ring buffer of recent rounds plus aggregate tiers for older ones.
+
+    The newest ``capacity`` rounds are kept at full resolution. A round pushed
+    out of the ring is folded into a bucket of ``bucket_size`` rounds (P/p/B
+    counts, MSI min/max/mean). When a tier holds more than ``max_buckets``
+    buckets its oldest ``fanout`` are merged into one bucket of the next tier;
+    the last tier merges its two oldest. Memory therefore stays bounded by
+    ``capacity + num_tiers * max_buckets`` however long the stream runs.
+    """
+
+    def __init__(self, capacity=5000, msi_window=20, bucket_size=50, fanout=10,
+                 max_buckets=200, num_tiers=3):
+        self.capacity = capacity
+        self.msi_window = msi_window
+        self.bucket_size = bucket_size
+        self.fanout = fanout
+        self.max_buckets = max_buckets
+        self.timestamps = np.zeros(capacity, dtype="datetime64[ns]")
+        self.multipliers = np.zeros(capacity)
+        self.scores = np.zeros(capacity)
+        self.msi = np.full(capacity, np.nan)
+        self.head = 0
+        self.size = 0
+        self.total = 0
+        self.recent_scores = deque(maxlen=msi_window)
+        self.tiers = [deque() for _ in range(num_tiers)]
+        self.open_bucket = None
+
+    @property
+    def start(self):
+        """Absolute index of the oldest round still held at full resolution."""
+        return self.total - self.size
+
+    def append(self, timestamp, multiplier, score):
+        self.recent_scores.append(score)
+        msi = sum(self.recent_scores) if len(self.recent_scores) == self.msi_window else np.nan
+        if self.size == self.capacity:
+            self._archive(self.timestamps[self.head], self.scores[self.head], self.msi[self.head])
+        else:
+            self.size += 1
+        self.timestamps[self.head] = np.datetime64(pd.Timestamp(timestamp), "ns")
+        self.multipliers[self.head] = multiplier
+        self.scores[self.head] = score
+        self.msi[self.head] = msi
+        self.head = (self.head + 1) % self.capacity
+        self.total += 1
+
+    def extend(self, timestamps, multipliers, scores):
+        """Vectorized ``append`` of many rounds (bulk loads, synthetic streams)."""
+        scores = np.asarray(scores, dtype=float)
+        n = len(scores)
+        if not n:
+            return
+        timestamps = np.asarray(pd.to_datetime(pd.Series(timestamps)), dtype="datetime64[ns]")
+        multipliers = np.asarray(multipliers, dtype=float)
+
+        # MSI carries on from the scores already in the rolling window
+        prev = np.array(self.recent_scores, dtype=float)
+        csum = np.concatenate([[0.0], np.cumsum(np.concatenate([prev, scores]))])
+        ends = len(prev) + 1 + np.arange(n)
+        msi = csum[ends] - csum[np.maximum(ends - self.msi_window, 0)]
+        msi[ends < self.msi_window] = np.nan
+        self.recent_scores.extend(scores[-self.msi_window:])
+
+        order = self._order()
+        merged = [np.concatenate([arr[order], new]) for arr, new in
+                  ((self.timestamps, timestamps), (self.multipliers, multipliers), (self.scores, scores),
+                   (self.msi, msi))]
+        overflow = max(len(merged[2]) - self.capacity, 0)
+        if overflow:
+            self._archive_many(merged[0][:overflow], merged[2][:overflow], merged[3][:overflow])
+        self.size = len(merged[2]) - overflow
+        for arr, values in zip((self.timestamps, self.multipliers, self.scores, self.msi), merged):
+            arr[:self.size] = values[overflow:]
+        self.head = self.size % self.capacity
+        self.total += n
+
+    def pop(self, n=1):
+        """Drop the newest ``n`` rounds; only rounds still in the ring can be undone."""
+        n = min(n, self.size)
+        self.head = (self.head - n) % self.capacity
+        self.size -= n
+        self.total -= n
+        self.recent_scores = deque(self.scores[self._order()[-self.msi_window:]], maxlen=self.msi_window)
+        return n
+
+    def resize(self, capacity):
+        if capacity == self.capacity:
+            return
+        order = self._order()
+        keep = order[-capacity:]
+        drop = order[:len(order) - len(keep)]
+        self._archive_many(self.timestamps[drop], self.scores[drop], self.msi[drop])
+        self.timestamps, self.multipliers, self.scores, self.msi = (
+            np.concatenate([arr[keep], np.full(capacity - len(keep), fill, dtype=arr.dtype)])
+            for arr, fill in ((self.timestamps, np.datetime64("NaT")), (self.multipliers, 0),
+                              (self.scores, 0), (self.msi, np.nan)))
+        self.capacity = capacity
+        self.size = len(keep)
+        self.head = self.size % capacity
+
+    def _order(self):
+        return (self.head - self.size + np.arange(self.size)) % self.capacity
+
+    def _archive(self, ts, score, msi):
+        b = self.open_bucket
+        if b is None:
+            b = self.open_bucket = {"start": ts, "end": ts, "rounds": 0, "pink": 0, "purple": 0, "blue": 0,
+                                    "msi_min": np.inf, "msi_max": -np.inf, "msi_sum": 0.0, "msi_count": 0}
+        b["end"] = ts
+        b["rounds"] += 1
+        b["pink" if score >= 2 else ("purple" if score > 0 else "blue")] += 1
+        if not np.isnan(msi):
+            b["msi_min"] = min(b["msi_min"], msi)
+            b["msi_max"] = max(b["msi_max"], msi)
+            b["msi_sum"] += msi
+            b["msi_count"] += 1
+        if b["rounds"] == self.bucket_size:
+            self.open_bucket = None
+            self._push(0, b)
+
+    def _archive_many(self, timestamps, scores, msi):
+        """``_archive`` for a run of rounds; whole buckets are aggregated with array ops."""
+        n = len(scores)
+        i = min(n, self.bucket_size - self.open_bucket["rounds"]) if self.open_bucket is not None else 0
+        for j in range(i):
+            self._archive(timestamps[j], scores[j], msi[j])
+        full = (n - i) // self.bucket_size * self.bucket_size
+        if full:
+            s = scores[i:i + full].reshape(-1, self.bucket_size)
+            m = msi[i:i + full].reshape(-1, self.bucket_size)
+            t = timestamps[i:i + full].reshape(-1, self.bucket_size)
+            valid = ~np.isnan(m)
+            pink = (s >= 2).sum(axis=1)
+            purple = ((s > 0) & (s < 2)).sum(axis=1)
+            msi_min = np.where(valid, m, np.inf).min(axis=1)
+            msi_max = np.where(valid, m, -np.inf).max(axis=1)
+            msi_sum = np.where(valid, m, 0.0).sum(axis=1)
+            msi_count = valid.sum(axis=1)
+            for k in range(len(s)):
+                self._push(0, {"start": t[k, 0], "end": t[k, -1], "rounds": self.bucket_size,
+                               "pink": int(pink[k]), "purple": int(purple[k]),
+                               "blue": self.bucket_size - int(pink[k]) - int(purple[k]),
+                               "msi_min": msi_min[k], "msi_max": msi_max[k],
+                               "msi_sum": msi_sum[k], "msi_count": int(msi_count[k])})
+        for j in range(i + full, n):
+            self._archive(timestamps[j], scores[j], msi[j])
+
+    @staticmethod
+    def _merge(buckets):
+        return {
+            "start": buckets[0]["start"], "end": buckets[-1]["end"],
+            **{k: sum(b[k] for b in buckets) for k in ("rounds", "pink", "purple", "blue", "msi_sum", "msi_count")},
+            "msi_min": min(b["msi_min"] for b in buckets),
+            "msi_max": max(b["msi_max"] for b in buckets),
+        }
+
+    def _push(self, level, bucket):
+        tier = self.tiers[level]
+        tier.append(bucket)
+        if len(tier) <= self.max_buckets:
+            return
+        if level + 1 < len(self.tiers):
+            self._push(level + 1, self._merge([tier.popleft() for _ in range(self.fanout)]))
+        else:
+            tier.appendleft(self._merge([tier.popleft(), tier.popleft()]))
+
+    def frame(self):
+        order = self._order()
+        return pd.DataFrame({
+            "timestamp": self.timestamps[order],
+            "multiplier": self.multipliers[order],
+            "score": self.scores[order],
+        })
+
+    def archive_frame(self):
+        """All archived buckets, oldest first, including the partially filled one."""
+        buckets = [dict(b, tier=level) for level in reversed(range(len(self.tiers))) for b in self.tiers[level]]
+        if self.open_bucket is not None:
+            buckets.append(dict(self.open_bucket, tier=-1))
+        archive = pd.DataFrame(buckets)
+        if not archive.empty:
+            with np.errstate(invalid="ignore", divide="ignore"):
+                archive["msi_mean"] = archive["msi_sum"] / archive["msi_count"]
+            archive[["msi_min", "msi_max"]] = archive[["msi_min", "msi_max"]].replace([np.inf, -np.inf], np.nan)
+        return archive
+
+
+# One fixed-size record per appended round; replayed on top of the last checkpoint
+JOURNAL_DTYPE = np.dtype([("index", "<i8"), ("timestamp", "<i8"), ("multiplier", "<f8"), ("score", "<f8")])
+
+
+class StatePickler(pickle.Pickler):
+    """Pickles this script's classes by name.
+
+    Streamlit runs app.py as a script rather than an importable module, so
+    plain pickle cannot find the classes again; they are resolved from the
+    script's globals instead.
+    """
+
+    def persistent_id(self, obj):
+        if isinstance(obj, type) and obj.__module__ == __name__:
+            return ("class", obj.__qualname__)
+        return None
+
+
+class StateUnpickler(pickle.Unpickler):
+    def persistent_load(self, pid):
+        return globals()[pid[1]]
+
+
+def dump_state(obj):
+    buf = io.BytesIO()
+    StatePickler(buf, pickle.HIGHEST_PROTOCOL).dump(obj)
+    return buf.getvalue()
+
+
+def load_state(data):
+    return StateUnpickler(io.BytesIO(data)).load()
+
+
+def load_trackers(saved):
+    """Tracker store of an unpacked checkpoint; each tracker is its own pickle."""
+    return {name: load_state(tracker) if isinstance(tracker, bytes) else tracker
+            for name, tracker in saved["trackers"].items()}
+
+
+def state_paths(state_dir, stream_id):
+    base = os.path.join(state_dir, quote(stream_id, safe=""))
+    return base + ".ckpt", base + ".journal"
+
+
+class StreamEngine:
+    """One round history and one set of derived results per stream.
+
+    Sessions watching the same stream share an engine, so ``analyze_data`` and
+    the streaming trackers run once per new round instead of once per viewer.
+    Appends are serialised by ``lock``; a single computation runs at a time
+    under ``compute_lock``, and readers that find it busy get the last
+    published results instead of waiting.
+
+    Every ``checkpoint_every`` rounds the history and all tracker state are
+    pickled into an in-memory checkpoint, so ``undo`` only replays the rounds
+    after the newest checkpoint. With a ``state_dir`` the checkpoint is also
+    written to disk and every appended round goes to a journal, so a restarted
+    process picks the stream up where it left off. The large append-only
+    trackers hand out copy-on-write views (``checkpoint_view``). Those views
+    are pickled and written by a background worker, so a checkpoint holds
+    ``compute_lock`` only for the small trackers. Each tracker is stored
+    as its own pickle.
+    """
+
+    def __init__(self, stream_id=None, rounds=None, retention=5000, state_dir=None, checkpoint_every=25):
+        self.stream_id = stream_id
+        self.lock = threading.Lock()
+        self.compute_lock = threading.Lock()
+        self.history = RoundHistory(retention)
+        frame = pd.DataFrame(list(rounds or []), columns=["timestamp", "multiplier", "score"])
+        self.history.extend(frame["timestamp"], frame["multiplier"], frame["score"])
+        self.checkpoint_every = checkpoint_every
+        self.checkpoints = deque(maxlen=4)
+        self.checkpoint_total = self.history.total
+        self.state_paths = state_paths(state_dir, stream_id) if state_dir and stream_id else None
+        self.write_lock = threading.Lock()
+        self.state_generation = 0
+        self.written_generation = 0
+        # Bumped whenever undo/load swap the trackers, so stale background checkpoints are dropped
+        self.epoch = 0
+        self.checkpoint_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint")
+        self.version = 0
+        self.published = {}
+        self.trackers = {}
+        self.subscribers = {}
+        self.last_compute = None
+        self.refresh_job = None
+        self.refreshing = False
+        self.signals_cond = threading.Condition()
+        self.signals_version = -1
+        self.signals_json = b"null"
+        if self.state_paths:
+            os.makedirs(state_dir, exist_ok=True)
+            self._restore()
+            self.history.resize(retention)
+
+    def append(self, round_):
+        with self.lock:
+            self.history.append(round_["timestamp"], round_["multiplier"], round_["score"])
+            self.version += 1
+            if self.state_paths:
+                record = np.array([(self.history.total - 1, pd.Timestamp(round_["timestamp"]).value,
+                                    round_["multiplier"], round_["score"])], dtype=JOURNAL_DTYPE)
+                with open(self.state_paths[1], "ab") as f:
+                    record.tofile(f)
+
+    def undo(self, n=1):
+        """Drop the newest ``n`` rounds, rolling the trackers back to the newest checkpoint before them.
+
+        The trackers then replay only the rounds after that checkpoint on the
+        next computation. The on-disk pattern index cannot forget windows, so
+        its progress offsets are kept as they are. On disk the same checkpoint
+        is written back, with the rounds after it journaled from the ring.
+        """
+        with self.compute_lock, self.lock:
+            n = self.history.pop(n)
+            if not n:
+                return 0
+            total = self.history.total
+            while self.checkpoints and self.checkpoints[-1][0] > total:
+                self.checkpoints.pop()
+            kept = {key: self.trackers[key] for key in ("pattern_indexed", "archive_from") if key in self.trackers}
+            self.trackers = load_trackers(load_state(self.checkpoints[-1][1])) if self.checkpoints else {}
+            self.epoch += 1
+            self.trackers.update(kept)
+            self.checkpoint_total = self.checkpoints[-1][0] if self.checkpoints else 0
+            self.version += 1
+            self.published = {}
+            if self.state_paths:
+                if self.checkpoints and self.checkpoint_total >= self.history.start:
+                    # Only drop journal records the checkpoint covers once it is on disk
+                    self._journal_history(self.checkpoint_total)
+                    self.state_generation += 1
+                    packed = (self.state_generation, *self.checkpoints[-1])
+                else:
+                    # No usable checkpoint: the trackers are empty and rebuild from this history
+                    self._rewrite_journal(lambda index: index < total)
+                    packed = self._pack_state(total, dump_state(self.history))
+        if self.state_paths:
+            self._write_state(packed, lambda index: index >= packed[1])
+        return n
+
+    def replace(self, rounds):
+        self.load(pd.DataFrame(list(rounds), columns=["timestamp", "multiplier", "score"]))
+
+    def replace_tail(self, n, rounds):
+        """Swap the newest ``n`` rounds for ``rounds``, keeping the history and checkpoints before them."""
+        self.undo(n)
+        for round_ in rounds:
+            self.append(round_)
+
+    def load(self, frame, archive=True):
+        """Swap in a whole new history from a timestamp/multiplier/score frame.
+
+        With ``archive=False`` (synthetic rounds) none of the loaded rounds go
+        into the cross-session pattern index; rounds appended later still do.
+        """
+        history = RoundHistory(self.history.capacity, self.history.msi_window)
+        history.extend(frame["timestamp"], frame["multiplier"], frame["score"])
+        with self.compute_lock, self.lock:
+            self.history = history
+            self.version += 1
+            self.published = {}
+            self.trackers = {} if archive else {"archive_from": history.total}
+            self.epoch += 1
+            self.checkpoints.clear()
+            self.checkpoint_total = 0
+            if self.state_paths:
+                self._rewrite_journal(lambda index: np.zeros(len(index), dtype=bool))
+                packed = self._pack_state(history.total, dump_state(history))
+        if self.state_paths:
+            self._write_state(packed, lambda index: index >= history.total)
+
+    def set_retention(self, capacity):
+        if capacity == self.history.capacity:
+            return
+        with self.lock:
+            self.history.resize(capacity)
+            self.version += 1
+
+    def invalidate(self):
+        with self.lock:
+            self.published = {}
+
+    def snapshot(self):
+        """Current version plus a copy of the ring (``frame``), its absolute ``start`` and the archive."""
+        with self.lock:
+            return self.version, self._view()
+
+    def _view(self):
+        history = self.history
+        return {"start": history.start, "frame": history.frame(), "archive": history.archive_frame(),
+                "capacity": history.capacity}
+
+    def subscribe(self, session_id, ttl=60):
+        """Mark a session as watching; returns how many sessions watched in the last ``ttl`` s."""
+        now = time.time()
+        with self.lock:
+            self.subscribers[session_id] = now
+            self.subscribers = {sid: t for sid, t in self.subscribers.items() if now - t < ttl}
+            return len(self.subscribers)
+
+    def results(self, key, compute):
+        """Latest ``compute(snapshot, trackers)`` output for ``key`` without waiting on another session.
+
+        Only the computation holding ``compute_lock`` gets the shared tracker
+        store; a session that finds nothing published yet while another one is
+        computing rebuilds its trackers in a scratch store that is thrown away.
+        """
+        self.last_compute = (key, compute)
+        cached = self.published.get(key)
+        if cached is not None and cached[0] == self.version:
+            return cached[1]
+        if self.compute_lock.acquire(blocking=False):
+            try:
+                return self._compute(key, compute)
+            finally:
+                self.compute_lock.release()
+        if cached is not None:
+            return cached[1]
+        # Nothing published yet and another session is computing: work on a private copy
+        return compute(self.snapshot()[1], {"scratch": True})
+
+
+    def _compute(self, key, compute):
+        # Caller holds compute_lock
+        with self.lock:
+            version, snapshot = self.version, self._view()
+            total = self.history.total
+            # Trackers will have consumed exactly this history once compute() returns
+            history_state = (dump_state(self.history)
+                             if total - self.checkpoint_total >= self.checkpoint_every else None)
+        result = compute(snapshot, self.trackers)
+        if history_state is not None:
+            self.checkpoint_total = total
+            self.checkpoint_pool.submit(self._checkpoint, self.epoch, total, history_state, self._freeze_trackers())
+        self.published[key] = (version, result)
+        if result is not None and "signals" in result:
+            result["signals"].add_done_callback(
+                lambda f: f.exception() is None and self.publish_signals(version, f.result()))
+        return result
+
+    def _freeze_trackers(self):
+        # Caller holds compute_lock: the small trackers are pickled now, the big ones only viewed
+        return {name: tracker.checkpoint_view() if hasattr(tracker, "checkpoint_view") else dump_state(tracker)
+                for name, tracker in self.trackers.items()}
+
+    @staticmethod
+    def _encode_state(total, history_state, frozen):
+        return dump_state({"total": total, "history": history_state, "trackers": {
+            name: tracker if isinstance(tracker, bytes) else dump_state(tracker) for name, tracker in frozen.items()}})
+
+    def _pack_state(self, total, history_state):
+        # Caller holds compute_lock and lock
+        state = self._encode_state(total, history_state, self._freeze_trackers())
+        self.checkpoints.append((total, state))
+        self.checkpoint_total = total
+        self.state_generation += 1
+        return self.state_generation, total, state
+
+    def _checkpoint(self, epoch, total, history_state, frozen):
+        # Checkpoint worker: the views stay valid while the next computations run
+        state = self._encode_state(total, history_state, frozen)
+        with self.lock:
+            if epoch != self.epoch:
+                return
+            self.checkpoints.append((total, state))
+            self.state_generation += 1
+            packed = self.state_generation, total, state
+        if self.state_paths:
+            self._write_state(packed, lambda index: index >= total)
+
+    def _write_state(self, packed, keep):
+        """Atomically replace the on-disk checkpoint, then drop journal records it covers."""
+        generation, total, state = packed
+        ckpt_path = self.state_paths[0]
+        with self.write_lock:
+            if generation <= self.written_generation:
+                return
+            with open(ckpt_path + ".tmp", "wb") as f:
+                f.write(state)
+            os.replace(ckpt_path + ".tmp", ckpt_path)
+            self.written_generation = generation
+            with self.lock:
+                self._rewrite_journal(keep)
+
+    def _rewrite_journal(self, keep):
+        # Caller holds lock
+        journal_path = self.state_paths[1]
+        if os.path.exists(journal_path):
+            journal = np.fromfile(journal_path, dtype=JOURNAL_DTYPE)
+            journal[keep(journal["index"])].tofile(journal_path + ".tmp")
+            os.replace(journal_path + ".tmp", journal_path)
+
+    def _journal_history(self, first):
+        """Replace the journal with the ring's rounds from absolute index ``first`` on. Caller holds lock."""
+        frame = self.history.frame().iloc[first - self.history.start:]
+        journal = np.empty(len(frame), dtype=JOURNAL_DTYPE)
+        journal["index"] = np.arange(first, first + len(frame))
+        journal["timestamp"] = pd.to_datetime(frame["timestamp"]).to_numpy(dtype="datetime64[ns]").view(np.int64)
+        journal["multiplier"] = frame["multiplier"].to_numpy()
+        journal["score"] = frame["score"].to_numpy()
+        journal_path = self.state_paths[1]
+        journal.tofile(journal_path + ".tmp")
+        os.replace(journal_path + ".tmp", journal_path)
+
+    def _restore(self):
+        """Load the last checkpoint and replay the journal after it (no-op for a new stream)."""
+        ckpt_path, journal_path = self.state_paths
+        trackers, state = {}, None
+        try:
+            with open(ckpt_path, "rb") as f:
+                state = f.read()
+            saved = load_state(state)
+            history, trackers = load_state(saved["history"]), load_trackers(saved)
+            self.checkpoints.append((saved["total"], state))
+        except FileNotFoundError:
+            history = self.history
+        except (OSError, pickle.UnpicklingError, EOFError, KeyError, AttributeError) as exc:
+            logger.warning("Ignoring unreadable checkpoint %s: %s", ckpt_path, exc)
+            history = self.history
+        if os.path.exists(journal_path):
+            journal = np.fromfile(journal_path, dtype=JOURNAL_DTYPE)
+            journal = journal[journal["index"] >= history.total]
+            # Only a gap-free run continuing the checkpoint can be replayed
+            run = np.flatnonzero(journal["index"] != history.total + np.arange(len(journal)))
+            journal = journal[:run[0]] if len(run) else journal
+            history.extend(pd.to_datetime(journal["timestamp"]), journal["multiplier"], journal["score"])
+        self.history = history
+        self.trackers = trackers
+        self.checkpoint_total = self.checkpoints[-1][0] if self.checkpoints else 0
+
+    def refresh_async(self, default_compute):
+        """Bring results up to date in the background, e.g. after an API append with no browser open."""
+        with self.lock:
+            self.refresh_job = self.last_compute or default_compute
+            if self.refreshing:
+                return
+            self.refreshing = True
+        threading.Thread(target=self._refresh_loop, daemon=True).start()
+
+    def _refresh_loop(self):
+        failed_version = None
+        try:
+            while True:
+                with self.lock:
+                    key, compute = self.refresh_job
+                    cached = self.published.get(key)
+                    # Retrying a history that just failed would fail the same way; wait for the next round
+                    if (cached is not None and cached[0] == self.version) or failed_version == self.version:
+                        self.refreshing = False
+                        return
+                    version = self.version
+                with self.compute_lock:
+                    try:
+                        self._compute(key, compute)
+                    except Exception:
+                        logger.exception("Background refresh of stream %r failed", self.stream_id)
+                        failed_version = version
+        except BaseException:
+            with self.lock:
+                self.refreshing = False
+            raise
+
+    def publish_signals(self, version, signals):
+        body = json.dumps(signals, default=json_default).encode()
+        with self.signals_cond:
+            if version < self.signals_version:
+                return
+            self.signals_version = version
+            self.signals_json = body
+            self.signals_cond.notify_all()
+
+    def wait_signals(self, after_version, timeout=15):
+        with self.signals_cond:
+            self.signals_cond.wait_for(lambda: self.signals_version != after_version, timeout)
+            return self.signals_version, self.signals_json
+
+
+def json_default(obj):
+    if isinstance(obj, (np.integer, np.floating, np.bool_)):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, (pd.Timestamp, datetime)):
+        return obj.isoformat()
+    return str(obj)
+
+
+class StreamRegistry:
+    def __init__(self, state_dir=None):
+        self.lock = threading.Lock()
+        self.engines = {}
+        self.state_dir = state_dir
+
+    def get(self, stream_id, create=False):
+        """Engine for ``stream_id``; streams saved by an earlier process are always brought back."""
+        with self.lock:
+            engine = self.engines.get(stream_id)
+            if engine is None and (create or self.saved(stream_id)):
+                engine = self.engines[stream_id] = StreamEngine(stream_id, retention=HISTORY_RETENTION,
+                                                                state_dir=self.state_dir)
+            return engine
+
+    def saved(self, stream_id):
+        return bool(self.state_dir) and any(os.path.exists(p) for p in state_paths(self.state_dir, stream_id))
+
+    def ids(self):
+        with self.lock:
+            return list(self.engines)
+
+
+@st.cache_resource(show_spinner=False)
+def get_stream_registry():
+    return StreamRegistry(ENGINE_STATE_DIR)
+
+def get_stream_engine(stream_id):
+    return get_stream_registry().get(stream_id, create=True)
+
 # ================ SESSION STATE INIT =====================
-if "roundsc" not in st.session_state:
-    st.session_state.roundsc = []
+if "engine" not in st.session_state:
+    st.session_state.engine = StreamEngine(retention=HISTORY_RETENTION)
 if "ga_pattern" not in st.session_state:
     st.session_state.ga_pattern = None
 if "forecast_msi" not in st.session_state:
@@ -39,6 +708,10 @@ with st.sidebar:
     st.header("⚙️ QUANTUM PARAMETERS")
     WINDOW_SIZE = st.slider("MSI Window Size", 5, 100, 20)
     PINK_THRESHOLD = st.number_input("Pink Threshold", value=10.0)
+    NUM_HARMONICS = st.slider("🎼 Resonance Harmonics", 1, 48, 5,
+                              help="FFT components used by the Harmonic Round Predictor")
+    PINNED_PERIODS = parse_periods(st.text_input("📌 Pinned Periods (rounds)", value="",
+                                                 help="Comma-separated cycle lengths the resonator bank tracks every round"))
     STRICT_RTT = st.checkbox("Strict RTT Mode", value=False)
 
     st.header("📊 PANEL TOGGLES")
@@ -48,32 +721,63 @@ with st.sidebar:
     show_rqcf = st.checkbox("🔮 RQCF Panel", value=True)
     show_fpm = st.checkbox("🧬 FPM Panel", value=True)
     show_anchor = st.checkbox("🔗 Fractal Anchor", value=True)
+    show_spectrogram = st.checkbox("📈 Cycle Drift Spectrogram", value=True)
+    show_sweep = st.checkbox("🧪 Parameter Sweep", value=False)
+    CLIENT_CHARTS = st.checkbox("📉 Client-Side Charts", value=False,
+                                help="Draw MSI, THRE, Cos Phase and Anchor charts in the browser from decimated data")
+
+    st.header("📡 SHARED STREAM")
+    STREAM_ID = st.text_input("Stream ID", value="",
+                              help="Sessions with the same ID share one history and one analysis").strip()
+    engine = get_stream_engine(STREAM_ID) if STREAM_ID else st.session_state.engine
+    ctx = get_script_run_ctx()
+    if STREAM_ID and ctx is not None:
+        st.caption(f"👥 {engine.subscribe(ctx.session_id)} session(s) watching `{engine.stream_id}`")
+    if STREAM_ID:
+        # Shared by every viewer, so not adjustable from one session
+        st.caption(f"🗄️ History retention: {engine.history.capacity:,} rounds")
+    else:
+        engine.set_retention(int(st.number_input(
+            "🗄️ History Retention (rounds)", min_value=100, max_value=50000, value=HISTORY_RETENTION, step=500,
+            help="Rounds kept at full resolution; older ones are rolled into summary buckets")))
     
     if st.button("🔄 Full Reset", help="Clear all historical data"):
-        st.session_state.roundsc = []
+        engine.replace([])
+        st.rerun()
+    if st.button("↩️ Undo Last Round", help="Remove the most recent round"):
+        engine.undo(1)
         st.rerun()
         
     # 🔥 Clear cached functions (wave features, FFTs, BBs)
     if st.button("🧹 Clear Cache", help="Force harmonic + MSI recalculation"):
         st.cache_data.clear()  # 💡 Streamlit’s built-in cache clearer
+        engine.invalidate()
         st.success("Cache cleared — recalculations will run fresh.")
+
+    with st.expander("🧪 Synthetic History"):
+        synth_rounds = st.number_input("Rounds", min_value=100, max_value=5_000_000, value=10_000, step=1000)
+        synth_seed = st.number_input("Seed", min_value=0, value=7, step=1)
+        synth_regime_len = st.number_input("Mean regime length (rounds)", min_value=0, value=200, step=50,
+                                           help="0 keeps a single regime")
+        if st.button("🎲 Load Synthetic Rounds", help="Replace this stream's history with a generated one"):
+            engine.load(generate_rounds(int(synth_rounds), seed=int(synth_seed),
+                                        mean_regime_length=synth_regime_len, pink_threshold=PINK_THRESHOLD),
+                        archive=False)
+            st.rerun()
         
 # =================== ROUND ENTRY ========================
 st.subheader("Manual Round Entry")
 mult = st.number_input("Enter round multiplier", min_value=0.01, step=0.01)
 
 if st.button("➕ Add Round"):
-    score = 2 if mult >= PINK_THRESHOLD else (1 if mult >= 2.0 else -1)
-    st.session_state.roundsc.append({
+    score = score_round(mult, PINK_THRESHOLD)
+    engine.append({
         "timestamp": datetime.now(),
         "multiplier": mult,
         "score": score
     })
 
 
-# =================== CONVERT TO DATAFRAME ================
-df = pd.DataFrame(st.session_state.roundsc)
-
 def rrqi(df, window=30):
     recent = df.tail(window)
     blues = len(recent[recent['type'] == 'Blue'])
@@ -103,13 +807,6 @@ def compute_tpi(df, window=10):
     decay = calculate_blue_decay(df, window)
     return round(pressure - decay, 2)
 
-def bollinger_bands(series, window, num_std=2):
-    rolling_mean = series.rolling(window).mean()
-    rolling_std = series.rolling(window).std()
-    upper_band = rolling_mean + num_std * rolling_std
-    lower_band = rolling_mean - num_std * rolling_std
-    return rolling_mean, upper_band, lower_band
-
 # === Phase Tracker & Harmonic Channel Assistant ===
 
 def detect_dominant_cycle(scores):
@@ -119,6 +816,10 @@ def detect_dominant_cycle(scores):
     T = 1
     yf = rfft(scores - np.mean(scores))
     xf = rfftfreq(N, T)
+    return dominant_cycle_of(xf, yf)
+
+def dominant_cycle_of(xf, yf):
+    """Period of the strongest non-DC bin of an ``rfft`` spectrum."""
     dominant_freq = xf[np.argmax(np.abs(yf[1:])) + 1]
     if dominant_freq == 0:
         return None
@@ -139,10 +840,322 @@ def get_phase_label(position, cycle_length):
     else:
         return "End Phase", pct
 
-def decision_hud_panel(dominant_phase, dominant_pct, micro_phase, micro_pct,
-                       resonance_score, fractal_match_type=None, anchor_forecast_type=None):
+# === Streaming Spectrogram & Cycle Drift Tracker ===
+
+class StreamingSpectrogram:
+    """Short-time Fourier transform over the score stream, one column per round.
+
+    Only the last ``nperseg`` scores and the last ``max_columns`` columns are
+    kept, so memory stays bounded however long the session runs.
+    """
+
+    def __init__(self, nperseg=32, max_columns=256, micro_band=(0.08, 0.15)):
+        self.nperseg = nperseg
+        self.freqs = rfftfreq(nperseg, 1)
+        self.taper = np.hanning(nperseg)
+        self.micro_mask = (self.freqs > micro_band[0]) & (self.freqs < micro_band[1])
+        self.segment = deque(maxlen=nperseg)
+        self.columns = deque(maxlen=max_columns)
+        self.dominant_periods = deque(maxlen=max_columns)
+        self.micro_periods = deque(maxlen=max_columns)
+        self.hop_rounds = deque(maxlen=max_columns)
+        self.n_seen = 0
+        self.completed_cycles = 0
+        self.cycle_progress = 0.0
+
+    def update(self, score):
+        self.segment.append(score)
+        self.n_seen += 1
+        if len(self.segment) < self.nperseg:
+            return
+        seg = np.asarray(self.segment, dtype=float)
+        mag = np.abs(rfft((seg - seg.mean()) * self.taper))
+        dom_idx = np.argmax(mag[1:]) + 1
+        dom_period = 1 / self.freqs[dom_idx]
+        if np.any(self.micro_mask):
+            micro_freqs = self.freqs[self.micro_mask]
+            micro_period = 1 / micro_freqs[np.argmax(mag[self.micro_mask])]
+        else:
+            micro_period = np.nan
+        self.columns.append(mag)
+        self.dominant_periods.append(dom_period)
+        self.micro_periods.append(micro_period)
+        self.hop_rounds.append(self.n_seen)
+
+        # Each hop advances the dominant wave by 1/period of a full cycle
+        self.cycle_progress += 1 / dom_period
+        if self.cycle_progress >= 1:
+            self.completed_cycles += int(self.cycle_progress)
+            self.cycle_progress %= 1
+
+    def extend(self, scores):
+        for s in scores:
+            self.update(s)
+
+    def drift_frame(self):
+        return pd.DataFrame({
+            "round": list(self.hop_rounds),
+            "dominant_period": list(self.dominant_periods),
+            "micro_period": list(self.micro_periods),
+        })
+
+
+def sync_spectrogram(store, scores, start=0):
+    """Feed only the rounds the stream spectrogram has not seen yet.
+
+    ``start`` is the absolute round number of ``scores[0]``.
+    """
+    spec = store.get("spectrogram")
+    if spec is None or not start <= spec.n_seen <= start + len(scores):
+        spec = StreamingSpectrogram()
+        spec.n_seen = start
+        store["spectrogram"] = spec
+    spec.extend(scores[spec.n_seen - start:])
+    return spec
+
+
+def spectrogram_panel(spec):
+    st.subheader("📈 Cycle Drift Spectrogram")
+    if not spec.columns:
+        st.warning(f"Need at least {spec.nperseg} rounds to build the spectrogram.")
+        return
+
+    drift = spec.drift_frame()
+    plt = get_plt()
+    fig, ax = plt.subplots(2, 1, figsize=(12, 6), sharex=True)
+    ax[0].imshow(np.array(spec.columns).T, aspect='auto', origin='lower', cmap='magma',
+                 extent=[drift["round"].iloc[0], drift["round"].iloc[-1], spec.freqs[0], spec.freqs[-1]])
+    ax[0].set_ylabel("Frequency")
+    ax[0].set_title("STFT of Score Stream")
+
+    ax[1].plot(drift["round"], drift["dominant_period"], label="Dominant Period", color='blue')
+    ax[1].plot(drift["round"], drift["micro_period"], label="Micro Period", color='green', linestyle='dashdot')
+    ax[1].set_xlabel("Round")
+    ax[1].set_ylabel("Period (rounds)")
+    ax[1].set_title("Cycle Drift")
+    ax[1].legend()
+    st.pyplot(fig)
+
+    col1, col2, col3 = st.columns(3)
+    with col1: st.metric("Dominant Period (STFT)", f"{drift['dominant_period'].iloc[-1]:.1f} rounds")
+    with col2: st.metric("Micro Period (STFT)", f"{drift['micro_period'].iloc[-1]:.1f} rounds")
+    with col3: st.metric("Completed Cycles", spec.completed_cycles)
+
+
+# === Resonator Filter Bank ===
+class ResonatorBank:
+    """Running DFT of the score window at a fixed set of frequencies, O(#frequencies) per round.
+
+    Each frequency keeps the complex sum of score * exp(-2πi·f·n) over the
+    window, with n the absolute round number: a new round adds its term and a
+    round leaving the window subtracts its own, so amplitude and phase are
+    current after every round without a transform. The head and tail phasors
+    advance by one complex multiply per round, like a Goertzel resonator, and
+    are recomputed exactly every ``RESYNC_EVERY`` rounds so rounding cannot
+    accumulate. The bank covers a grid across the micro band plus any tracked
+    frequencies (dominant cycle, pinned periods), each seeded from the window
+    once when it is first tracked. The grid is as fine as the ``rfft`` bins at
+    the default 5000-round retention. Shorter windows have coarser bins,
+    so the micro peak, and the micro cycle length derived from it, can fall
+    between the bins the old full-transform path picked from.
+
+    Once the window is full (``track_bins``) the bank also tracks every
+    ``rfft`` bin of the window, so ``analyze_data`` gets the dominant cycle
+    without a transform per round.
+    """
+
+    RESYNC_EVERY = 4096
+
+    def __init__(self, micro_band=(0.08, 0.15), resolution=0.0002):
+        count = int(round((micro_band[1] - micro_band[0]) / resolution))
+        self.micro_freqs = micro_band[0] + resolution * np.arange(1, count)
+        self.tracked = []
+        self.bin_freqs = np.empty(0)
+        self.bin_length = 0
+        self.window = deque()
+        self.total = 0.0
+        self.window_start = 0
+        self.n_seen = 0
+        self._set_freqs(self.micro_freqs.copy(), np.zeros(len(self.micro_freqs), dtype=complex))
+
+    def _phasor(self, n, freqs=None):
+        # Reduce f·n mod 1 first so phases stay exact at large round numbers
+        freqs = self.freqs if freqs is None else freqs
+        return np.exp(-2j * np.pi * ((freqs * n) % 1.0))
+
+    def _set_freqs(self, freqs, sums):
+        self.freqs = freqs
+        self.sums = sums
+        self.step = np.exp(-2j * np.pi * freqs)
+        self.head = self._phasor(self.n_seen)
+        self.tail = self._phasor(self.window_start)
+        self.ones = None
+        self.cached = None
+
+    def _sum_terms(self, values, start, freqs, chunk=4096):
+        """Sum of values[m] * exp(-2πi·f·(start + m)) per frequency."""
+        values = np.asarray(values, dtype=float)
+        sums = np.zeros(len(freqs), dtype=complex)
+        for i in range(0, len(values), chunk):
+            n = np.arange(start + i, start + min(i + chunk, len(values)))
+            sums += values[i:i + chunk] @ self._phasor(n[:, None], freqs)
+        return sums
+
+    def _advance(self, phasor, n, values, sign):
+        """Add ``sign * values`` for rounds n, n+1, ... to the sums; returns the phasor of the round after."""
+        if len(values) > 8:
+            self.sums += sign * self._sum_terms(values, n, self.freqs)
+            return self._phasor(n + len(values))
+        for value in values:
+            self.sums += (sign * value) * phasor
+            n += 1
+            phasor = self._phasor(n) if n % self.RESYNC_EVERY == 0 else phasor * self.step
+        return phasor
+
+    def extend(self, scores):
+        scores = np.asarray(scores, dtype=float)
+        if len(scores):
+            self.head = self._advance(self.head, self.n_seen, scores, 1)
+            self.window.extend(scores.tolist())
+            self.total += scores.sum()
+            self.n_seen += len(scores)
+
+    def evict_to(self, start):
+        """Drop rounds before absolute round ``start`` from the window."""
+        count = min(start - self.window_start, len(self.window))
+        if count > 0:
+            old = [self.window.popleft() for _ in range(count)]
+            self.tail = self._advance(self.tail, self.window_start, old, -1)
+            self.total -= sum(old)
+            self.window_start += count
+
+    def track(self, freqs):
+        """Track exactly ``freqs`` besides the micro grid; new ones cost one pass over the window."""
+        freqs = [f for f in dict.fromkeys(float(f) for f in freqs) if 0 < f <= 0.5]
+        if freqs == self.tracked:
+            return
+        fixed = len(self.micro_freqs) + len(self.bin_freqs)
+        kept = dict(zip(self.tracked, self.sums[fixed:]))
+        new = [f for f in freqs if f not in kept]
+        if new:
+            kept.update(zip(new, self._sum_terms(self.window, self.window_start, np.array(new))))
+        self.tracked = freqs
+        self._set_freqs(np.r_[self.micro_freqs, self.bin_freqs, freqs],
+                        np.r_[self.sums[:fixed], np.array([kept[f] for f in freqs], dtype=complex)])
+
+    def track_bins(self, length):
+        """Track every ``rfft`` bin k/length (k >= 1) while the window holds exactly ``length`` rounds.
+
+        The bins are seeded from one ``rfft`` of the window when it fills up
+        and dropped again if its length changes (undo, a smaller retention).
+        """
+        full = length > 1 and len(self.window) == length
+        if full == bool(self.bin_length) and (not full or self.bin_length == length):
+            return
+        m = len(self.micro_freqs)
+        tracked_sums = self.sums[m + len(self.bin_freqs):]
+        if full:
+            bin_freqs = np.arange(1, length // 2 + 1) / length
+            window = np.fromiter(self.window, dtype=float, count=len(self.window))
+            bin_sums = rfft(window)[1:] * self._phasor(self.window_start, bin_freqs)
+        else:
+            bin_freqs, bin_sums = np.empty(0), np.empty(0, dtype=complex)
+        self.bin_freqs, self.bin_length = bin_freqs, length if full else 0
+        self._set_freqs(np.r_[self.micro_freqs, bin_freqs, self.tracked], np.r_[self.sums[:m], bin_sums, tracked_sums])
+
+    def rfft_bins(self):
+        """(xf, yf) as ``rfftfreq`` / ``rfft`` of the mean-removed window; None while the bins are not tracked."""
+        if not self.bin_length or len(self.window) != self.bin_length:
+            return None
+        m = len(self.micro_freqs)
+        return np.r_[0.0, self.bin_freqs], np.r_[0j, self.spectrum()[m:m + len(self.bin_freqs)]]
+
+    def spectrum(self):
+        """Mean-removed DFT of the window at every bank frequency, phased like ``rfft`` of the window."""
+        N = len(self.window)
+        if N == 0:
+            return np.zeros(len(self.freqs), dtype=complex)
+        if self.cached is not None and self.cached[0] == (self.n_seen, self.window_start):
+            return self.cached[1]
+        if self.ones is None or self.ones[0] != N:
+            # sum_{m<N} exp(-2πi·f·m): the DFT of the constant window mean
+            self.ones = (N, (1 - self._phasor(N)) / (1 - self.step))
+        spectrum = np.conj(self.tail) * self.sums - self.total / N * self.ones[1]
+        self.cached = ((self.n_seen, self.window_start), spectrum)
+        return spectrum
+
+    def micro_peak(self):
+        """(frequency, phase, amplitude) of the strongest frequency in the micro band."""
+        spectrum = self.spectrum()[:len(self.micro_freqs)]
+        i = np.argmax(np.abs(spectrum))
+        return float(self.micro_freqs[i]), float(np.angle(spectrum[i])), float(np.abs(spectrum[i]))
+
+    def at(self, freq):
+        """(amplitude, phase) at a tracked frequency."""
+        value = self.spectrum()[len(self.micro_freqs) + len(self.bin_freqs) + self.tracked.index(float(freq))]
+        return float(np.abs(value)), float(np.angle(value))
+
+    def summary(self):
+        spectrum = self.spectrum()
+        m, fixed = len(self.micro_freqs), len(self.micro_freqs) + len(self.bin_freqs)
+        return {
+            "micro": pd.DataFrame({"frequency": self.micro_freqs, "amplitude": np.abs(spectrum[:m])}),
+            "tracked": pd.DataFrame({"frequency": self.tracked, "period": 1 / np.array(self.tracked, dtype=float),
+                                     "amplitude": np.abs(spectrum[fixed:]), "phase": np.angle(spectrum[fixed:])}),
+            "bins": len(self.bin_freqs),
+            "rounds": len(self.window),
+        }
+
+
+def sync_resonator_bank(store, scores, start=0):
+    """Feed new rounds to the stream's resonator bank and drop those that left the window."""
+    bank = store.get("resonators")
+    if bank is None or not start <= bank.n_seen <= start + len(scores) or bank.window_start > start:
+        bank = ResonatorBank()
+        bank.n_seen = bank.window_start = start
+        store["resonators"] = bank
+    bank.extend(scores[bank.n_seen - start:])
+    bank.evict_to(start)
+    return bank
+
+
+def resonator_panel(summary, dominant_freq, micro_freq, pinned_periods):
+    st.subheader("🎚️ Resonator Bank")
+    if not summary["rounds"]:
+        st.info("No rounds in the window yet.")
+        return
+    st.caption(f"Running DFT over the last {summary['rounds']:,} rounds, updated per round "
+               f"({len(summary['micro']) + len(summary['tracked']) + summary['bins']} frequencies"
+               f"{', every rfft bin of the full window' if summary['bins'] else ''})")
+    st.line_chart(summary["micro"].set_index("frequency")["amplitude"])
+    tracked = summary["tracked"].copy()
+    pinned = {round(1 / p, 12) for p in pinned_periods}
+    tracked["source"] = ["📌 Pinned" if round(f, 12) in pinned else "🌊 Dominant" for f in tracked["frequency"]]
+    tracked["phase"] = np.degrees(tracked["phase"]).round(1)
+    st.dataframe(tracked[["source", "period", "frequency", "amplitude", "phase"]], hide_index=True)
+    col1, col2 = st.columns(2)
+    with col1: st.metric("Micro Peak", f"{1 / micro_freq:.1f} rounds" if micro_freq else "N/A")
+    with col2: st.metric("Dominant", f"{1 / dominant_freq:.1f} rounds" if dominant_freq else "N/A")
+
+
+ROUND_TYPE_NAMES = {"P": "Pink", "p": "Purple", "B": "Blue"}
+
+def forecast_round_type(forecast):
+    """"Pink" / "Purple" / "Blue" for the first round of a forecast ("P-B-p", "P B p", a list, or a name)."""
+    if forecast is None or len(forecast) == 0:
+        return None
+    if isinstance(forecast, str):
+        if forecast in ROUND_TYPE_NAMES.values():
+            return forecast
+        forecast = forecast.replace("-", " ").split()
+    return ROUND_TYPE_NAMES.get(forecast[0])
+
+def hud_signal(dominant_phase, micro_phase, resonance_score,
+               fractal_match_type=None, anchor_forecast_type=None):
     score = 0
     reasons = []
+    fractal_match_type = forecast_round_type(fractal_match_type)
+    anchor_forecast_type = forecast_round_type(anchor_forecast_type)
     
     if dominant_phase in ["Ascent Phase", "Peak Phase"]:
         score += 1
@@ -185,6 +1198,12 @@ def decision_hud_panel(dominant_phase, dominant_pct, micro_phase, micro_pct,
     else:
         banner_color = "🔴 HOLD FIRE"
         status = "⚠️ Likely Trap or Blue Run"
+    return score, banner_color, status, reasons
+
+def decision_hud_panel(dominant_phase, dominant_pct, micro_phase, micro_pct,
+                       resonance_score, fractal_match_type=None, anchor_forecast_type=None):
+    score, banner_color, status, reasons = hud_signal(
+        dominant_phase, micro_phase, resonance_score, fractal_match_type, anchor_forecast_type)
     
     with st.container():
         st.markdown("---")
@@ -220,33 +1239,67 @@ def get_zone_color(pct):
     else:
         return 'red'
 
-def multi_harmonic_resonance_analysis(df, num_harmonics=5):
-    scores = df["score"].fillna(0).values
-    N = len(scores)
-    yf = rfft(scores - np.mean(scores))
+def multi_harmonic_resonance_analysis(data, num_harmonics=5):
+    """Top-``num_harmonics`` FFT components of the score stream and how coherently they line up.
+
+    ``data`` is a DataFrame with a ``score`` column, a 1-D score array, or a
+    2-D array with one history (or lookback window) per row. All rows are
+    handled in one pass: waves come back as a (rows, harmonics, N) array and the
+    pairwise resonance matrix as (rows, harmonics, harmonics), built by
+    broadcasting. Single-history input drops the leading axis. With one
+    harmonic there are no pairs, so coherence is 0.
+    """
+    scores = data["score"].fillna(0).values if isinstance(data, pd.DataFrame) else np.asarray(data, dtype=float)
+    single = scores.ndim == 1
+    scores = np.atleast_2d(scores)
+    N = scores.shape[1]
+    yf = rfft(scores - scores.mean(axis=1, keepdims=True), axis=1)
     xf = rfftfreq(N, 1)
     amplitudes = np.abs(yf)
-    top_indices = amplitudes.argsort()[-num_harmonics:][::-1]
-    resonance_matrix = np.zeros((num_harmonics, num_harmonics))
-    harmonic_waves = []
-    
-    for i, idx in enumerate(top_indices):
-        freq = xf[idx]
-        phase = np.angle(yf[idx])
-        wave = np.sin(2 * np.pi * freq * np.arange(N) + phase)
-        harmonic_waves.append(wave)
-        for j, jdx in enumerate(top_indices):
-            if i != j:
-                phase_diff = np.abs(phase - np.angle(yf[jdx]))
-                resonance_matrix[i,j] = np.cos(phase_diff) * min(amplitudes[idx], amplitudes[jdx])
-
-    resonance_score = np.sum(resonance_matrix) / (num_harmonics * (num_harmonics - 1))
-    tension = np.var(amplitudes[top_indices])
-    harmonic_entropy = stats.entropy(amplitudes[top_indices] / np.sum(amplitudes[top_indices]))
+    k = min(num_harmonics, amplitudes.shape[1])
+    top = np.argsort(amplitudes, axis=1)[:, ::-1][:, :k]
+
+    amps = np.take_along_axis(amplitudes, top, axis=1)
+    phases = np.angle(np.take_along_axis(yf, top, axis=1))
+    harmonic_waves = np.sin(2 * np.pi * xf[top][..., None] * np.arange(N) + phases[..., None])
+
+    resonance_matrix = (np.cos(np.abs(phases[:, :, None] - phases[:, None, :]))
+                        * np.minimum(amps[:, :, None], amps[:, None, :]))
+    resonance_matrix[:, np.arange(k), np.arange(k)] = 0
+    pairs = k * (k - 1)
+    resonance_score = resonance_matrix.sum(axis=(1, 2)) / pairs if pairs else np.zeros(len(scores))
+    tension = amps.var(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        p = amps / amps.sum(axis=1, keepdims=True)
+        harmonic_entropy = 0.0 - np.where(p > 0, p * np.log(p), 0).sum(axis=1)
+
+    if single:
+        return (harmonic_waves[0], resonance_matrix[0], float(resonance_score[0]), float(tension[0]),
+                float(harmonic_entropy[0]))
     return harmonic_waves, resonance_matrix, resonance_score, tension, harmonic_entropy
 
+
+def harmonic_count_scan(scores, max_harmonics=24):
+    """Coherence, tension and entropy for every harmonic count 1..``max_harmonics`` from one FFT.
+
+    Harmonics are ranked by amplitude, so the analysis for ``k`` harmonics is
+    the leading k x k block of the largest one.
+    """
+    _, matrix, _, _, _ = multi_harmonic_resonance_analysis(scores, max_harmonics)
+    amps = np.sort(np.abs(rfft(scores - np.mean(scores))))[::-1][:len(matrix)]
+    ks = np.arange(1, len(matrix) + 1)
+    block_sums = np.cumsum(np.cumsum(matrix, axis=0), axis=1)[ks - 1, ks - 1]
+    csum, csq = np.cumsum(amps), np.cumsum(amps ** 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        plogp = np.cumsum(np.where(amps > 0, amps * np.log(amps), 0))
+        entropy = np.log(csum) - plogp / csum
+        coherence = np.where(ks > 1, block_sums / (ks * (ks - 1)), 0.0)
+    return pd.DataFrame({"harmonics": ks, "coherence": coherence,
+                         "tension": csq / ks - (csum / ks) ** 2, "entropy": np.nan_to_num(entropy)})
+
 def resonance_forecast(harmonic_waves, resonance_matrix, steps=10):
-    if not harmonic_waves: return np.zeros(steps)
+    if harmonic_waves is None or len(harmonic_waves) == 0: return np.zeros(steps)
+    harmonic_waves = list(harmonic_waves)
     forecast = np.zeros(steps)
     num_harmonics = len(harmonic_waves)
     
@@ -357,35 +1410,1396 @@ def run_rqcf(scores, steps=3, top_n=5):
         forecast_chains.append({"branch": f"Branch {chr(65 + branch_id)}", "forecast": chain})
     return forecast_chains    
 
-# Only run heavy calculations if new round was added
-@st.cache_data(show_spinner=False)
-def analyze_data(data, pink_threshold, window_size):
+# === Parameter Sweep over WINDOW_SIZE x PINK_THRESHOLD ===
+
+def parameter_sweep(multipliers, window_sizes, thresholds, rrqi_window=30, entry_score=2):
+    """Backtest MSI/TPI/RRQI entry signals for every (threshold, window) pair at once.
+
+    Scores are re-derived per threshold with the same Pink/Purple/Blue rules as
+    "Add Round", a single cumulative-sum table is built over all thresholds and
+    every window sum is a broadcast difference of two of its columns. Returns
+    arrays shaped (len(thresholds), len(window_sizes)).
+    """
+    mult = np.asarray(multipliers, dtype=float)
+    thr = np.asarray(thresholds, dtype=float)[:, None]
+    wins = np.asarray(window_sizes, dtype=int)
+    N = len(mult)
+
+    pink = mult >= thr
+    purple = ~pink & (mult >= 2)
+    blue = ~pink & ~purple
+    score = 2 * pink + purple - blue.astype(np.int8)
+    blue_decay = np.where(blue, 2.0 - mult, 0.0)
+
+    # One table: [score, purple count, blue decay] x threshold x round
+    table = np.zeros((3, len(thr), N + 1), dtype=np.float32)
+    np.cumsum(score, axis=1, out=table[0, :, 1:])
+    np.cumsum(purple, axis=1, out=table[1, :, 1:])
+    np.cumsum(blue_decay, axis=1, out=table[2, :, 1:])
+
+    ends = np.arange(1, N + 1)
+    rrqi_start = np.clip(ends - rrqi_window, 0, None)
+    rrqi_vals = (table[0][:, ends] - table[0][:, rrqi_start]) / rrqi_window      # (T, N)
+    rrqi_points = (rrqi_vals >= 0.3).astype(np.int8) - (rrqi_vals <= -0.2)
+    hit = mult[1:] >= 2
+
+    # One window at a time, so peak memory stays O(T * N) however wide the grid
+    shape = (len(thr), len(wins))
+    signals, hits = np.zeros(shape, dtype=np.int64), np.zeros(shape, dtype=np.int64)
+    latest_msi, latest_tpi = np.zeros(shape), np.zeros(shape)
+    latest_entry = np.zeros(shape, dtype=bool)
+    for wi, win in enumerate(wins):
+        starts = np.clip(ends - win, 0, None)
+        sums = table[:, :, ends] - table[:, :, starts]          # (3, T, N)
+        msi = np.where(ends >= win, sums[0], np.nan)
+        tpi = (sums[1] - sums[2]) / win
+        points = ((msi >= 3).astype(np.int8) - (msi <= -3)
+                  + (tpi > 0.5) - (tpi < -0.5) + rrqi_points)
+        entry = points[:, :-1] >= entry_score
+        signals[:, wi] = entry.sum(axis=1)
+        hits[:, wi] = (entry & hit).sum(axis=1)
+        latest_msi[:, wi], latest_tpi[:, wi] = msi[:, -1], tpi[:, -1]
+        latest_entry[:, wi] = points[:, -1] >= entry_score
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        hit_rate = np.where(signals > 0, hits / signals, np.nan)
+
+    return {
+        "hit_rate": hit_rate,
+        "signals": signals,
+        "latest_msi": latest_msi,
+        "latest_tpi": np.round(latest_tpi, 2),
+        "latest_rrqi": np.round(np.broadcast_to(rrqi_vals[:, -1:], shape), 2),
+        "latest_entry": latest_entry,
+    }
+
+
+def sweep_panel(df):
+    st.subheader("🧪 WINDOW_SIZE × PINK_THRESHOLD Sweep")
+    if len(df) < 30:
+        st.warning("Need at least 30 rounds to backtest the parameter grid.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    with col1: win_lo, win_hi = st.slider("Window range", 5, 100, (5, 60))
+    with col2: win_step = st.number_input("Window step", min_value=1, value=5)
+    with col3: max_rounds = st.number_input("Backtest rounds", min_value=30, max_value=len(df),
+                                            value=min(2000, len(df)), step=500)
+    thr_text = st.text_input("Pink thresholds", "5, 8, 10, 15, 20")
+    try:
+        thresholds = sorted({float(t) for t in thr_text.split(",") if t.strip()})
+    except ValueError:
+        st.error("Pink thresholds must be a comma-separated list of numbers.")
+        return
+    if not thresholds:
+        return
+    window_sizes = list(range(win_lo, win_hi + 1, int(win_step)))
+
+    result = parameter_sweep(df["multiplier"].values[-int(max_rounds):], window_sizes, thresholds)
+    hit_rate = result["hit_rate"]
+
+    plt = get_plt()
+    fig, ax = plt.subplots(figsize=(12, 1 + 0.6 * len(thresholds)))
+    cax = ax.imshow(hit_rate, aspect='auto', cmap='RdYlGn', vmin=0, vmax=1, origin='lower')
+    fig.colorbar(cax, label='Backtested Hit Rate')
+    ax.set_xticks(range(len(window_sizes)))
+    ax.set_xticklabels(window_sizes)
+    ax.set_yticks(range(len(thresholds)))
+    ax.set_yticklabels([f"{t:g}" for t in thresholds])
+    ax.set_xlabel("MSI Window Size")
+    ax.set_ylabel("Pink Threshold")
+    ax.set_title("Next-Round Purple/Pink Hit Rate on Entry Signals")
+    st.pyplot(fig)
+
+    if np.all(np.isnan(hit_rate)):
+        st.info("No entry signals fired for any setting in this range.")
+        return
+    ti, wi = np.unravel_index(np.nanargmax(hit_rate), hit_rate.shape)
+    c1, c2, c3 = st.columns(3)
+    with c1: st.metric("Best Window / Threshold", f"{window_sizes[wi]} / {thresholds[ti]:g}")
+    with c2: st.metric("Hit Rate", f"{hit_rate[ti, wi]:.1%}")
+    with c3: st.metric("Signals", int(result["signals"][ti, wi]))
+    st.dataframe(pd.DataFrame({
+        "window": np.tile(window_sizes, len(thresholds)),
+        "pink_threshold": np.repeat(thresholds, len(window_sizes)),
+        "hit_rate": hit_rate.ravel(),
+        "signals": result["signals"].ravel(),
+        "msi": result["latest_msi"].ravel(),
+        "tpi": result["latest_tpi"].ravel(),
+        "rrqi": result["latest_rrqi"].ravel(),
+        "entry_now": result["latest_entry"].ravel(),
+    }))
+
+
+# === Persistent Cross-Session Pattern Index ===
+
+ROUND_TYPE_CHARS = np.array(["B", "p", "P"])
+
+def round_type_codes(scores):
+    """Encode scores as 0=B, 1=p, 2=P, the same mapping FPM uses."""
+    scores = np.asarray(scores)
+    return np.where(scores == 2, 2, np.where(scores == 1, 1, 0)).astype(np.uint8)
+
+def window_signatures(msi, win):
+    """|rfft| of the MSI gradient for every length-``win`` window of ``msi``."""
+    windows = np.lib.stride_tricks.sliding_window_view(np.nan_to_num(np.asarray(msi, dtype=float)), win)
+    return np.abs(rfft(np.gradient(windows, axis=1), axis=1))
+
+
+class PatternIndex:
+    """Append-only on-disk archive of fractal windows with LSH lookup.
+
+    Each entry is an L2-normalised MSI-slope FFT signature, the round-type
+    codes of the window and the codes of the ``horizon`` rounds that followed.
+    Random-hyperplane LSH tables (kept as sorted key arrays) narrow a query to
+    a few buckets; only those candidates are scored with the FPM formula.
+    When the query's own buckets hold fewer than k entries, the probe widens
+    to the buckets one, then two, flipped bits away. New entries are scanned linearly
+    until ``merge_every`` of them pile up, and are written to a new segment
+    file every ``flush_every`` entries or ``flush_interval`` seconds. A window
+    is identified by its end timestamp and codes, so re-adding one (a
+    reloaded history, a restored checkpoint) is a no-op; ids of the pending
+    entries sit in their own small sorted array until they are merged.
+    """
+
+    def __init__(self, path, window, horizon=3, num_tables=6, num_bits=16,
+                 flush_every=256, flush_interval=60, merge_every=4096, seed=7):
+        self.path = path
+        self.window = window
+        self.horizon = horizon
+        self.num_tables = num_tables
+        self.num_bits = num_bits
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.last_flush = time.time()
+        self.merge_every = merge_every
+        self.lock = threading.Lock()
+
+        dim = window // 2 + 1
+        planes = np.random.default_rng(seed).standard_normal((num_tables * num_bits, dim))
+        # Signatures are non-negative; planes through the diagonal split that orthant evenly
+        self.planes = planes - planes.mean(axis=1, keepdims=True)
+        self.bit_weights = 1 << np.arange(num_bits, dtype=np.int64)
+        pairs = self.bit_weights[:, None] | self.bit_weights[None, :]  # the diagonal holds the single bits
+        self.probe_flips = [np.zeros(1, dtype=np.int64), np.r_[0, self.bit_weights], np.r_[0, np.unique(pairs)]]
+
+        self.signatures = np.empty((0, dim), dtype=np.float32)
+        self.codes = np.empty((0, window), dtype=np.uint8)
+        self.next_codes = np.empty((0, horizon), dtype=np.uint8)
+        self.timestamps = np.empty(0, dtype="datetime64[ns]")
+        self.sorted_keys = np.empty((num_tables, 0), dtype=np.int64)
+        self.key_order = np.empty((num_tables, 0), dtype=np.int64)
+        self.entry_ids = np.empty(0, dtype=np.uint64)  # sorted, one per merged window
+        self.pending_ids = np.empty(0, dtype=np.uint64)  # sorted, one per pending window
+        self.pending = []
+        self.unsaved = []
+
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def __len__(self):
+        return len(self.signatures) + sum(len(chunk[0]) for chunk in self.pending)
+
+    def _keys(self, signatures):
+        bits = (signatures @ self.planes.T > 0).reshape(len(signatures), self.num_tables, self.num_bits)
+        return bits.astype(np.int64) @ self.bit_weights
+
+    def _entry_ids(self, codes, timestamps):
+        code_ids = codes.astype(np.uint64) @ (np.uint64(4) ** np.arange(self.window, dtype=np.uint64))
+        return timestamps.view(np.int64).astype(np.uint64) ^ (code_ids * np.uint64(0x9E3779B97F4A7C15))
+
+    @staticmethod
+    def _contains(sorted_ids, ids):
+        pos = np.searchsorted(sorted_ids, ids)
+        inside = pos < len(sorted_ids)
+        found = np.zeros(len(ids), dtype=bool)
+        found[inside] = sorted_ids[pos[inside]] == ids[inside]
+        return found
+
+    def _fresh(self, chunk):
+        """``chunk`` without the windows already stored (or repeated within it); registers the rest as pending."""
+        ids = self._entry_ids(chunk[1], chunk[3])
+        ids, first = np.unique(ids, return_index=True)
+        new = ~(self._contains(self.entry_ids, ids) | self._contains(self.pending_ids, ids))
+        # Only the pending ids (at most ``merge_every``) are shifted; the merged ones wait for _merge
+        self.pending_ids = np.insert(self.pending_ids, np.searchsorted(self.pending_ids, ids[new]), ids[new])
+        keep = np.sort(first[new])
+        return tuple(part[keep] for part in chunk)
+
+    def _merge(self, chunks):
+        if not chunks:
+            return
+        self.entry_ids = np.sort(np.concatenate([self.entry_ids, self.pending_ids]))
+        self.pending_ids = self.pending_ids[:0]
+        sig, codes, nxt, ts = (np.concatenate(parts) for parts in zip(*chunks))
+        self.signatures = np.concatenate([self.signatures, sig])
+        self.codes = np.concatenate([self.codes, codes])
+        self.next_codes = np.concatenate([self.next_codes, nxt])
+        self.timestamps = np.concatenate([self.timestamps, ts])
+        keys = self._keys(self.signatures).T
+        self.key_order = np.argsort(keys, axis=1, kind="stable")
+        self.sorted_keys = np.take_along_axis(keys, self.key_order, axis=1)
+
+    def _load(self):
+        files = sorted(glob.glob(os.path.join(self.path, "seg_*.npz")))
+        chunks = []
+        for f in files:
+            try:
+                with np.load(f) as seg:
+                    chunks.append((seg["sig"], seg["codes"], seg["next"], seg["ts"]))
+            except (OSError, ValueError, KeyError):
+                continue
+        segments = len(chunks)
+        if chunks:
+            # One dedupe pass over all segments, so ids are sorted once rather than per segment
+            chunk = self._fresh(tuple(np.concatenate(parts) for parts in zip(*chunks)))
+            chunks = [chunk] if len(chunk[0]) else []
+        self._merge(chunks)
+        # Compact many small segments into one so cold loads stay cheap
+        if segments > 64 and chunks:
+            self._write_segment(chunks)
+            for f in files:
+                try:
+                    os.remove(f)
+                except OSError:
+                    pass
+
+    def _write_segment(self, chunks):
+        sig, codes, nxt, ts = (np.concatenate(parts) for parts in zip(*chunks))
+        name = os.path.join(self.path, f"seg_{time.time_ns()}_{uuid.uuid4().hex[:8]}")
+        np.savez(name + ".tmp.npz", sig=sig, codes=codes, next=nxt, ts=ts)
+        os.replace(name + ".tmp.npz", name + ".npz")
+
+    def add(self, signatures, codes, next_codes, timestamps):
+        if len(signatures) == 0:
+            return
+        norms = np.linalg.norm(signatures, axis=1, keepdims=True)
+        sig = np.divide(signatures, norms, out=np.zeros_like(signatures), where=norms > 0).astype(np.float32)
+        chunk = (sig, np.asarray(codes, dtype=np.uint8), np.asarray(next_codes, dtype=np.uint8),
+                 np.asarray(timestamps, dtype="datetime64[ns]"))
+        with self.lock:
+            chunk = self._fresh(chunk)
+            if not len(chunk[0]):
+                return
+            self.pending.append(chunk)
+            self.unsaved.append(chunk)
+            if sum(len(c[0]) for c in self.pending) >= self.merge_every:
+                self._merge(self.pending)
+                self.pending = []
+            if (sum(len(c[0]) for c in self.unsaved) >= self.flush_every
+                    or time.time() - self.last_flush >= self.flush_interval):
+                self._flush()
+
+    def _flush(self):
+        if self.unsaved:
+            self._write_segment(self.unsaved)
+            self.unsaved = []
+        self.last_flush = time.time()
+
+    def flush(self):
+        with self.lock:
+            self._flush()
+
+    def _candidates(self, sorted_keys, key_order, qkeys, flips):
+        """Entries in the buckets at ``qkeys ^ flip`` for every table and flip."""
+        found = []
+        for t in range(self.num_tables):
+            probes = qkeys[t] ^ flips
+            lo = np.searchsorted(sorted_keys[t], probes, side="left")
+            hi = np.searchsorted(sorted_keys[t], probes, side="right")
+            found.extend(key_order[t, a:b] for a, b in zip(lo, hi))
+        return np.unique(np.concatenate(found))
+
+    def query(self, signature, code, k=5):
+        """Top-k archived windows by 0.6 * FFT cosine + 0.4 * round-type agreement."""
+        q = np.asarray(signature, dtype=np.float32)
+        norm = np.linalg.norm(q)
+        q = q / norm if norm > 0 else q
+        code = np.asarray(code, dtype=np.uint8)
+
+        with self.lock:
+            signatures, codes, nxt, ts = self.signatures, self.codes, self.next_codes, self.timestamps
+            if self.pending:
+                p_sig, p_codes, p_nxt, p_ts = (np.concatenate(parts) for parts in zip(*self.pending))
+            else:
+                p_sig = p_codes = p_nxt = p_ts = None
+            sorted_keys, key_order = self.sorted_keys, self.key_order
+
+        if len(signatures):
+            qkeys = self._keys(q[None, :])[0]
+            for flips in self.probe_flips:
+                cand = self._candidates(sorted_keys, key_order, qkeys, flips)
+                if len(cand) >= k:
+                    break
+        else:
+            cand = np.empty(0, dtype=np.int64)
+
+        c_sig, c_codes, c_nxt, c_ts = signatures[cand], codes[cand], nxt[cand], ts[cand]
+        if p_sig is not None:
+            c_sig = np.concatenate([c_sig, p_sig])
+            c_codes = np.concatenate([c_codes, p_codes])
+            c_nxt = np.concatenate([c_nxt, p_nxt])
+            c_ts = np.concatenate([c_ts, p_ts])
+        if len(c_sig) == 0:
+            return []
+
+        total = 0.6 * (c_sig @ q) + 0.4 * (c_codes == code).mean(axis=1)
+        top = np.argsort(-total)[:k]
+        return [{
+            "score": round(float(total[i]), 3),
+            "pattern": " ".join(ROUND_TYPE_CHARS[c_codes[i]]),
+            "next": " ".join(ROUND_TYPE_CHARS[c_nxt[i]]),
+            "ended": pd.Timestamp(c_ts[i]),
+        } for i in top]
+
+
+@st.cache_resource(show_spinner=False)
+def get_pattern_indexes(msi_window, window_sizes=(5, 8, 13)):
+    return {win: PatternIndex(os.path.join(PATTERN_INDEX_DIR, f"msi{msi_window}_w{win}"), win)
+            for win in window_sizes}
+
+
+def sync_pattern_indexes(store, features, timestamps, msi_window, window_sizes=(5, 8, 13), horizon=3, offset=0):
+    """Archive every window of this stream whose next ``horizon`` rounds are known.
+
+    ``features`` is the feature-store view of the rounds in ``timestamps``, and
+    ``offset`` is the absolute round number of its first row; the per-window
+    progress kept in ``store`` is absolute so it survives the ring buffer
+    dropping old rounds. Windows starting before the store's ``archive_from``
+    (synthetic history) are skipped, and a scratch store only queries the archive.
+    """
+    indexes = get_pattern_indexes(msi_window, tuple(window_sizes))
+    if store.get("scratch"):
+        return indexes
+    offsets = store.setdefault("pattern_indexed", {})
+    codes = features["codes"]
+    N = len(codes)
+
+    for win in window_sizes:
+        key = (msi_window, win)
+        start = max(offsets.get(key, 0), store.get("archive_from", 0)) - offset
+        if start > N:
+            start = 0
+        start = max(start, 0)
+        stop = N - win - horizon + 1
+        if stop <= start:
+            continue
+        starts = np.arange(start, stop)
+        code_windows = np.lib.stride_tricks.sliding_window_view(codes, win)
+        next_windows = np.lib.stride_tricks.sliding_window_view(codes[win:], horizon)
+        indexes[win].add(features[f"signatures_{win}"][start + win - 1:stop + win - 1],
+                         code_windows[starts], next_windows[starts], timestamps[starts + win - 1])
+        offsets[key] = stop + offset
+    return indexes
+
+
+# === N-gram Index over Round-Type Sequences ===
+
+class RoundTypeNGramIndex:
+    """Incremental counts of what followed every exact last-k round-type pattern.
+
+    For every k in [min_k, max_k] and h in [1, horizon], each round adds one
+    to the count of (last-k pattern, h round types that followed it). A
+    pair is one int64 key: the base-3 pattern, offset per length, times 64
+    plus a slot for the continuation. Counts live in two sorted arrays
+    (``keys``, ``counts``) and a small Counter of recent increments. The
+    Counter is merged into the arrays every ``buffer_entries`` keys, so the
+    table pickles as two flat arrays. A query is a binary search on the
+    arrays plus a few Counter lookups, whatever the history length.
+
+    Memory is capped at ``max_entries`` pairs, 12 bytes each (24 MB at the
+    default 2M). If a merge goes over the cap, the rarest pairs are
+    dropped: count 1 first, then 2 and so on. Long patterns seen only once
+    are forgotten first.
+    """
+
+    SLOT_BITS = 6  # 3 + 9 + 27 continuation slots for horizon 3
+
+    def __init__(self, min_k=3, max_k=13, horizon=3, max_entries=2_000_000, buffer_entries=1 << 16):
+        self.min_k = min_k
+        self.max_k = max_k
+        self.horizon = horizon
+        self.max_entries = max_entries
+        self.buffer_entries = buffer_entries
+        self.recent = deque(maxlen=max_k + horizon)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int32)
+        self.buffer = Counter()
+        self.n_seen = 0
+        # First key of each pattern length, and first slot of each continuation length
+        self.pattern_offsets = np.concatenate([[0], np.cumsum(3 ** np.arange(max_k + 1))])
+        self.slot_offsets = np.concatenate([[0], np.cumsum(3 ** np.arange(1, horizon + 1))])
+        self.pattern_starts, self.slot_starts = self.pattern_offsets.tolist(), self.slot_offsets.tolist()
+
+    def update(self, code):
+        # Live path: the ~33 keys of one round in plain Python, no array overhead
+        self.recent.append(int(code))
+        self.n_seen += 1
+        seq = self.recent
+        n = len(seq)
+        for h in range(1, self.horizon + 1):
+            end = n - h
+            if end < self.min_k:
+                break
+            slot = self.slot_starts[h - 1] + sum(seq[end + j] * 3 ** j for j in range(h))
+            pattern = 0
+            for k in range(1, min(self.max_k, end) + 1):
+                pattern = seq[end - k] + 3 * pattern
+                if k >= self.min_k:
+                    self.buffer[((self.pattern_starts[k] + pattern) << self.SLOT_BITS) + slot] += 1
+        if len(self.buffer) >= self.buffer_entries:
+            self._merge(*self._buffer_arrays())
+            self.buffer = Counter()
+
+    def extend(self, codes):
+        codes = np.asarray(codes, dtype=np.int64)
+        if len(codes) < 64:
+            for c in codes.tolist():
+                self.update(c)
+            return
+        seq = np.concatenate([np.fromiter(self.recent, dtype=np.int64, count=len(self.recent)), codes])
+        newest = np.arange(len(self.recent), len(seq))
+        parts = []
+        for h in range(1, self.horizon + 1):
+            ends = newest + 1 - h            # patterns are seq[end - k:end], followed by seq[end:end + h]
+            ok = ends >= self.min_k
+            ends = ends[ok]
+            slot = self.slot_offsets[h - 1] + sum(seq[ends + j] * 3 ** j for j in range(h))
+            pattern = np.zeros(len(ends), dtype=np.int64)
+            for k in range(1, self.max_k + 1):
+                has = ends - k >= 0
+                if not has.any():
+                    break
+                ends, slot, pattern = ends[has], slot[has], pattern[has]
+                pattern = seq[ends - k] + 3 * pattern
+                if k >= self.min_k:
+                    parts.append(((self.pattern_offsets[k] + pattern) << self.SLOT_BITS) + slot)
+        self.recent.extend(codes.tolist())
+        self.n_seen += len(codes)
+        if not parts:
+            return
+        self._merge(*np.unique(np.concatenate(parts), return_counts=True))
+
+    def _buffer_arrays(self):
+        keys = np.fromiter(self.buffer.keys(), dtype=np.int64, count=len(self.buffer))
+        counts = np.fromiter(self.buffer.values(), dtype=np.int64, count=len(self.buffer))
+        return keys, counts
+
+    def _merge(self, keys, counts):
+        self.keys, self.counts = self._merged(keys, counts)
+
+    def _merged(self, keys, counts):
+        # Always new arrays, never writes into the current ones (a checkpoint may still hold them)
+        merged, inverse = np.unique(np.concatenate([self.keys, keys]), return_inverse=True)
+        totals = np.bincount(inverse, np.concatenate([self.counts, counts]), minlength=len(merged)).astype(np.int32)
+        floor = 1
+        while len(merged) > self.max_entries:
+            keep = totals > floor
+            merged, totals = merged[keep], totals[keep]
+            floor += 1
+        return merged, totals
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        if self.buffer:
+            state["keys"], state["counts"] = self._merged(*self._buffer_arrays())
+            state["buffer"] = Counter()
+        return state
+
+    def checkpoint_view(self):
+        """Copy-on-write snapshot: the count arrays are replaced, never written, so only the buffer is copied."""
+        view = object.__new__(RoundTypeNGramIndex)
+        view.__dict__.update(self.__dict__, buffer=Counter(self.buffer),
+                             recent=deque(self.recent, maxlen=self.recent.maxlen))
+        return view
+
+    def lookup(self, pattern, h=1):
+        """Counter of the ``h`` round types that followed ``pattern`` (a tuple of codes per key)."""
+        pattern = [int(c) for c in pattern]
+        k = len(pattern)
+        if not self.min_k <= k <= self.max_k or not 1 <= h <= self.horizon:
+            return Counter()
+        base = (int(self.pattern_offsets[k]) + sum(c * 3 ** i for i, c in enumerate(pattern))) << self.SLOT_BITS
+        first = base + int(self.slot_offsets[h - 1])
+        lo, hi = np.searchsorted(self.keys, [first, first + 3 ** h])
+        found = Counter(dict(zip((self.keys[lo:hi] - first).tolist(), self.counts[lo:hi].tolist())))
+        for slot in range(3 ** h):
+            found[slot] += self.buffer.get(first + slot, 0)
+        return Counter({tuple(slot // 3 ** j % 3 for j in range(h)): n for slot, n in found.items() if n})
+
+    def current_stats(self):
+        """Next-outcome statistics for the live last-k pattern, for every k."""
+        seq = tuple(self.recent)
+        rows = []
+        for k in range(self.min_k, min(self.max_k, len(seq)) + 1):
+            pattern = seq[-k:]
+            next_one = self.lookup(pattern, 1)
+            seen = sum(next_one.values())
+            row = {"k": k, "pattern": " ".join(ROUND_TYPE_CHARS[list(pattern)]), "seen": seen}
+            for code, char in enumerate(ROUND_TYPE_CHARS):
+                row[f"next {char}"] = next_one[(code,)] / seen if seen else np.nan
+            for h in range(2, self.horizon + 1):
+                top = self.lookup(pattern, h).most_common(1)
+                row[f"top next {h}"] = (f"{' '.join(ROUND_TYPE_CHARS[list(top[0][0])])} ({top[0][1]})"
+                                        if top else "N/A")
+            rows.append(row)
+        return pd.DataFrame(rows)
+
+
+def sync_ngram_index(store, scores, start=0):
+    index = store.get("ngram_index")
+    if index is None or not start <= index.n_seen <= start + len(scores):
+        index = RoundTypeNGramIndex()
+        index.n_seen = start
+        store["ngram_index"] = index
+    index.extend(round_type_codes(scores[index.n_seen - start:]))
+    return index
+
+
+def ngram_stats_panel(stats_df):
+    st.subheader("📊 Exact Pattern Statistics")
+    if stats_df.empty or not stats_df["seen"].any():
+        st.info("Current pattern has not been seen before in this session.")
+        return
+    st.dataframe(stats_df.style.format({f"next {c}": "{:.0%}" for c in ROUND_TYPE_CHARS}, na_rep="—"),
+                 hide_index=True)
+
+
+# === Predictor Accuracy Tracking ===
+# Predicted round type for each label a panel can show; None means the
+# predictor abstained (neutral / unknown) and only its Brier score counts.
+CLASSIFICATION_TYPES = {
+    "💖 Pink Surge Expected": "P",
+    "🟣 Probable Purple Round": "p",
+    "⚠️ Collapse Risk (Blue Train)": "B",
+    "🔵 Likely Blue / Pullback": "B",
+}
+RQCF_TYPES = {"💖 Pink Spike": "P", "🟣 Purple Stable": "p", "🔵 Blue Pullback": "B"}
+
+
+class PredictionScorer:
+    """Resolves every predictor's call for the next round once that round arrives.
+
+    ``record`` stores a prediction for an absolute round index: a predicted
+    label (a round type, or ↑/↓ for direction-only predictors) and the
+    probability it gave to a non-Blue round. ``update`` resolves the pending
+    predictions for the round it is given, so each round costs O(#predictors).
+    Hit rate and Brier score are kept over the last ``window`` resolved calls
+    with running sums; confusion counts are cumulative.
+    """
+
+    def __init__(self, window=100):
+        self.window = window
+        self.lock = threading.Lock()
+        self.pending = {}
+        self.hits = {}
+        self.sq_errors = {}
+        self.sums = {}
+        self.resolved = Counter()
+        self.confusion = {}
+        self.n_seen = 0
+
+    def __getstate__(self):
+        with self.lock:
+            state = copy.deepcopy({k: v for k, v in self.__dict__.items() if k != "lock"})
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def record(self, predictor, target, label, prob_up):
+        with self.lock:
+            if target >= self.n_seen:
+                self.pending[predictor] = (target, label, float(np.clip(prob_up, 0, 1)))
+
+    def update(self, code):
+        actual = str(ROUND_TYPE_CHARS[code])
+        up = code > 0
+        with self.lock:
+            index = self.n_seen
+            self.n_seen += 1
+            for predictor, (target, label, prob_up) in list(self.pending.items()):
+                if target > index:
+                    continue
+                del self.pending[predictor]
+                if target < index:
+                    continue
+                self._push(predictor, "sq", (prob_up - up) ** 2)
+                self.resolved[predictor] += 1
+                if label is None:
+                    continue
+                observed = ("↑" if up else "↓") if label in ("↑", "↓") else actual
+                self._push(predictor, "hit", float(label == observed))
+                self.confusion.setdefault(predictor, Counter())[(label, observed)] += 1
+
+    def extend(self, codes):
+        for c in codes:
+            self.update(c)
+
+    def _push(self, predictor, kind, value):
+        series = (self.hits if kind == "hit" else self.sq_errors).setdefault(
+            predictor, deque(maxlen=self.window))
+        key = (predictor, kind)
+        if len(series) == self.window:
+            self.sums[key] -= series[0]
+        series.append(value)
+        self.sums[key] = self.sums.get(key, 0.0) + value
+
+    def summary(self):
+        with self.lock:
+            rows = []
+            for predictor in sorted(self.resolved):
+                hits = self.hits.get(predictor, ())
+                sq = self.sq_errors[predictor]
+                rows.append({
+                    "predictor": predictor,
+                    "resolved": self.resolved[predictor],
+                    "calls": sum(self.confusion.get(predictor, Counter()).values()),
+                    "hit rate": self.sums[(predictor, "hit")] / len(hits) if hits else np.nan,
+                    "brier": self.sums[(predictor, "sq")] / len(sq),
+                })
+            return pd.DataFrame(rows), {p: dict(c) for p, c in self.confusion.items()}
+
+
+def sync_prediction_scorer(store, scores, pink_threshold, window_size, num_harmonics, start=0):
+    """Resolve pending predictions against the rounds the scorer has not seen yet.
+
+    The predictions depend on the sidebar settings, so each combination keeps its own scorer.
+    """
+    key = f"prediction_scorer_{pink_threshold}_{window_size}_{num_harmonics}"
+    scorer = store.get(key)
+    if scorer is None or not start <= scorer.n_seen <= start + len(scores):
+        scorer = PredictionScorer()
+        scorer.n_seen = start
+        store[key] = scorer
+    scorer.extend(round_type_codes(scores[scorer.n_seen - start:]))
+    return scorer
+
+
+def record_fractal_prediction(scorer, predictor, target, future_types, score):
+    """FPM / anchor call: the first projected type, trusted in proportion to its match score."""
+    if not future_types:
+        return
+    label = future_types[0]
+    confidence = 0.5 * float(np.clip(score, 0, 1)) if np.isfinite(score) else 0.0
+    scorer.record(predictor, target, label, 0.5 + confidence if label != "B" else 0.5 - confidence)
+
+
+def record_predictions(scorer, target, fields, stages, fpm_windows):
+    """Register the next-round call of every predictor computed for this version."""
+    forecast = fields["resonance_forecast_vals"]
+    if forecast is not None and len(forecast):
+        classification, _, energy_index = classify_next_round(
+            forecast, fields["tension"], fields["entropy"], fields["resonance_score"])
+        scorer.record("Harmonic Round Predictor", target, CLASSIFICATION_TYPES.get(classification),
+                      (energy_index + 1) / 2)
+        scorer.record("Resonance ↑/↓", target, "↑" if forecast[0] > 0 else "↓", (np.tanh(forecast[0]) + 1) / 2)
+
+    def on_fpm(fut):
+        match = fut.result()
+        record_fractal_prediction(scorer, f"FPM {match['win']}", target, match["next_outcome"], match["best_score"])
+
+    def on_anchor(fut):
+        anchor = fut.result()
+        if anchor is not None:
+            record_fractal_prediction(scorer, "Fractal Anchor", target, anchor["future_types"], anchor["best_score"])
+
+    def on_rqcf(fut):
+        chains = fut.result()
+        if chains:
+            first = [chain["forecast"][0] for chain in chains]
+            scorer.record("RQCF", target, RQCF_TYPES.get(first[0][1]), np.mean([val >= 0.5 for val, _ in first]))
+
+    for win in fpm_windows:
+        stages.on_done(f"fpm_{win}", on_fpm)
+    stages.on_done("anchor", on_anchor)
+    stages.on_done("rqcf", on_rqcf)
+
+
+def accuracy_panel(summary, confusion):
+    st.caption("Each predictor's call for the next round, scored when that round arrives. "
+               "Hit rate is over the last 100 resolved calls; Brier scores the probability of a non-Blue round "
+               "(0 = perfect, 0.25 = coin flip).")
+    if summary.empty:
+        st.info("No predictions resolved yet — add rounds to start scoring.")
+        return
+    st.dataframe(summary.style.format({"hit rate": "{:.0%}", "brier": "{:.3f}"}, na_rep="—"), hide_index=True)
+    predictor = st.selectbox("Confusion counts", list(confusion), key="accuracy_confusion")
+    if predictor:
+        counts = pd.Series(confusion[predictor]).rename_axis(["predicted", "actual"]).unstack(fill_value=0)
+        st.dataframe(counts)
+
+
+# === Streaming Regime-Change Detection ===
+class CusumDetector:
+    """Two-sided CUSUM whose reference mean is re-estimated after every change.
+
+    Deviations are standardised by the running std of the series, so ``drift``
+    and ``threshold`` are in sigmas. When either side crosses ``threshold`` the
+    change is placed where that side last left zero, and the rounds since then
+    become the new reference segment. Everything is running sums: O(1) per value.
+    """
+
+    def __init__(self, drift=0.5, threshold=5.0, warmup=20, max_changes=256):
+        self.drift = drift
+        self.threshold = threshold
+        self.warmup = warmup
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.seg_start = 0
+        self.seg_sum = 0.0
+        self.seg_n = 0
+        self.g_pos = self.g_neg = 0.0
+        self.pos_run = self.neg_run = (0, 0.0, 0)
+        self.changes = deque(maxlen=max_changes)
+        self.n_seen = 0
+
+    def update(self, x):
+        index = self.n_seen
+        self.n_seen += 1
+        if np.isnan(x):
+            return None
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        if self.seg_n < self.warmup:
+            self.seg_sum += x
+            self.seg_n += 1
+            return None
+
+        sigma = np.sqrt(self.m2 / (self.n - 1)) or 1.0
+        z = (x - self.seg_sum / self.seg_n) / sigma
+        self.g_pos, self.pos_run = self._step(self.g_pos + z - self.drift, self.pos_run, index, x)
+        self.g_neg, self.neg_run = self._step(self.g_neg - z - self.drift, self.neg_run, index, x)
+
+        for direction, g, run in ((1, self.g_pos, self.pos_run), (-1, self.g_neg, self.neg_run)):
+            if g > self.threshold:
+                self.seg_start, self.seg_sum, self.seg_n = run
+                self.g_pos = self.g_neg = 0.0
+                self.pos_run = self.neg_run = (index + 1, 0.0, 0)
+                self.changes.append((self.seg_start, direction))
+                return direction
+        self.seg_sum += x
+        self.seg_n += 1
+        return None
+
+    @staticmethod
+    def _step(g, run, index, x):
+        if g <= 0:
+            return 0.0, (index + 1, 0.0, 0)
+        start, total, count = run
+        return g, (start, total + x, count + 1)
+
+    @property
+    def segment_mean(self):
+        return self.seg_sum / self.seg_n if self.seg_n else np.nan
+
+    @property
+    def std(self):
+        return np.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else np.nan
+
+
+class RegimeTracker:
+    """CUSUM change points on the score stream (regime) and on MSI (level breaks).
+
+    The synth.py regimes move the mean score by only 0.16-0.34 sigma, so the
+    score detector uses a small drift and a high threshold. On
+    ``generate_rounds(20000, seed=11, mean_regime_length=500)`` it raises 25
+    alarms for 37 switches: 23 within 300 rounds of a switch (median delay 90
+    rounds), 2 false. Over seeds 3-7 it catches 48% of switches (the rest are
+    mostly regimes too short to tell apart) with a median delay of 82 rounds
+    and 0.34 false alarms per 1000 rounds; without switching it fires 0.5
+    times per 1000 rounds. The MSI detector fires 0.4 times per 1000 rounds
+    without switching and follows about a quarter of switches, median 104
+    rounds later.
+    """
+
+    def __init__(self):
+        self.scores = CusumDetector(drift=0.1, threshold=24.0)
+        # MSI is a rolling sum, so it wanders far more than its std suggests
+        self.msi = CusumDetector(drift=1.0, threshold=40.0)
+        self.n_seen = 0
+
+    def update(self, score, msi):
+        self.scores.update(score)
+        self.msi.update(msi)
+        self.n_seen += 1
+
+    def extend(self, scores, msi):
+        for score, m in zip(scores, msi):
+            self.update(float(score), float(m))
+
+    def state(self, start=0):
+        """Current regime plus the change points at or after absolute round ``start``."""
+        detector = self.scores
+        seg_mean, overall, sigma = detector.segment_mean, detector.mean, detector.std
+        if detector.seg_n < detector.warmup and not detector.changes:
+            label = "⏳ Warming Up"
+        elif seg_mean >= overall + 0.1 * sigma:
+            label = "🔥 Happy Hour"
+        elif seg_mean <= overall - 0.1 * sigma:
+            label = "⚠️ Dead Zone"
+        else:
+            label = "⚖️ Mixed Zone"
+        last_change = detector.changes[-1] if detector.changes else None
+        return {
+            "label": label,
+            "segment_mean": None if np.isnan(seg_mean) else float(seg_mean),
+            "overall_mean": float(overall),
+            "last_change": last_change[0] if last_change else None,
+            "last_direction": last_change[1] if last_change else None,
+            "rounds_since_change": self.n_seen - (last_change[0] if last_change else 0),
+            "score_changes": [c for c in detector.changes if c[0] >= start],
+            "msi_changes": [c for c in self.msi.changes if c[0] >= start],
+        }
+
+
+def sync_regime_tracker(store, scores, msi, msi_window, start=0):
+    key = f"regime_{msi_window}"
+    tracker = store.get(key)
+    if tracker is None or not start <= tracker.n_seen <= start + len(scores):
+        tracker = RegimeTracker()
+        tracker.n_seen = tracker.scores.n_seen = tracker.msi.n_seen = start
+        store[key] = tracker
+    new = slice(tracker.n_seen - start, None)
+    tracker.extend(scores[new], msi[new])
+    return tracker
+
+
+def regime_panel(regime, timestamps, start):
+    col1, col2, col3 = st.columns(3)
+    col1.metric("🧭 Regime", regime["label"],
+                delta=None if regime["segment_mean"] is None else
+                f"{regime['segment_mean'] - regime['overall_mean']:+.2f} score vs long-run")
+    if regime["last_change"] is None:
+        col2.metric("Since Last Change", f"{regime['rounds_since_change']} rounds", delta="no change yet")
+    else:
+        col2.metric("Since Last Change", f"{regime['rounds_since_change']} rounds",
+                    delta="shift up" if regime["last_direction"] > 0 else "shift down")
+        local = regime["last_change"] - start
+        if 0 <= local < len(timestamps):
+            col3.metric("Changed At", pd.Timestamp(timestamps.iloc[local]).strftime("%H:%M:%S"))
+    col3.caption(f"{len(regime['score_changes'])} regime / {len(regime['msi_changes'])} MSI change points in view")
+
+
+# === Per-Round Signal History ===
+HUD_REASONS = (
+    "✅ Dominant in profit zone", "✅ Micro matches Dominant", "✅ Coherence High", "⚠️ Coherence Low",
+    "🔥 Fractal Pulse → Pink", "🟣 Fractal Pulse → Purple", "🔵 Fractal Pulse → Blue",
+    "💥 Fractal Anchor → Pink", "🟪 Fractal Anchor → Purple", "🧊 Fractal Anchor → Blue",
+)
+HUD_BANNERS = ("🔴 HOLD FIRE", "🟡 SCOUT ZONE", "🟢 ENTRY CONFIRMED")
+NEXT_ROUND_LABELS = ("❓ Unknown", "💖 Pink Surge Expected", "🟣 Probable Purple Round", "⚪ Neutral Drift Zone",
+                     "⚠️ Collapse Risk (Blue Train)", "🔵 Likely Blue / Pullback")
+REGIME_LABELS = ("", "⏳ Warming Up", "🔥 Happy Hour", "⚠️ Dead Zone", "⚖️ Mixed Zone")
+# Forecast round types are stored as 0 = none, 1 = B, 2 = p, 3 = P
+SIGNAL_LOG_DTYPE = np.dtype([
+    ("index", "<i8"), ("timestamp", "<i8"), ("hud_score", "i1"), ("banner", "u1"), ("reasons", "<u2"),
+    ("msi", "<f4"), ("tpi", "<f4"), ("rrqi", "<f4"), ("next_round", "u1"), ("resonance", "i1"),
+    ("fractal", "u1"), ("anchor", "u1"), ("regime", "u1"),
+])
+
+
+def encode_round_type(forecast):
+    if not forecast:
+        return 0
+    return int(np.flatnonzero(ROUND_TYPE_CHARS == forecast[0])[0]) + 1
+
+
+class SignalLog:
+    """Append-only log of the headline signals after each compute, 37 bytes per record.
+
+    One record is written per computed stream version, for its newest round:
+    rounds that arrived together in one batch share a single record, and the
+    rounds in between are not backfilled (their signals were never computed).
+    Records are packed into a structured array; labels are small integer codes
+    into the tuples above and HUD reasons a bitmask over ``HUD_REASONS``. A
+    record for an index at or before the newest one (a recompute, or new
+    rounds after an undo) replaces everything from that index on. Only the
+    newest ``max_records`` records are kept.
+    """
+
+    def __init__(self, max_records=200_000):
+        self.max_records = max_records
+        self.records = np.zeros(1024, dtype=SIGNAL_LOG_DTYPE)
+        self.size = 0
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        with self.lock:
+            return {"max_records": self.max_records, "records": self.records[:self.size].copy(), "size": self.size}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def append(self, index, signals):
+        hud = signals["hud"]
+        forecasts = signals["fractal_forecasts"]
+        regime = signals.get("regime") or {}
+        record = (
+            index, pd.Timestamp(signals["last_round"]).value, hud["score"], HUD_BANNERS.index(hud["banner"]),
+            sum(1 << HUD_REASONS.index(r) for r in hud["reasons"] if r in HUD_REASONS),
+            np.nan if signals["msi"] is None else signals["msi"], signals["tpi"], signals["rrqi"],
+            NEXT_ROUND_LABELS.index(signals["next_round"]["classification"]),
+            {"UP": 1, "DOWN": -1}.get(signals["resonance_prediction"], 0),
+            encode_round_type(forecasts[max(forecasts)] if forecasts else None),
+            encode_round_type(signals["anchor_forecast"]),
+            REGIME_LABELS.index(regime["label"]) if regime.get("label") in REGIME_LABELS else 0,
+        )
+        with self.lock:
+            self.size = int(np.searchsorted(self.records["index"][:self.size], index))
+            if self.size == len(self.records):
+                keep = self.records[max(self.size - self.max_records + 1, 0):self.size]
+                self.records = np.zeros(min(2 * len(self.records), self.max_records + 1024), dtype=SIGNAL_LOG_DTYPE)
+                self.records[:len(keep)] = keep
+                self.size = len(keep)
+            self.records[self.size] = record
+            self.size += 1
+
+    def frame(self):
+        with self.lock:
+            records = self.records[:self.size].copy()
+        return pd.DataFrame({
+            "index": records["index"],
+            "timestamp": pd.to_datetime(records["timestamp"]),
+            "hud_score": records["hud_score"],
+            "banner": np.array(HUD_BANNERS)[records["banner"]],
+            "reasons": records["reasons"],
+            "msi": records["msi"],
+            "tpi": records["tpi"],
+            "rrqi": records["rrqi"],
+            "next_round": np.array(NEXT_ROUND_LABELS)[records["next_round"]],
+            "resonance": records["resonance"],
+            "fractal": np.array(["—", *ROUND_TYPE_CHARS])[records["fractal"]],
+            "anchor": np.array(["—", *ROUND_TYPE_CHARS])[records["anchor"]],
+            "regime": np.array(REGIME_LABELS)[records["regime"]],
+        })
+
+
+def signal_timeline_panel(log, last_n=500):
+    history = log.frame().tail(last_n)
+    if history.empty:
+        st.info("No signals logged yet.")
+        return
+    plt = get_plt()
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 6), sharex=True)
+    x = history["timestamp"]
+    banner_colors = {"🟢 ENTRY CONFIRMED": "#22c55e", "🟡 SCOUT ZONE": "#facc15", "🔴 HOLD FIRE": "#ef4444"}
+    ax1.step(x, history["hud_score"], where="post", color="black", lw=1.5, label="HUD score")
+    ax1.scatter(x, history["hud_score"], c=history["banner"].map(banner_colors), s=25, zorder=3)
+    up, down = history["resonance"] > 0, history["resonance"] < 0
+    ax1.scatter(x[up], history["hud_score"][up] + 0.4, marker="^", color="green", s=20, label="Resonance ↑")
+    ax1.scatter(x[down], history["hud_score"][down] - 0.4, marker="v", color="red", s=20, label="Resonance ↓")
+    ax1.axhline(4, color="#22c55e", ls=":", lw=1)
+    ax1.axhline(2, color="#facc15", ls=":", lw=1)
+    ax1.set_ylabel("HUD score")
+    ax1.legend(loc="upper left")
+    ax1.set_title("🕰️ Signal Timeline")
+    ax2.plot(x, history["tpi"], color="purple", lw=1.2, label="TPI")
+    ax2.plot(x, history["rrqi"], color="teal", lw=1.2, label="RRQI")
+    ax2.axhline(0.3, color="teal", ls=":", lw=1)
+    ax2.axhline(-0.2, color="teal", ls=":", lw=1)
+    ax2.axhline(0, color="gray", ls="--", lw=0.8)
+    ax2.legend(loc="upper left")
+    plt.tight_layout()
+    st.pyplot(fig)
+    plt.close(fig)
+
+    recent = history.tail(20).iloc[::-1].copy()
+    recent["reasons"] = [", ".join(r for bit, r in enumerate(HUD_REASONS) if mask >> bit & 1)
+                         for mask in recent["reasons"]]
+    st.dataframe(recent.drop(columns=["index"]), hide_index=True)
+
+
+# === Client-Side Charts ===
+# Vega-Lite versions of the heaviest matplotlib panels: the browser draws the
+# chart, and the server only ships a decimated table of the plotted series.
+CHART_MAX_POINTS = 1200
+
+def decimate_positions(*series, max_points=CHART_MAX_POINTS, offset=0):
+    """Row positions keeping each bucket's min and max of every series, plus the first and last row.
+
+    Buckets are a power-of-two number of rounds aligned to absolute round
+    numbers (``offset`` is the index of row 0), so the output is stable
+    between reruns: a new round only changes the newest bucket.
+    """
+    n = len(series[0])
+    if n <= max_points:
+        return np.arange(n)
+    width = 1 << int(np.ceil(np.log2(2 * len(series) * n / max_points)))
+    bucket = (np.arange(n) + offset) // width
+    starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    keep = [np.array([0, n - 1])]
+    for values in series:
+        order = np.lexsort((np.nan_to_num(np.asarray(values, dtype=float)), bucket))
+        keep += [order[starts], order[ends]]
+    return np.unique(np.concatenate(keep))
+
+def epoch_ms(timestamps):
+    return pd.to_datetime(pd.Series(timestamps)).to_numpy().astype("datetime64[ms]").astype(np.int64)
+
+def chart_data(timestamps, positions, **series):
+    """Compact table for a client-side chart: epoch-ms ``t`` plus each series at ``positions`` as float32."""
+    data = {"t": epoch_ms(timestamps)[positions]}
+    for name, values in series.items():
+        if values is not None:
+            data[name] = np.asarray(values, dtype=float)[positions].round(3).astype(np.float32)
+    return pd.DataFrame(data)
+
+def level_rules(levels, dash=(4, 4)):
+    """Horizontal reference lines: ``levels`` maps y values to colors."""
+    alt = get_alt()
+    rules = pd.DataFrame({"y": list(levels), "color": list(levels.values())})
+    return alt.Chart(rules).mark_rule(strokeDash=list(dash)).encode(
+        y="y:Q", color=alt.Color("color:N", scale=None))
+
+def series_lines(data, colors, dash=None, title=None):
+    """One line per column in ``colors`` (column -> color), folded client-side so the table stays wide."""
+    alt = get_alt()
+    names = [c for c in colors if c in data]
+    return alt.Chart(data).transform_fold(names, as_=["series", "value"]).mark_line(
+        strokeDash=list(dash) if dash else alt.Undefined).encode(
+        x=alt.X("t:T", title=None),
+        y=alt.Y("value:Q", title=title),
+        color=alt.Color("series:N", scale=alt.Scale(domain=names, range=[colors[c] for c in names]),
+                        legend=alt.Legend(title=None, orient="top")),
+        tooltip=[alt.Tooltip("t:T", format="%H:%M:%S"), "series:N", "value:Q"])
+
+def msi_altair_chart(df, offset, harmonic_wave, micro_wave, forecast_times, harmonic_forecast, rrqi_val, regime):
+    alt = get_alt()
+    N = len(df)
+    positions = decimate_positions(df["msi"], offset=offset)
+    data = chart_data(
+        df["timestamp"], positions, msi=df["msi"],
+        bb_upper_20=df["bb_upper_20"], bb_lower_20=df["bb_lower_20"], bb_mid_20=df["bb_mid_20"],
+        bb_upper_10=df["bb_upper_10"], bb_lower_10=df["bb_lower_10"],
+        bb_upper_40=df["bb_upper_40"], bb_lower_40=df["bb_lower_40"],
+        harmonic=harmonic_wave if harmonic_wave is not None and len(harmonic_wave) == N else None,
+        micro=micro_wave if micro_wave is not None and len(micro_wave) == N and np.any(micro_wave) else None)
+    x = alt.X("t:T", title=None)
+    layers = [level_rules({0: "black"}, dash=(6, 4))]
+
+    # MSI zones, broken wherever the zone condition fails
+    for expr, color, opacity in (("datum.msi >= 6", "#905AAF", 0.3), ("datum.msi > 3 && datum.msi < 6", "#00ffff", 0.3),
+                                 ("datum.msi <= -3", "#ff3333", 0.8)):
+        layers.append(alt.Chart(data).transform_calculate(zone=f"{expr} ? datum.msi : null").mark_area(
+            color=color, opacity=opacity, invalid=None).encode(x=x, y="zone:Q", y2=alt.datum(0)))
+
+    # Squeeze runs as shaded spans (one rect per run instead of one per round)
+    squeeze = df["bb_squeeze_flag"].to_numpy(dtype=bool)
+    if squeeze.any():
+        edges = np.flatnonzero(np.diff(np.r_[False, squeeze, False].astype(np.int8)))
+        ts = epoch_ms(df["timestamp"])
+        spans = pd.DataFrame({"start": ts[edges[::2]] - 15_000, "end": ts[edges[1::2] - 1] + 15_000})
+        layers.append(alt.Chart(spans).mark_rect(color="purple", opacity=0.5).encode(x="start:T", x2="end:T"))
+
+    # Regime change points (solid) and MSI level breaks (dotted)
+    ts = epoch_ms(df["timestamp"])
+    marks = [(ts[index - offset], "green" if direction > 0 else "red", kind)
+             for kind, changes in (("score", regime["score_changes"]), ("msi", regime["msi_changes"]))
+             for index, direction in changes if 0 <= index - offset < N]
+    if marks:
+        marks = pd.DataFrame(marks, columns=["t", "color", "kind"])
+        layers.append(alt.Chart(marks).mark_rule(strokeWidth=2, opacity=0.8).encode(
+            x="t:T", color=alt.Color("color:N", scale=None),
+            strokeDash=alt.StrokeDash("kind:N", scale=alt.Scale(domain=["score", "msi"], range=[[1, 0], [2, 3]]),
+                                      legend=None)))
+
+    layers.append(series_lines(data, {"bb_upper_20": "maroon", "bb_lower_20": "maroon", "bb_upper_10": "#0AEFFF",
+                                      "bb_lower_10": "#0AEFFF", "bb_upper_40": "black", "bb_lower_40": "black"},
+                               dash=(5, 3)).encode(color=alt.value("gray"), detail="series:N", opacity=alt.value(0.8)))
+    layers.append(series_lines(data, {"msi": "black", "harmonic": "blue", "micro": "#444444"}, title="MSI"))
+    if rrqi_val:
+        layers.append(level_rules({rrqi_val: "cyan"}, dash=(2, 2)))
+    if harmonic_forecast is not None and len(harmonic_forecast) > 0:
+        forecast = pd.DataFrame({"t": epoch_ms(forecast_times), "forecast": np.round(harmonic_forecast, 3)})
+        layers.append(alt.Chart(forecast).mark_line(color="green", strokeWidth=2, point=True).encode(
+            x="t:T", y="forecast:Q"))
+    return alt.layer(*layers).properties(height=480, title="MSI Tactical Map + Harmonics").interactive(bind_y=False)
+
+def thre_altair_chart(timestamps, smooth_rds, rds_delta, offset=0):
+    alt = get_alt()
+    data = chart_data(timestamps, decimate_positions(smooth_rds, rds_delta, offset=offset),
+                      rds=smooth_rds, delta=rds_delta)
+    top = alt.layer(level_rules({1.5: "green", 0.5: "blue", -0.5: "orange", -1.5: "red"}),
+                    series_lines(data, {"rds": "cyan"})).properties(
+        height=220, title="Composite Harmonic Resonance Strength")
+    bottom = alt.layer(level_rules({0: "gray"}, dash=(2, 2)), series_lines(data, {"delta": "purple"})).properties(
+        height=220, title="RDS Inflection Detector")
+    return alt.vconcat(top.interactive(bind_y=False), bottom.interactive(bind_y=False)).resolve_scale(
+        x="shared", color="independent")
+
+def cos_phase_altair_chart(timestamps, cos_phase, offset=0):
+    alt = get_alt()
+    positions = decimate_positions(cos_phase["dom_wave"], cos_phase["micro_wave"], cos_phase["alignment_score"],
+                                   offset=offset)
+    data = chart_data(timestamps, positions, dominant=cos_phase["dom_wave"], micro=cos_phase["micro_wave"],
+                      alignment=cos_phase["alignment_score"], smoothed=cos_phase["smoothed_score"])
+    top = series_lines(data, {"dominant": "blue", "micro": "green"}).properties(
+        height=220, title="Dominant vs Micro Harmonics")
+    bottom = alt.layer(level_rules({0.5: "gray", -0.5: "gray"}),
+                       series_lines(data, {"alignment": "purple", "smoothed": "#c084fc"})).properties(
+        height=220, title="Cosine Phase Alignment Oscillator")
+    return alt.vconcat(top.interactive(bind_y=False), bottom.interactive(bind_y=False)).resolve_scale(
+        x="shared", color="independent")
+
+def anchor_altair_chart(hist_vals, curr_vals, proj_vals):
+    alt = get_alt()
+    window = len(hist_vals)
+    past = pd.DataFrame({"round": np.arange(-window, 0), "Matched Past": np.round(hist_vals, 3),
+                         "Current": np.round(curr_vals, 3)}).melt("round", var_name="series", value_name="msi")
+    proj = pd.DataFrame({"round": np.arange(1, len(proj_vals) + 1), "msi": np.round(proj_vals, 3)})
+    proj["color"] = np.where(proj["msi"] > 0, "purple", "red")
+    lines = alt.Chart(past).mark_line(strokeWidth=2).encode(
+        x=alt.X("round:Q", title="Relative Time (Rounds)"), y=alt.Y("msi:Q", title="MSI Value"),
+        color=alt.Color("series:N", scale=alt.Scale(domain=["Matched Past", "Current"], range=["gray", "blue"]),
+                        legend=alt.Legend(title=None, orient="top")),
+        strokeDash=alt.StrokeDash("series:N", scale=alt.Scale(domain=["Matched Past", "Current"],
+                                                              range=[[1, 0], [6, 4]]), legend=None))
+    projected = alt.Chart(proj).mark_line(color="green", strokeWidth=2).encode(x="round:Q", y="msi:Q")
+    points = alt.Chart(proj).mark_circle(size=100, opacity=0.7, stroke="black").encode(
+        x="round:Q", y="msi:Q", color=alt.Color("color:N", scale=None))
+    return alt.layer(level_rules({0: "black"}), lines, projected, points).properties(
+        height=300, title="📡 Visual Fractal Anchor")
+
+
+# === Per-Round Feature Store ===
+class FeatureStore:
+    """Matcher features computed once per round, when the round arrives.
+
+    For every round it keeps the P/p/B code, the MSI, and for each configured
+    window size the |rfft| signature of the MSI slope over the window ending at
+    that round (plus its norm), and the MSI norm of the anchor window. Columns
+    live in growable arrays addressed by absolute round number; ``view``
+    returns contiguous slices, and old views stay valid because the buffers
+    are reallocated rather than shifted in place when they fill up.
+    """
+
+    def __init__(self, windows=(5, 8, 13), anchor_window=8, start=0, capacity=1024):
+        self.windows = tuple(windows)
+        self.anchor_window = anchor_window
+        self.base = start
+        self.n_seen = start
+        self.size = 0
+        self.columns = {"codes": np.zeros(capacity, dtype=np.uint8), "msi": np.zeros(capacity),
+                        "anchor_norms": np.zeros(capacity)}
+        for win in self.windows:
+            self.columns[f"signatures_{win}"] = np.zeros((capacity, win // 2 + 1))
+            self.columns[f"signature_norms_{win}"] = np.zeros(capacity)
+
+    def __getstate__(self):
+        # Only the filled rows; spare capacity is re-grown on the next extend
+        state = dict(self.__dict__)
+        state["columns"] = {name: arr[:self.size].copy() for name, arr in self.columns.items()}
+        return state
+
+    def checkpoint_view(self):
+        """Copy-on-write snapshot: filled rows are never rewritten, so the view shares them."""
+        view = object.__new__(FeatureStore)
+        view.__dict__.update(self.__dict__, columns={name: arr[:self.size] for name, arr in self.columns.items()})
+        return view
+
+    def _reserve(self, n, keep_from):
+        if self.size + n <= len(self.columns["codes"]):
+            return
+        drop = min(max(keep_from - self.base, 0), self.size)
+        kept = self.size - drop
+        capacity = max(2 * (kept + n), 1024)
+        for name, arr in self.columns.items():
+            grown = np.zeros((capacity,) + arr.shape[1:], dtype=arr.dtype)
+            grown[:kept] = arr[drop:self.size]
+            self.columns[name] = grown
+        self.base += drop
+        self.size = kept
+
+    def extend(self, scores, msi, keep_from=None):
+        """Add rounds; rows before absolute round ``keep_from`` may be dropped to make room."""
+        n = len(scores)
+        if not n:
+            return
+        self._reserve(n, self.base if keep_from is None else keep_from)
+        cols = self.columns
+        lo, hi = self.size, self.size + n
+        cols["codes"][lo:hi] = round_type_codes(scores)
+        cols["msi"][lo:hi] = np.nan_to_num(np.asarray(msi, dtype=float))
+        m = cols["msi"]
+        for win in self.windows:
+            first = max(lo, win - 1)
+            if hi > first:
+                sig = window_signatures(m[first - win + 1:hi], win)
+                cols[f"signatures_{win}"][first:hi] = sig
+                cols[f"signature_norms_{win}"][first:hi] = np.linalg.norm(sig, axis=1)
+        first = max(lo, self.anchor_window - 1)
+        if hi > first:
+            windows = np.lib.stride_tricks.sliding_window_view(m[first - self.anchor_window + 1:hi],
+                                                               self.anchor_window)
+            cols["anchor_norms"][first:hi] = np.linalg.norm(windows, axis=1)
+        self.size = hi
+        self.n_seen += n
+
+    def view(self, start, stop):
+        """Column slices for absolute rounds [start, stop); signature row i is the window ending at i."""
+        a, b = start - self.base, stop - self.base
+        return {name: arr[a:b] for name, arr in self.columns.items()}
+
+
+def sync_feature_store(store, scores, msi, msi_window, start=0):
+    """Feature rows for the rounds in view, extracting features only for new rounds."""
+    key = f"features_{msi_window}"
+    features = store.get(key)
+    if features is None or not features.base <= start <= features.n_seen <= start + len(scores):
+        features = FeatureStore(FPM_WINDOWS, start=start)
+        store[key] = features
+    new = slice(features.n_seen - start, None)
+    features.extend(scores[new], msi[new], keep_from=start)
+    return features.view(start, start + len(scores))
+
+
+# === Fractal Matching (FPM + Anchor) ===
+
+def fractal_pulse_match(features, win, horizon=3):
+    """Best historical match for the last ``win`` rounds by MSI-slope FFT shape and P/p/B pattern.
+
+    Signatures come precomputed from the feature store, so the scan is only
+    similarity arithmetic over array views.
+    """
+    codes = features["codes"]
+    signatures = features[f"signatures_{win}"]
+    current_codes = codes[-win:]
+    current_slope = np.gradient(features["msi"][-win:])
+    current_fft = signatures[-1]
+
+    match = {"win": win, "current_pattern": ROUND_TYPE_CHARS[current_codes].tolist(),
+             "current_slope": current_slope, "current_fft": current_fft, "current_codes": current_codes,
+             "best_match": None, "best_score": -np.inf, "next_outcome": None}
+    n_hist = len(codes) - win - horizon
+    if n_hist <= 0:
+        return match
+
+    hist_fft = signatures[win - 1:win - 1 + n_hist]
+    norms = features[f"signature_norms_{win}"][win - 1:win - 1 + n_hist] * features[f"signature_norms_{win}"][-1]
+    sim_score = np.divide(hist_fft @ current_fft, norms, out=np.zeros(n_hist), where=norms > 0)
+    hist_codes = np.lib.stride_tricks.sliding_window_view(codes, win)[:n_hist]
+    pattern_match = (hist_codes == current_codes).sum(axis=1) / win
+    total_score = 0.6 * sim_score + 0.4 * pattern_match
+
+    i = int(np.argmax(total_score))
+    match["best_score"] = float(total_score[i])
+    match["best_match"] = ROUND_TYPE_CHARS[hist_codes[i]].tolist()
+    match["next_outcome"] = ROUND_TYPE_CHARS[codes[i+win:i+win+horizon]].tolist()
+    return match
+
+
+def fractal_anchor_match(features, window=8, horizon=3):
+    """Best historical MSI fragment for the last ``window`` rounds; None if history is too short."""
+    codes = features["codes"]
+    if len(codes) < window + 10:
+        return None
+    msi = features["msi"]
+    n_hist = len(codes) - window - horizon
+
+    hist_vecs = np.lib.stride_tricks.sliding_window_view(msi, window)[:n_hist]
+    recent_vec = msi[-window:]
+    norms = features["anchor_norms"][window - 1:window - 1 + n_hist] * features["anchor_norms"][-1]
+    shape_score = np.divide(hist_vecs @ recent_vec, norms, out=np.zeros(n_hist), where=norms > 0)
+    hist_codes = np.lib.stride_tricks.sliding_window_view(codes, window)[:n_hist]
+    type_match = (hist_codes == codes[-window:]).sum(axis=1) / window
+    total_score = 0.6 * shape_score + 0.4 * type_match
+
+    i = int(np.argmax(total_score))
+    return {"window": window, "best_score": float(total_score[i]), "best_start": i,
+            "future_types": ROUND_TYPE_CHARS[codes[i+window:i+window+horizon]].tolist()}
+
+
+def thre_compute(scores):
+    """Composite harmonic resonance (THRE) series; None below 20 rounds."""
+    N = len(scores)
+    if N < 20:
+        return None
+    yf = rfft(scores - np.mean(scores))
+    xf = rfftfreq(N, 1)
+    mask = (xf > 0) & (xf < 0.5)
+    freqs = xf[mask]
+    amps = np.abs(yf[mask])
+    phases = np.angle(yf[mask])
+    harmonic_matrix = np.sin(2 * np.pi * np.arange(N)[:, None] * freqs + phases)
+
+    composite_signal = harmonic_matrix @ amps
+    normalized_signal = (composite_signal - np.mean(composite_signal)) / np.std(composite_signal)
+    smooth_rds = pd.Series(normalized_signal).rolling(3, min_periods=1).mean().values
+    return {"smooth_rds": smooth_rds, "rds_delta": np.gradient(smooth_rds)}
+
+
+def cos_phase_compute(N, dom_freq, micro_freq, dom_phase, micro_phase, forecast_len=10):
+    """Dominant/micro waves and their cosine phase alignment; None without both waves."""
+    if not (N >= 20 and dom_freq > 0 and micro_freq > 0):
+        return None
+    t = np.arange(N)
+    phase_diff = 2 * np.pi * (dom_freq - micro_freq) * t + (dom_phase - micro_phase)
+    alignment_score = np.cos(phase_diff)
+    future_t = np.arange(N, N + forecast_len)
+    return {
+        "dom_wave": np.sin(2 * np.pi * dom_freq * t + dom_phase),
+        "micro_wave": np.sin(2 * np.pi * micro_freq * t + micro_phase),
+        "alignment_score": alignment_score,
+        "smoothed_score": pd.Series(alignment_score).rolling(5, min_periods=1).mean().values,
+        "future_align": np.cos(2 * np.pi * (dom_freq - micro_freq) * future_t + (dom_phase - micro_phase)),
+    }
+
+
+def fractal_forecast_types(fpm_matches, anchor):
+    """HUD inputs: joined outcome of the longest FPM window and the anchor forecast."""
+    fractal_match_type = '-'.join(fpm_matches[-1]["next_outcome"]) if fpm_matches else None
+    anchor_forecast_type = ' '.join(anchor["future_types"]) if anchor and anchor["best_start"] is not None else None
+    return fractal_match_type, anchor_forecast_type
+
+
+def build_signals(fields, rrqi_val, fpm_matches, anchor, regime=None):
+    """Machine-readable snapshot of every headline signal, served by the local API."""
+    df = fields["df"]
+    forecast = fields["resonance_forecast_vals"]
+    classification, action, energy_index = classify_next_round(
+        forecast, fields["tension"], fields["entropy"], fields["resonance_score"])
+    fractal_match_type, anchor_forecast_type = fractal_forecast_types(fpm_matches, anchor)
+    hud_score, banner, status, reasons = hud_signal(
+        fields["wave_label"] or "N/A", fields["micro_phase_label"] or "N/A",
+        fields["resonance_score"], fractal_match_type, anchor_forecast_type)
+    latest_msi = fields["latest_msi"]
+    return {
+        "rounds": len(df),
+        "last_round": df["timestamp"].iloc[-1],
+        "hud": {"score": hud_score, "banner": banner, "status": status, "reasons": reasons},
+        "msi": None if pd.isna(latest_msi) else float(latest_msi),
+        "tpi": fields["latest_tpi"],
+        "rrqi": rrqi_val,
+        "next_round": {"classification": classification, "action": action,
+                       "energy_index": float(energy_index)},
+        "resonance_prediction": None if forecast is None else ("UP" if forecast[0] > 0 else "DOWN"),
+        "dominant_phase": fields["wave_label"],
+        "micro_phase": fields["micro_phase_label"],
+        "fractal_forecasts": {m["win"]: m["next_outcome"] for m in fpm_matches or []},
+        "anchor_forecast": anchor["future_types"] if anchor else None,
+        "regime": None if regime is None else {k: regime[k] for k in (
+            "label", "last_change", "last_direction", "rounds_since_change")},
+    }
+
+
+# Only runs when a new round was added: StreamEngine publishes one result per
+# history version, so a per-frame st.cache_data entry would only pile up copies
+def analyze_data(data, pink_threshold, window_size, num_harmonics=5, micro_peak=None, spectrum=None):
     df = data.copy()
     df["timestamp"] = pd.to_datetime(df["timestamp"])
-    df["type"] = df["multiplier"].apply(lambda x: "Pink" if x >= PINK_THRESHOLD else ("Purple" if x >= 2 else "Blue"))
-    df["msi"] = df["score"].rolling(WINDOW_SIZE).sum()
-    df["momentum"] = df["score"].cumsum()
+    # Type, MSI, momentum, multi-window BBs on MSI, band slopes/accels, squeeze
+    # (shared with the feature export so both always agree)
+    derive_features(df, pink_threshold, window_size)
             # === Define latest_msi safely ===
     latest_msi = df["msi"].iloc[-1] if not df["msi"].isna().all() else 0
-    latest_tpi = compute_tpi(df, window=WINDOW_SIZE)
-    
-# Multi-window BBs on MSI
-
-    df["bb_mid_20"], df["bb_upper_20"], df["bb_lower_20"] = bollinger_bands(df["msi"], 20, 2)
-    df["bb_mid_10"], df["bb_upper_10"], df["bb_lower_10"] = bollinger_bands(df["msi"], 10, 1.5)
-    df["bb_mid_40"], df["bb_upper_40"], df["bb_lower_40"] = bollinger_bands(df["msi"], 40, 2.5)
-    df['bandwidth'] = df["bb_upper_10"] - df["bb_lower_10"]  # Width of the band
-    
-    # Compute slope (1st derivative) for upper/lower bands
-    df['upper_slope'] = df["bb_upper_10"].diff()
-    df['lower_slope'] = df["bb_lower_10"].diff()
-    
-    # Compute acceleration (2nd derivative) for upper/lower bands
-    df['upper_accel'] = df['upper_slope'].diff()
-    df['lower_accel'] = df['lower_slope'].diff()
-    
-        # How fast the band is expanding or shrinking
-    df['bandwidth_delta'] = df['bandwidth'].diff()
+    latest_tpi = compute_tpi(df, window=window_size)
         
         # Pull latest values from the last row
     latest = df.iloc[-1]
@@ -414,10 +2828,7 @@ def analyze_data(data, pink_threshold, window_size):
               
         
     
-    df["bb_squeeze"] = df["bb_upper_10"] - df["bb_lower_10"]
-    df["bb_squeeze_flag"] = df["bb_squeeze"] < df["bb_squeeze"].rolling(5).quantile(0.25)
-    
-    
+
         # === Harmonic Cycle Estimation ===
     
     scores = df["score"].fillna(0).values
@@ -426,12 +2837,16 @@ def analyze_data(data, pink_threshold, window_size):
         
         # === Harmonic Analysis ===
     # === Unified Harmonic Processing ===
-    yf = rfft(scores - np.mean(scores))
-    xf = rfftfreq(N, T)
+    # (xf, yf) of the full window straight from the stream's resonator bank when available
+    if spectrum is not None:
+        xf, yf = spectrum
+    else:
+        yf = rfft(scores - np.mean(scores))
+        xf = rfftfreq(N, T)
     #gamma_amplitude = np.max(np.abs(yf)) if len(yf) > 0 else 0
     
     # Always detect dominant cycle first
-    dominant_cycle = detect_dominant_cycle(scores)
+    dominant_cycle = dominant_cycle_of(xf, yf) if N >= 20 else None
     
     # Get dominant frequency (even if cycle not detected)
     dominant_freq = 0
@@ -461,9 +2876,6 @@ def analyze_data(data, pink_threshold, window_size):
         current_round_position = len(scores) % dominant_cycle
         wave_label, wave_pct = get_phase_label(current_round_position, dominant_cycle)
         
-            # Recompute FFT for wave fitting
-        yf = rfft(scores - np.mean(scores))
-        xf = rfftfreq(N, T)
         idx_max = np.argmax(np.abs(yf[1:])) + 1
         dominant_freq = xf[idx_max]
             
@@ -485,18 +2897,16 @@ def analyze_data(data, pink_threshold, window_size):
         # === MICRO WAVE DETECTION (Always runs) ===
         # Smart frequency targeting
         # === Micro Wave Detection ===
-        mask_micro = (xf > 0.08) & (xf < 0.15)
-        micro_idx = np.argmax(np.abs(yf[mask_micro])) + 1 if np.any(mask_micro) else 0
-        micro_freq = xf[micro_idx] if micro_idx < len(xf) else 0
-        micro_phase = np.angle(yf[micro_idx]) if micro_idx < len(yf) else 0
+        # (frequency, phase, amplitude) from the stream's resonator bank when available
+        if micro_peak is not None:
+            micro_freq, micro_phase, micro_amplitude = micro_peak
+        else:
+            micro_idx = micro_band_peak(yf, xf, MICRO_BAND)
+            micro_freq = xf[micro_idx]
+            micro_phase = np.angle(yf[micro_idx])
+            micro_amplitude = np.abs(yf[micro_idx]) if micro_idx else 0  # Maximum amplitude in micro band
         micro_wave = np.sin(2 * np.pi * micro_freq * np.arange(N) + micro_phase)
         micro_slope = np.polyfit(np.arange(N), micro_wave, 1)[0] if N > 1 else 0
-        
-        if np.any(mask_micro):
-            micro_amplitudes = np.abs(yf[mask_micro])
-            micro_amplitude = np.max(micro_amplitudes)  # Get maximum amplitude in micro band
-        else:
-            micro_amplitude = 0
         micro_cycle_len = round(1 / micro_freq) if micro_freq else None
         micro_position = (N - 1) % micro_cycle_len + 1 if micro_cycle_len else None
         micro_phase_label, micro_pct = get_phase_label(micro_position, micro_cycle_len) if micro_cycle_len else ("N/A", None)
@@ -528,10 +2938,11 @@ def analyze_data(data, pink_threshold, window_size):
         
     if N >= 10:  # Need at least 10 rounds
     # Run super-powered harmonic scan
-            harmonic_waves, resonance_matrix, resonance_score, tension, entropy = multi_harmonic_resonance_analysis(df)
+            harmonic_waves, resonance_matrix, resonance_score, tension, entropy = multi_harmonic_resonance_analysis(
+                df, num_harmonics)
             
             # Predict next 5 rounds
-            resonance_forecast_vals  = resonance_forecast(harmonic_waves, resonance_matrix) if harmonic_waves else None
+            resonance_forecast_vals  = resonance_forecast(harmonic_waves, resonance_matrix) if len(harmonic_waves) else None
     else:
             harmonic_waves = resonance_matrix = resonance_score = tension = entropy = None  
             resonance_forecast_vals = None
@@ -541,18 +2952,284 @@ def analyze_data(data, pink_threshold, window_size):
     return df, latest_msi, latest_tpi, upper_slope, lower_slope, upper_accel, lower_accel, bandwidth, bandwidth_delta, dominant_cycle, current_round_position, wave_label, wave_pct, dom_slope, micro_slope, eis, interference, harmonic_wave, micro_wave, harmonic_forecast, forecast_times,micro_pct, micro_phase_label, micro_freq, dominant_freq, phase, gamma_amplitude, micro_amplitude , micro_phase, micro_cycle_len, micro_position, harmonic_waves, resonance_matrix, resonance_score, tension, entropy, resonance_forecast_vals
     # === RRQI Calculation ===
     rrqi_val = rrqi(df, 30)
-if not df.empty:
+
+
+ANALYSIS_FIELDS = (
+    "df", "latest_msi", "latest_tpi", "upper_slope", "lower_slope", "upper_accel", "lower_accel",
+    "bandwidth", "bandwidth_delta", "dominant_cycle", "current_round_position", "wave_label",
+    "wave_pct", "dom_slope", "micro_slope", "eis", "interference", "harmonic_wave", "micro_wave",
+    "harmonic_forecast", "forecast_times", "micro_pct", "micro_phase_label", "micro_freq",
+    "dominant_freq", "phase", "gamma_amplitude", "micro_amplitude", "micro_phase",
+    "micro_cycle_len", "micro_position", "harmonic_waves", "resonance_matrix", "resonance_score",
+    "tension", "entropy", "resonance_forecast_vals",
+)
+
+FPM_WINDOWS = (5, 8, 13)
+
+
+@st.cache_resource(show_spinner=False)
+def get_panel_pool():
+    return ThreadPoolExecutor(max_workers=min(32, os.cpu_count() or 4), thread_name_prefix="panel")
+
+
+class PanelStages:
+    """Independent post-analysis computations for one stream version.
+
+    Each stage is submitted to the worker pool the first time any viewer asks
+    for it, so toggled-off panels cost nothing and shared streams compute each
+    stage once. Stages only take arrays and return arrays, lists or dicts.
+    """
+
+    def __init__(self, pool, jobs):
+        self.pool = pool
+        self.jobs = jobs
+        self.futures = {}
+        self.lock = threading.Lock()
+        self.callbacks = {}
+
+    def future(self, name):
+        with self.lock:
+            fut = self.futures.get(name)
+            if fut is None:
+                fn, args = self.jobs[name]
+                fut = self.futures[name] = self.pool.submit(fn, *args)
+                for callback in self.callbacks.pop(name, ()):
+                    fut.add_done_callback(callback)
+            return fut
+
+    def on_done(self, name, callback):
+        """Run ``callback(future)`` when stage ``name`` finishes, if it is ever started."""
+        with self.lock:
+            if name not in self.jobs:
+                return
+            fut = self.futures.get(name)
+            if fut is None:
+                self.callbacks.setdefault(name, []).append(callback)
+        if fut is not None:
+            fut.add_done_callback(callback)
+
+
+def when_all(futures, fn):
+    """Future for ``fn(*results)`` once every future in ``futures`` is done (no pool thread waits)."""
+    out = Future()
+    remaining = [len(futures)]
+    lock = threading.Lock()
+
+    def done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        try:
+            out.set_result(fn(*[f.result() for f in futures]))
+        except Exception as exc:
+            out.set_exception(exc)
+
+    if not futures:
+        out.set_result(fn())
+    for f in futures:
+        f.add_done_callback(done)
+    return out
+
+
+def analyze_stream(store, snapshot, pink_threshold, window_size, num_harmonics=5, pinned_periods=()):
+    """Everything a session renders from, computed once per stream version."""
+    if snapshot["frame"].empty:
+        return None
+    start = snapshot["start"]
+    resonators = sync_resonator_bank(store, snapshot["frame"]["score"].fillna(0).to_numpy(dtype=float), start)
+    resonators.track_bins(snapshot["capacity"])
+    analysis = analyze_data(snapshot["frame"], pink_threshold, window_size, num_harmonics,
+                            resonators.micro_peak(), resonators.rfft_bins())
+    fields = dict(zip(ANALYSIS_FIELDS, analysis))
+    resonators.track([fields["dominant_freq"], *(1 / p for p in pinned_periods)])
+    dom_phase = resonators.at(fields["dominant_freq"])[1] if fields["dominant_freq"] else fields["phase"]
+    df = fields["df"]
+    scores = df["score"].fillna(0).values
+    msi = df["msi"].values
+    rrqi_val = rrqi(df, 30)
+    features = sync_feature_store(store, scores, msi, window_size, start)
+
+    fpm_ready = len(df) >= max(FPM_WINDOWS) + 5
+    jobs = {
+        "thre": (thre_compute, (scores,)),
+        "cos_phase": (cos_phase_compute, (len(scores), fields["dominant_freq"], fields["micro_freq"],
+                                          dom_phase, fields["micro_phase"])),
+        "rqcf": (run_rqcf, (scores,)),
+        "anchor": (fractal_anchor_match, (features,)),
+    }
+    if fpm_ready:
+        jobs.update({f"fpm_{win}": (fractal_pulse_match, (features, win)) for win in FPM_WINDOWS})
+    stages = PanelStages(get_panel_pool(), jobs)
+    scorer = sync_prediction_scorer(store, scores, pink_threshold, window_size, num_harmonics, start)
+    record_predictions(scorer, start + len(scores), fields, stages, FPM_WINDOWS if fpm_ready else ())
+    regime = sync_regime_tracker(store, scores, msi, window_size, start).state(start)
+
+    # The API needs the fractal forecasts, so those stages always start
+    fractal_futures = [stages.future(f"fpm_{win}") for win in FPM_WINDOWS if fpm_ready]
+    fractal_futures.append(stages.future("anchor"))
+    signals = when_all(fractal_futures, lambda *matches: build_signals(
+        fields, rrqi_val, list(matches[:-1]) or None, matches[-1], regime))
+    # The signals depend on the sidebar settings, so each combination keeps its own log
+    signal_log = store.setdefault(f"signal_log_{pink_threshold}_{window_size}_{num_harmonics}", SignalLog())
+    last_index = start + len(df) - 1
+    signals.add_done_callback(lambda f: f.exception() is None and signal_log.append(last_index, f.result()))
+    return {
+        "analysis": analysis,
+        "rrqi": rrqi_val,
+        "fpm_ready": fpm_ready,
+        "stages": stages,
+        "signals": signals,
+        "total_rounds": start + len(df),
+        "archive": snapshot["archive"],
+        "spectrogram": copy.deepcopy(sync_spectrogram(store, scores, start)),
+        "ngram_stats": sync_ngram_index(store, scores, start).current_stats(),
+        "pattern_indexes": sync_pattern_indexes(store, features, df["timestamp"].values, window_size,
+                                                FPM_WINDOWS, offset=start),
+        "accuracy": scorer.summary(),
+        "regime": regime,
+        "signal_log": signal_log,
+        "resonators": resonators.summary(),
+    }
+
+
+def default_stream_compute(engine):
+    """Compute used when no session has viewed a stream yet (sidebar defaults)."""
+    return (10.0, 20, 5, ()), lambda snapshot, trackers: analyze_stream(trackers, snapshot, 10.0, 20, 5)
+
+
+# ================ LOCAL SIGNAL API ======================
+class SignalRequestHandler(BaseHTTPRequestHandler):
+    """JSON endpoints over the shared stream engines.
+
+    GET  /streams                    -> list of stream ids
+    GET  /streams/<id>/signals       -> latest published signals
+    GET  /streams/<id>/subscribe     -> server-sent events, one per new signal set
+    POST /streams/<id>/rounds        -> {"multiplier": 3.2[, "timestamp": iso]}
+    """
+
+    registry = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type="application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _route(self):
+        parts = [unquote(p) for p in self.path.split("?")[0].strip("/").split("/")]
+        if len(parts) == 3 and parts[0] == "streams":
+            return parts[1], parts[2]
+        return None, "/".join(parts)
+
+    def do_GET(self):
+        stream_id, action = self._route()
+        if stream_id is None:
+            if action == "streams":
+                return self._send(200, json.dumps(self.registry.ids()).encode())
+            return self._send(404, b'{"error": "not found"}')
+        engine = self.registry.get(stream_id)
+        if engine is None:
+            return self._send(404, b'{"error": "unknown stream"}')
+        if action == "signals":
+            with engine.signals_cond:
+                body = engine.signals_json
+            return self._send(200, body)
+        if action == "subscribe":
+            return self._stream_events(engine)
+        return self._send(404, b'{"error": "not found"}')
+
+    def _stream_events(self, engine):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        last = -1
+        try:
+            while True:
+                version, body = engine.wait_signals(last)
+                if version != last:
+                    self.wfile.write(b"id: %d\ndata: %s\n\n" % (version, body))
+                    last = version
+                else:
+                    self.wfile.write(b": keepalive\n\n")
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_POST(self):
+        stream_id, action = self._route()
+        if stream_id is None or action != "rounds":
+            return self._send(404, b'{"error": "not found"}')
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            mult = float(payload["multiplier"])
+            timestamp = datetime.fromisoformat(payload["timestamp"]) if payload.get("timestamp") else datetime.now()
+        except (ValueError, KeyError, TypeError):
+            return self._send(400, b'{"error": "expected {\\"multiplier\\": number}"}')
+
+        engine = self.registry.get(stream_id, create=True)
+        pink_threshold = engine.last_compute[0][0] if engine.last_compute else 10.0
+        score = score_round(mult, pink_threshold)
+        engine.append({"timestamp": timestamp, "multiplier": mult, "score": score})
+        engine.refresh_async(default_stream_compute(engine))
+        self._send(200, json.dumps({"version": engine.version, "score": score}).encode())
+
+
+@st.cache_resource(show_spinner=False)
+def start_signal_api(host, port):
+    """Serve the signal API from a daemon thread, once per process; None if the port is taken."""
+    handler = type("BoundSignalRequestHandler", (SignalRequestHandler,), {"registry": get_stream_registry()})
+    try:
+        server = ThreadingHTTPServer((host, port), handler)
+    except OSError:
+        return None
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+signal_api = start_signal_api(SIGNAL_API_HOST, SIGNAL_API_PORT)
+with st.sidebar:
+    if signal_api is None:
+        st.caption(f"🔌 Signal API unavailable (port {SIGNAL_API_PORT} in use)")
+    elif STREAM_ID:
+        st.caption(f"🔌 Signals: http://{SIGNAL_API_HOST}:{SIGNAL_API_PORT}/streams/{STREAM_ID}/signals")
+    else:
+        st.caption("🔌 Set a Stream ID to expose signals on the local API")
+
+results = engine.results((PINK_THRESHOLD, WINDOW_SIZE, NUM_HARMONICS, PINNED_PERIODS),
+                         lambda snapshot, trackers: analyze_stream(trackers, snapshot, PINK_THRESHOLD, WINDOW_SIZE,
+                                                                   NUM_HARMONICS, PINNED_PERIODS))
+if results is not None:
     (df, latest_msi, latest_tpi, upper_slope, lower_slope, upper_accel, lower_accel,
  bandwidth, bandwidth_delta, dominant_cycle, current_round_position,
  wave_label, wave_pct, dom_slope, micro_slope, eis, interference,
- harmonic_wave, micro_wave, harmonic_forecast, forecast_times,micro_pct, micro_phase_label, micro_freq, dominant_freq, phase, gamma_amplitude, micro_amplitude , micro_phase, micro_cycle_len, micro_position, harmonic_waves, resonance_matrix, resonance_score, tension, entropy, resonance_forecast_vals) = analyze_data(df, PINK_THRESHOLD, WINDOW_SIZE)
+ harmonic_wave, micro_wave, harmonic_forecast, forecast_times,micro_pct, micro_phase_label, micro_freq, dominant_freq, phase, gamma_amplitude, micro_amplitude , micro_phase, micro_cycle_len, micro_position, harmonic_waves, resonance_matrix, resonance_score, tension, entropy, resonance_forecast_vals) = results["analysis"]
    
     # === RRQI Calculation ===
-    rrqi_val = rrqi(df, 30)
+    rrqi_val = results["rrqi"]
 
     
     scores = df["score"].fillna(0).values
     N = len(scores)
+    history_start = results["total_rounds"] - N
+    regime = results["regime"]
+    spectrogram = results["spectrogram"]
+    st.session_state.completed_cycles = spectrogram.completed_cycles
+
+    # Independent panel stages run concurrently on the worker pool; each panel's
+    # slot is laid out in page order and filled as soon as its result arrives.
+    stages = results["stages"]
+    pending = {}
+    def schedule(name, slot, render):
+        pending[stages.future(name)] = (slot, render)
 
     
 
@@ -564,7 +3241,7 @@ if not df.empty:
     
     col_entry, col_hud = st.columns([2, 1])
     with col_entry:
-        st.metric("number of rounds", N)
+        st.metric("number of rounds", results["total_rounds"])
     
     with col_hud:
     # Add this below:
@@ -581,6 +3258,16 @@ if not df.empty:
     def plot_msi_chart(df, harmonic_wave, micro_wave, harmonic_forecast, forecast_times):
 
         st.subheader("Momentum Score Index (MSI)")
+        if CLIENT_CHARTS:
+            if harmonic_forecast is not None and len(harmonic_forecast) > 0:
+                forecast_times = [df["timestamp"].iloc[-1] + pd.Timedelta(seconds=5 * i)
+                                  for i in range(len(harmonic_forecast))]
+            st.altair_chart(msi_altair_chart(df, history_start, harmonic_wave,
+                                             micro_wave if micro_amplitude > 0 else None,
+                                             forecast_times, harmonic_forecast, rrqi_val, regime),
+                            width="stretch")
+            return
+        plt = get_plt()
         fig, ax = plt.subplots(figsize=(12, 8))
         fig.patch.set_facecolor('#0f172a')
         ax.set_facecolor('#EBF5FF')
@@ -620,6 +3307,14 @@ if not df.empty:
                            df["timestamp"].iloc[i] + pd.Timedelta(minutes=0.25),
                            color='purple', alpha=0.9)
     
+        # Regime change points (solid) and MSI level breaks (dotted)
+        for changes, style in ((regime["score_changes"], '-'), (regime["msi_changes"], ':')):
+            for index, direction in changes:
+                local = index - history_start
+                if 0 <= local < len(df):
+                    ax.axvline(df["timestamp"].iloc[local], color='green' if direction > 0 else 'red',
+                               linestyle=style, linewidth=2, alpha=0.8)
+
         # RRQI line (optional bubble)
         if rrqi_val:
             ax.axhline(rrqi_val, color='cyan', linestyle=':', alpha=0.9, label='RRQI Level')
@@ -677,6 +3372,7 @@ if not df.empty:
         
         if resonance_matrix is not None:
             # Colorful resonance grid
+            plt = get_plt()
             fig, ax = plt.subplots()
             cax = ax.matshow(resonance_matrix, cmap='viridis')
             fig.colorbar(cax, label='Resonance Strength')
@@ -708,48 +3404,37 @@ if not df.empty:
 
     
 
-    def thre_panel(df):
+    def thre_panel(timestamps, thre):
         st.subheader("🔬 True Harmonic Resonance Engine (THRE)")
-        if len(df) < 20: 
+        if thre is None: 
             st.warning("Need at least 20 rounds to compute THRE.")
-            return df
+            return
             
-        scores = df["score"].fillna(0).values
-        N = len(scores)
-        T = 1
-        yf = rfft(scores - np.mean(scores))
-        xf = rfftfreq(N, T)
-        mask = (xf > 0) & (xf < 0.5)
-        freqs = xf[mask]
-        amps = np.abs(yf[mask])
-        phases = np.angle(yf[mask])
-        harmonic_matrix = np.zeros((N, len(freqs)))
-        
-        for i, (f, p) in enumerate(zip(freqs, phases)):
-            harmonic_matrix[:, i] = np.sin(2 * np.pi * f * np.arange(N) + p)
-        
-        composite_signal = (harmonic_matrix * amps).sum(axis=1)
-        normalized_signal = (composite_signal - np.mean(composite_signal)) / np.std(composite_signal)
-        smooth_rds = pd.Series(normalized_signal).rolling(3, min_periods=1).mean()
-        rds_delta = np.gradient(smooth_rds)
+        smooth_rds = thre["smooth_rds"]
+        rds_delta = thre["rds_delta"]
         
-        fig, ax = plt.subplots(2, 1, figsize=(12, 6), sharex=True)
-        ax[0].plot(df["timestamp"], smooth_rds, label="THRE Resonance", color='cyan')
-        ax[0].axhline(1.5, linestyle='--', color='green', alpha=0.5)
-        ax[0].axhline(0.5, linestyle='--', color='blue', alpha=0.3)
-        ax[0].axhline(-0.5, linestyle='--', color='orange', alpha=0.3)
-        ax[0].axhline(-1.5, linestyle='--', color='red', alpha=0.5)
-        ax[0].set_title("Composite Harmonic Resonance Strength")
-        ax[0].legend()
-        
-        ax[1].plot(df["timestamp"], rds_delta, label="Δ Resonance Slope", color='purple')
-        ax[1].axhline(0, linestyle=':', color='gray')
-        ax[1].set_title("RDS Inflection Detector")
-        ax[1].legend()
-        
-        st.pyplot(fig)
+        if CLIENT_CHARTS:
+            st.altair_chart(thre_altair_chart(timestamps, smooth_rds, rds_delta, history_start),
+                            width="stretch")
+        else:
+            plt = get_plt()
+            fig, ax = plt.subplots(2, 1, figsize=(12, 6), sharex=True)
+            ax[0].plot(timestamps, smooth_rds, label="THRE Resonance", color='cyan')
+            ax[0].axhline(1.5, linestyle='--', color='green', alpha=0.5)
+            ax[0].axhline(0.5, linestyle='--', color='blue', alpha=0.3)
+            ax[0].axhline(-0.5, linestyle='--', color='orange', alpha=0.3)
+            ax[0].axhline(-1.5, linestyle='--', color='red', alpha=0.5)
+            ax[0].set_title("Composite Harmonic Resonance Strength")
+            ax[0].legend()
+
+            ax[1].plot(timestamps, rds_delta, label="Δ Resonance Slope", color='purple')
+            ax[1].axhline(0, linestyle=':', color='gray')
+            ax[1].set_title("RDS Inflection Detector")
+            ax[1].legend()
+
+            st.pyplot(fig)
         
-        latest_rds = smooth_rds.iloc[-1] if len(smooth_rds) > 0 else 0
+        latest_rds = smooth_rds[-1] if len(smooth_rds) > 0 else 0
         latest_delta = rds_delta[-1] if len(rds_delta) > 0 else 0
         
         st.metric("🧠 Resonance Strength", f"{latest_rds:.3f}")
@@ -760,62 +3445,50 @@ if not df.empty:
         elif latest_rds < -1.5: st.error("🌪️ Collapse Zone — Blue Train Likely")
         elif latest_rds < -0.5: st.warning("⚠️ Destructive Micro-Waves — High Risk")
         else: st.info("⚖️ Neutral Zone — Mid-Range Expected")
-        
-        return df
 
         
     if show_thre: 
-        with st.expander("🔬 True Harmonic Resonance Engine (THRE)"):
-            thre_panel(df)
+        schedule("thre", st.expander("🔬 True Harmonic Resonance Engine (THRE)"),
+                 lambda thre: thre_panel(df["timestamp"], thre))
 
-    def cos_phase_panel(df, dom_freq, micro_freq, dom_phase, micro_phase):
+    def cos_phase_panel(timestamps, cos_phase):
         st.subheader("🌀 Cosine Phase Alignment Panel")
-        if df is None or len(df) < 20:
+        if len(timestamps) < 20:
             st.warning("Need at least 20 rounds to compute Phase alignment.")
             return
-            
-        scores = df["score"].fillna(0).values
-        N = len(scores)
-        timestamps = df["timestamp"]
     
-        if N >= 20 and dom_freq > 0 and micro_freq > 0:
-            # Compute current waveforms
-            t = np.arange(N)
-            dom_wave = np.sin(2 * np.pi * dom_freq * t + dom_phase)
-            micro_wave = np.sin(2 * np.pi * micro_freq * t + micro_phase)
-    
-            phase_diff = 2 * np.pi * (dom_freq - micro_freq) * np.arange(N) + (dom_phase - micro_phase)
-            alignment_score = np.cos(phase_diff)
-            smoothed_score = pd.Series(alignment_score).rolling(5, min_periods=1).mean()
-
-    
-            # Forecast alignment (optional, next 10 rounds)
-            forecast_len = 10
-            future_t = np.arange(N, N + forecast_len)
-            future_align = np.cos(2 * np.pi * (dom_freq - micro_freq) * future_t + (dom_phase - micro_phase))
-            forecast_times = [timestamps.iloc[-1] + pd.Timedelta(seconds=5 * i) for i in range(forecast_len)]
+        if cos_phase is not None:
+            dom_wave = cos_phase["dom_wave"]
+            micro_wave = cos_phase["micro_wave"]
+            alignment_score = cos_phase["alignment_score"]
+            smoothed_score = cos_phase["smoothed_score"]
     
             # === Plotting ===
-            fig, ax = plt.subplots(2, 1, figsize=(12, 6), sharex=True)
-    
-            # Past wave alignment
-            ax[0].plot(timestamps, dom_wave, label="Dominant Wave", color='blue')
-            ax[0].plot(timestamps, micro_wave, label="Micro Wave", color='green', linestyle='dashdot')
-            ax[0].set_title("Dominant vs Micro Harmonics")
-            ax[0].legend()
-    
-            # Cosine phase alignment tracker
-            ax[1].plot(timestamps, alignment_score, label="Cos(Δϕ)", color='purple')
-            ax[1].plot(timestamps, smoothed_score , linestyle='--', label="Cos(Δϕ)Smooth", color='purple')
+            if CLIENT_CHARTS:
+                st.altair_chart(cos_phase_altair_chart(timestamps, cos_phase, history_start),
+                                width="stretch")
+            else:
+                plt = get_plt()
+                fig, ax = plt.subplots(2, 1, figsize=(12, 6), sharex=True)
 
-            ax[1].axhline(0.5, linestyle='--', color='gray')
-            ax[1].axhline(-0.5, linestyle='--', color='gray')
-            ax[1].set_title("Cosine Phase Alignment Oscillator")
-            ax[1].legend()
-    
-            plot_slot = st.empty()
-            with plot_slot.container():
-                st.pyplot(fig)
+                # Past wave alignment
+                ax[0].plot(timestamps, dom_wave, label="Dominant Wave", color='blue')
+                ax[0].plot(timestamps, micro_wave, label="Micro Wave", color='green', linestyle='dashdot')
+                ax[0].set_title("Dominant vs Micro Harmonics")
+                ax[0].legend()
+
+                # Cosine phase alignment tracker
+                ax[1].plot(timestamps, alignment_score, label="Cos(Δϕ)", color='purple')
+                ax[1].plot(timestamps, smoothed_score , linestyle='--', label="Cos(Δϕ)Smooth", color='purple')
+
+                ax[1].axhline(0.5, linestyle='--', color='gray')
+                ax[1].axhline(-0.5, linestyle='--', color='gray')
+                ax[1].set_title("Cosine Phase Alignment Oscillator")
+                ax[1].legend()
+
+                plot_slot = st.empty()
+                with plot_slot.container():
+                    st.pyplot(fig)
     
     
             # === Decision HUD ===
@@ -836,8 +3509,8 @@ if not df.empty:
         
         
     if show_cos_panel: 
-        with st.expander("🌀 Cosine Phase Alignment Panel"):
-            cos_phase_panel(df, dominant_freq, micro_freq, phase, micro_phase)
+        schedule("cos_phase", st.expander("🌀 Cosine Phase Alignment Panel"),
+                 lambda cos_phase: cos_phase_panel(df["timestamp"], cos_phase))
             
     if len(df) >= 20:
         with st.expander("🔮 Harmonic Round Predictor"):
@@ -851,172 +3524,127 @@ if not df.empty:
                     with col1: st.metric("🎯 Coherence", f"{resonance_score:.4f}")
                     with col2: st.metric("🎸 Tension", f"{tension:.4f}")
                     with col3: st.metric("📊 Entropy", f"{entropy:.4f}")
+                    scan = harmonic_count_scan(scores)
+                    st.caption("Coherence / tension / entropy by harmonic count")
+                    st.line_chart(scan.set_index("harmonics")[["coherence", "tension", "entropy"]])
+
+    def rqcf_panel(chains):
+        for chain in chains:
+            st.markdown(f"**{chain['branch']}**")
+            for i, (val, label) in enumerate(chain["forecast"]):
+                st.markdown(f"- Step {i+1}: `{label}` → `{val}`")
 
     if show_rqcf and not FAST_ENTRY_MODE:
-            with st.expander("🔮 RQCF Panel: Recursive Quantum Chain Forecast"):
-                chains = run_rqcf(scores)
-                for chain in chains:
-                    st.markdown(f"**{chain['branch']}**")
-                    for i, (val, label) in enumerate(chain["forecast"]):
-                        st.markdown(f"- Step {i+1}: `{label}` → `{val}`")
+            schedule("rqcf", st.expander("🔮 RQCF Panel: Recursive Quantum Chain Forecast"), rqcf_panel)
 
         # === Fractal Pulse Matcher Panel ===
-    def fpm_panel(df, msi_col="msi", score_col="score", window_sizes=[5, 8, 13]):
-        st.subheader("🧬 Fractal Pulse Matcher Panel (FPM)")
+    def fpm_window_panel(match, archive=None):
+        win = match["win"]
+        current_pattern = match["current_pattern"]
+        current_slope = match["current_slope"]
+        best_match = match["best_match"]
+        best_score = match["best_score"]
+        next_outcome = match["next_outcome"]
     
-        if len(df) < max(window_sizes) + 5:
-            st.warning("Not enough historical rounds to match fractal sequences.")
-            return
+        # === Display Results ===
+        col1, col2 = st.columns(2)
     
-        df = df.copy()
-        df["round_type"] = df["score"].apply(lambda s: "P" if s == 2 else ("p" if s == 1 else "B"))
-    
-        for win in window_sizes:
-            current_seq = df.tail(win).reset_index(drop=True)
-    
-            # Encode current pattern
-            current_pattern = current_seq["round_type"].tolist()
-            current_slope = np.gradient(current_seq[msi_col].fillna(0).values)
-            current_fft = np.abs(rfft(current_slope))
-    
-            best_match = None
-            best_score = -np.inf
-            matched_seq = None
-            next_outcome = None
-    
-            # Slide through history
-            for i in range(0, len(df) - win - 3):
-                hist_seq = df.iloc[i:i+win]
-                hist_pattern = hist_seq["round_type"].tolist()
-                hist_slope = np.gradient(hist_seq[msi_col].fillna(0).values)
-                hist_fft = np.abs(rfft(hist_slope))
-    
-                # Compare slope shape using cosine similarity
-                sim_score = cosine_similarity([current_fft], [hist_fft])[0][0]
-    
-                # Compare round pattern similarity
-                pattern_match = sum([a == b for a, b in zip(current_pattern, hist_pattern)]) / win
-    
-                # Combined matching score
-                total_score = 0.6 * sim_score + 0.4 * pattern_match
-    
-                if total_score > best_score:
-                    best_score = total_score
-                    best_match = hist_pattern
-                    matched_seq = hist_seq
-                    # Look at what happened next
-                    next_seq = df.iloc[i+win:i+win+3]
-                    next_outcome = next_seq["round_type"].tolist()
-    
-            # === Display Results ===
-            with st.expander(f"Fractal Match: Last {win} Rounds"):
-                col1, col2 = st.columns(2)
-    
-                with col1:
-                    st.markdown(f"**Current Pattern (Last {win}):**")
-                    st.text(" ".join(current_pattern))
-                    st.markdown(f"**MSI Slope:** {np.round(current_slope, 2)}")
-    
-                with col2:
-                    st.markdown(f"**Best Historical Match:**")
-                    st.text(" ".join(best_match) if best_match else "N/A")
-                    st.markdown(f"**Match Score:** {best_score:.3f}")
-    
-                if next_outcome:
-                    st.success(f"📡 Projected Next Rounds: {' '.join(next_outcome)}")
-                    # Simple forecast classifier
-                    if next_outcome.count("P") + next_outcome.count("p") >= 2:
-                        st.markdown("🔮 Forecast: **💥 Surge Mirror**")
-                    elif next_outcome.count("B") >= 2:
-                        st.markdown("⚠️ Forecast: **Blue Reversal / Collapse**")
-                    else:
-                        st.markdown("🧘 Forecast: **Stable / Mixed Pulse**")
-            st.session_state.last_fractal_match =  '-'.join(next_outcome ) 
+        with col1:
+            st.markdown(f"**Current Pattern (Last {win}):**")
+            st.text(" ".join(current_pattern))
+            st.markdown(f"**MSI Slope:** {np.round(current_slope, 2)}")
+    
+        with col2:
+            st.markdown(f"**Best Historical Match:**")
+            st.text(" ".join(best_match) if best_match else "N/A")
+            st.markdown(f"**Match Score:** {best_score:.3f}")
+    
+        if next_outcome:
+            st.success(f"📡 Projected Next Rounds: {' '.join(next_outcome)}")
+            # Simple forecast classifier
+            if next_outcome.count("P") + next_outcome.count("p") >= 2:
+                st.markdown("🔮 Forecast: **💥 Surge Mirror**")
+            elif next_outcome.count("B") >= 2:
+                st.markdown("⚠️ Forecast: **Blue Reversal / Collapse**")
+            else:
+                st.markdown("🧘 Forecast: **Stable / Mixed Pulse**")
+
+        if archive is not None and len(archive):
+            st.markdown(f"**📚 Archive Matches ({len(archive):,} windows):**")
+            archive_matches = archive.query(match["current_fft"], match["current_codes"])
+            st.dataframe(pd.DataFrame(archive_matches), hide_index=True)
             
     if show_fpm: 
-        fpm_panel(df)
+        # === Fractal Pulse Matcher Panel ===
+        st.subheader("🧬 Fractal Pulse Matcher Panel (FPM)")
+        if results["fpm_ready"]:
+            for win in FPM_WINDOWS:
+                schedule(f"fpm_{win}", st.expander(f"Fractal Match: Last {win} Rounds"),
+                         lambda match, win=win: fpm_window_panel(match, results["pattern_indexes"].get(win)))
+        else:
+            st.warning("Not enough historical rounds to match fractal sequences.")
+        with st.expander("📊 Exact Pattern Statistics (k = 3–13)"):
+            ngram_stats_panel(results["ngram_stats"])
 
-    def fractal_anchor_visualizer(df, msi_col="msi", score_col="score", window=8):
+    def fractal_anchor_visualizer(df, match, msi_col="msi"):
         st.subheader("🔗 Fractal Anchoring Visualizer")
     
-        if len(df) < window + 10:
+        if match is None:
             st.warning("Insufficient data for visual fractal anchoring.")
             return
     
-        df = df.copy()
-        df["type"] = df["score"].apply(lambda s: "P" if s == 2 else ("p" if s == 1 else "B"))
-    
-        # Encode recent fragment
+        window = match["window"]
+        best_score = match["best_score"]
+        best_start = match["best_start"]
+        best_future_types = match["future_types"]
         recent_seq = df.tail(window)
-        recent_vec = recent_seq[msi_col].fillna(0).values
-        recent_types = recent_seq["type"].tolist()
-    
-        best_score = -np.inf
-        best_start = None
-        best_future_types = []
-    
-        for i in range(len(df) - window - 3):
-            hist_seq = df.iloc[i:i+window]
-            hist_vec = hist_seq[msi_col].fillna(0).values
-            hist_types = hist_seq["type"].tolist()
-    
-            if len(hist_vec) != window:
-                continue
-    
-            # Cosine similarity between shapes
-            shape_score = cosine_similarity([recent_vec], [hist_vec])[0][0]
-    
-            type_match = sum([a == b for a, b in zip(hist_types, recent_types)]) / window
-            total_score = 0.6 * shape_score + 0.4 * type_match
-    
-            if total_score > best_score:
-                best_score = total_score
-                best_start = i
-                best_future_types = df.iloc[i+window:i+window+3]["type"].tolist()
     
         if best_start is None:
             st.warning("No matching historical pattern found.")
             return
     
-        # === Prepare plot ===
-        fig = plt.figure(figsize=(10, 4))
-        gs = gridspec.GridSpec(1, 1)
-        ax = fig.add_subplot(gs[0])
-    
-        # Historical pattern
-        hist_fragment = df.iloc[best_start:best_start+window]
-        hist_times = np.arange(-window, 0)
-        hist_vals = hist_fragment[msi_col].fillna(0).values
-        hist_types = hist_fragment["type"].tolist()
-        ax.plot(hist_times, hist_vals, color='gray', linewidth=2, label='Matched Past')
-    
-        # Current pattern
+        hist_vals = df.iloc[best_start:best_start+window][msi_col].fillna(0).values
         curr_vals = recent_seq[msi_col].fillna(0).values
-        ax.plot(hist_times, curr_vals, color='blue', linewidth=2, linestyle='--', label='Current')
-    
-        # Forecast next steps
-        if best_start + window + 3 <= len(df):
-            proj_seq = df.iloc[best_start + window : best_start + window + 3]
-            proj_vals = proj_seq[msi_col].fillna(0).values
+        has_projection = best_start + window + 3 <= len(df)
+        proj_vals = df.iloc[best_start + window : best_start + window + 3][msi_col].fillna(0).values if has_projection else []
+        if CLIENT_CHARTS:
+            st.altair_chart(anchor_altair_chart(hist_vals, curr_vals, proj_vals), width="stretch")
+        else:
+            # === Prepare plot ===
+            plt = get_plt()
+            fig = plt.figure(figsize=(10, 4))
+            from matplotlib import gridspec
+            gs = gridspec.GridSpec(1, 1)
+            ax = fig.add_subplot(gs[0])
+
+            # Historical pattern
+            hist_times = np.arange(-window, 0)
+            ax.plot(hist_times, hist_vals, color='gray', linewidth=2, label='Matched Past')
+
+            # Current pattern
+            ax.plot(hist_times, curr_vals, color='blue', linewidth=2, linestyle='--', label='Current')
+
+            # Forecast next steps
             proj_times = np.arange(1, len(proj_vals)+1)
-            ax.plot(proj_times, proj_vals, color='green', linewidth=2, label='Projected Next')
-    
-            # Round type markers
-            for t, y in zip(proj_times, proj_vals):
-                ax.scatter(t, y, s=100, alpha=0.7,
-                           c='purple' if y > 0 else 'red',
-                           edgecolors='black', label='Forecast Round' if t == 1 else "")
-    
-        # Decorate plot
-        ax.axhline(0, linestyle='--', color='black', alpha=0.5)
-        ax.set_xticks(list(hist_times) + list(proj_times))
-        ax.set_title("📡 Visual Fractal Anchor")
-        ax.set_xlabel("Relative Time (Rounds)")
-        ax.set_ylabel("MSI Value")
-        ax.legend()
-        plot_slot = st.empty()
-        with plot_slot.container():
-            st.pyplot(fig)
+            if has_projection:
+                ax.plot(proj_times, proj_vals, color='green', linewidth=2, label='Projected Next')
+
+                # Round type markers
+                for t, y in zip(proj_times, proj_vals):
+                    ax.scatter(t, y, s=100, alpha=0.7,
+                               c='purple' if y > 0 else 'red',
+                               edgecolors='black', label='Forecast Round' if t == 1 else "")
+
+            # Decorate plot
+            ax.axhline(0, linestyle='--', color='black', alpha=0.5)
+            ax.set_xticks(list(hist_times) + list(proj_times))
+            ax.set_title("📡 Visual Fractal Anchor")
+            ax.set_xlabel("Relative Time (Rounds)")
+            ax.set_ylabel("MSI Value")
+            ax.legend()
+            plot_slot = st.empty()
+            with plot_slot.container():
+                st.pyplot(fig)
     
         # Echo Signal Summary
         st.metric("🧬 Fractal Match Score", f"{best_score:.3f}")
@@ -1028,11 +3656,34 @@ if not df.empty:
                 st.warning("⚠️ Blue Collapse Forecast")
             else:
                 st.info("🧘 Mixed or Neutral Pattern Incoming")
-        st.session_state.last_anchor_type = ' '.join(best_future_types)
         
     if show_anchor: 
-        with st.expander("🔗 Fractal Anchoring Visualizer"):
-            fractal_anchor_visualizer(df)
+        schedule("anchor", st.expander("🔗 Fractal Anchoring Visualizer"),
+                 lambda anchor: fractal_anchor_visualizer(df, anchor))
+
+    if show_spectrogram:
+        with st.expander("📈 Cycle Drift Spectrogram"):
+            spectrogram_panel(spectrogram)
+
+    with st.expander("🎚️ Resonator Bank"):
+        resonator_panel(results["resonators"], dominant_freq, micro_freq, PINNED_PERIODS)
+
+    if show_sweep:
+        with st.expander("🧪 Parameter Sweep"):
+            sweep_panel(df)
+
+    for future in as_completed(pending):
+        slot, render = pending[future]
+        with slot:
+            render(future.result())
+
+    fpm_matches = ([stages.future(f"fpm_{win}").result() for win in FPM_WINDOWS]
+                   if results["fpm_ready"] else None)
+    fractal_match_type, anchor_forecast_type = fractal_forecast_types(fpm_matches, stages.future("anchor").result())
+    if fractal_match_type is not None:
+        st.session_state.last_fractal_match = fractal_match_type
+    if anchor_forecast_type is not None:
+        st.session_state.last_anchor_type = anchor_forecast_type
     
     decision_hud_panel(
         dominant_phase=wave_label or "N/A",
@@ -1040,10 +3691,19 @@ if not df.empty:
         micro_phase=micro_phase_label or "N/A",
         micro_pct=micro_pct or 0,
         resonance_score=resonance_score if 'resonance_score' in locals() else 0,
-        fractal_match_type=st.session_state.get("last_fractal_match", []),
-        anchor_forecast_type=st.session_state.get("last_anchor_type", "N/A")
+        fractal_match_type=fractal_match_type,
+        anchor_forecast_type=anchor_forecast_type
     )
 
+    with st.expander("🎯 Predictor Accuracy (live)"):
+        accuracy_panel(*results["accuracy"])
+
+    # Regime (online change-point detection)
+    regime_panel(regime, df["timestamp"], history_start)
+
+    with st.expander("🕰️ Signal History"):
+        signal_timeline_panel(results["signal_log"])
+
     # RRQI Status
     st.metric("🧠 RRQI", rrqi_val, delta="Last 30 rounds")
     if rrqi_val >= 0.3:
@@ -1122,11 +3782,70 @@ if not df.empty:
         st.info("Trend too soft — TPI not evaluated.")
 
     
+    # === Long-horizon history (rounds rolled out of the ring buffer) ===
+    archive = results["archive"]
+    if not archive.empty:
+        with st.expander("🗄️ Long-Horizon History", expanded=False):
+            archived = int(archive["rounds"].sum())
+            totals = archive[["pink", "purple", "blue"]].sum()
+            st.caption(f"{archived} archived rounds in {len(archive)} buckets · {N} recent rounds at full resolution")
+            c1, c2, c3 = st.columns(3)
+            c1.metric("Pink rate (archive)", f"{totals['pink'] / archived:.1%}")
+            c2.metric("Purple rate (archive)", f"{totals['purple'] / archived:.1%}")
+            c3.metric("Blue rate (archive)", f"{totals['blue'] / archived:.1%}")
+
+            plt = get_plt()
+            fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 5), sharex=True)
+            x = archive["end"]
+            ax1.fill_between(x, archive["msi_min"], archive["msi_max"], color="gray", alpha=0.3, label="MSI range")
+            ax1.plot(x, archive["msi_mean"], color="black", lw=1.2, label="MSI mean")
+            ax1.axhline(0, color="gray", ls="--", lw=0.8)
+            ax1.legend(loc="upper left")
+            ax1.set_title("🗄️ Archived MSI Envelope")
+            ax2.stackplot(x, archive["pink"] / archive["rounds"], archive["purple"] / archive["rounds"],
+                          archive["blue"] / archive["rounds"], colors=["#ff69b4", "#9370db", "#1e90ff"],
+                          labels=["Pink", "Purple", "Blue"])
+            ax2.set_ylim(0, 1)
+            ax2.legend(loc="upper left")
+            ax2.set_title("Round Mix per Bucket")
+            plt.tight_layout()
+            st.pyplot(fig)
+            plt.close(fig)
+
+    with st.expander("📦 Export Derived Features"):
+        total_rounds = results["total_rounds"]
+        st.caption(f"Rounds {history_start:,}–{total_rounds - 1:,} are kept at full resolution; older ones only "
+                   "survive as archive buckets. For longer histories run "
+                   "`python features.py rounds.parquet -o features.parquet`.")
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            export_start, export_stop = st.slider("Round range", history_start, total_rounds,
+                                                  (history_start, total_rounds))
+        with col2:
+            export_format = st.selectbox("Format", ["Parquet", "Arrow IPC"])
+        fmt = "parquet" if export_format == "Parquet" else "arrow"
+
+        # Built on request and kept for this session until the selection changes
+        export_key = (export_start, export_stop, fmt, PINK_THRESHOLD, WINDOW_SIZE)
+        if st.button("🛠️ Build Export", disabled=export_stop <= export_start):
+            rows = df[["timestamp", "multiplier", "score"]]
+            buffer = io.BytesIO()
+            write_features(frame_chunks(rows), buffer, fmt, pink_threshold=PINK_THRESHOLD, window_size=WINDOW_SIZE,
+                           start=export_start, stop=export_stop, first_index=history_start,
+                           scores=rows["score"].to_numpy()[export_start - history_start:export_stop - history_start])
+            st.session_state.feature_export = (export_key, buffer.getvalue())
+        built = st.session_state.get("feature_export")
+        if built is not None and built[0] == export_key:
+            st.download_button("⬇️ Download Features", built[1], file_name=f"features_{export_start}_{export_stop}.{fmt}",
+                               mime="application/vnd.apache.parquet" if fmt == "parquet" else "application/vnd.apache.arrow.file")
+
     # Log
     with st.expander("📄 Review / Edit Recent Rounds"):
-        edited = st.data_editor(df.tail(30), use_container_width=True, num_rows="dynamic")
+        recent = df.tail(30)
+        edited = st.data_editor(recent, use_container_width=True, num_rows="dynamic")
         if st.button("✅ Commit Edits"):
-            st.session_state.roundsc = edited.to_dict('records')
+            # Only the rounds shown are rewritten; older history is left alone
+            engine.replace_tail(len(recent), edited.to_dict('records'))
             st.rerun()
 
 else:
@@ -0,0 +1,60 @@
+"""Cold-start benchmark for app.py.
+
+Every sample runs in a fresh interpreter, so nothing is warm in
+sys.modules. It measures how long it takes to import the app's
+dependencies and render the empty page (sidebar + round entry), which is
+what a user waits for after a container cold start.
+
+    python bench_coldstart.py            # 5 samples
+    python bench_coldstart.py -n 10
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+PROBE = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import streamlit
+from streamlit.testing.v1 import AppTest
+t_streamlit = time.perf_counter() - t0
+at = AppTest.from_file(sys.argv[1], default_timeout=120)
+t1 = time.perf_counter()
+at.run()
+t_render = time.perf_counter() - t1
+heavy = [m for m in ("matplotlib.pyplot", "scipy", "scipy.stats", "sklearn") if m in sys.modules]
+print(json.dumps({"streamlit_import": t_streamlit, "first_render": t_render,
+                  "total": time.perf_counter() - t0, "heavy_loaded": heavy,
+                  "exceptions": len(at.exception)}))
+"""
+
+
+def sample():
+    out = subprocess.run([sys.executable, "-c", PROBE, APP], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--samples", type=int, default=5)
+    args = parser.parse_args()
+
+    sample()  # warm the OS file cache so samples measure imports, not disk
+    runs = [sample() for _ in range(args.samples)]
+    for key in ("streamlit_import", "first_render", "total"):
+        vals = [r[key] for r in runs]
+        print(f"{key:<18} median {statistics.median(vals) * 1000:8.1f} ms   "
+              f"min {min(vals) * 1000:8.1f} ms   max {max(vals) * 1000:8.1f} ms")
+    print(f"{'heavy modules':<18} {', '.join(runs[-1]['heavy_loaded']) or 'none'}")
+    if any(r["exceptions"] for r in runs):
+        print("warning: app raised during first render")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+"""Derived per-round feature table of app.py, computed and exported in chunks.
+
+``derive_features`` adds the columns ``analyze_data`` shows in the app (round
+type, MSI, momentum, the 10/20/40 Bollinger bands on MSI, band slopes and
+accelerations, bandwidth and the squeeze flag). ``write_features`` streams
+any round source through it, chunk by chunk, into a zstd-compressed Parquet
+or Arrow IPC file with a fixed schema. Each chunk is computed with enough
+preceding rows for every rolling window, so the output matches a single pass
+over the whole history (up to the rounding drift of pandas' running rolling
+std, which can flip the squeeze flag where the bandwidth ties its quartile).
+Only one chunk plus the score column of the selected range (for the harmonic
+fits) is ever held in memory.
+
+    python features.py rounds.parquet -o features.parquet
+    python features.py rounds.csv -o features.arrow --window 30 --start 100000 --stop 200000
+"""
+
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+from numpy.fft import rfft, rfftfreq
+
+from synth import score_multipliers
+
+ROUND_TYPES = ["Pink", "Purple", "Blue"]
+MICRO_BAND = (0.08, 0.15)
+# Rows of context each chunk needs beyond the MSI window: the 40-round band
+# (39), slope + acceleration diffs (2) and the 5-round squeeze quantile (4)
+LOOKBACK = 45
+CHUNK_ROWS = 100_000
+
+# name, arrow type (built lazily so importing this module does not load pyarrow)
+FEATURE_COLUMNS = (
+    ("index", "int64"), ("timestamp", "timestamp[us]"), ("multiplier", "float64"), ("score", "float32"),
+    ("type", "dictionary<values=string, indices=int8>"), ("msi", "float64"), ("momentum", "float64"),
+    ("bb_mid_20", "float64"), ("bb_upper_20", "float64"), ("bb_lower_20", "float64"),
+    ("bb_mid_10", "float64"), ("bb_upper_10", "float64"), ("bb_lower_10", "float64"),
+    ("bb_mid_40", "float64"), ("bb_upper_40", "float64"), ("bb_lower_40", "float64"),
+    ("bandwidth", "float64"), ("upper_slope", "float64"), ("lower_slope", "float64"),
+    ("upper_accel", "float64"), ("lower_accel", "float64"), ("bandwidth_delta", "float64"),
+    ("bb_squeeze", "float64"), ("bb_squeeze_flag", "bool"),
+    ("harmonic_fit", "float32"), ("micro_fit", "float32"),
+)
+
+
+def bollinger_bands(series, window, num_std=2):
+    rolling_mean = series.rolling(window).mean()
+    rolling_std = series.rolling(window).std()
+    return rolling_mean, rolling_mean + num_std * rolling_std, rolling_mean - num_std * rolling_std
+
+
+def derive_features(df, pink_threshold, window_size):
+    """Add the derived round columns to ``df`` (timestamp, multiplier, score) in place and return it."""
+    df["type"] = np.select([df["multiplier"] >= pink_threshold, df["multiplier"] >= 2],
+                           ROUND_TYPES[:2], ROUND_TYPES[2])
+    df["msi"] = df["score"].rolling(window_size).sum()
+    df["momentum"] = df["score"].cumsum()
+    df["bb_mid_20"], df["bb_upper_20"], df["bb_lower_20"] = bollinger_bands(df["msi"], 20, 2)
+    df["bb_mid_10"], df["bb_upper_10"], df["bb_lower_10"] = bollinger_bands(df["msi"], 10, 1.5)
+    df["bb_mid_40"], df["bb_upper_40"], df["bb_lower_40"] = bollinger_bands(df["msi"], 40, 2.5)
+    df["bandwidth"] = df["bb_upper_10"] - df["bb_lower_10"]
+    df["upper_slope"] = df["bb_upper_10"].diff()
+    df["lower_slope"] = df["bb_lower_10"].diff()
+    df["upper_accel"] = df["upper_slope"].diff()
+    df["lower_accel"] = df["lower_slope"].diff()
+    df["bandwidth_delta"] = df["bandwidth"].diff()
+    df["bb_squeeze"] = df["bb_upper_10"] - df["bb_lower_10"]
+    df["bb_squeeze_flag"] = df["bb_squeeze"] < df["bb_squeeze"].rolling(5).quantile(0.25)
+    return df
+
+
+def micro_band_peak(yf, xf, band=MICRO_BAND):
+    """Index of the strongest ``rfft`` bin strictly inside ``band``; 0 (the DC bin) when none fall in it."""
+    mask = (xf > band[0]) & (xf < band[1])
+    return np.flatnonzero(mask)[np.argmax(np.abs(yf[mask]))] if np.any(mask) else 0
+
+
+def harmonic_fits(scores):
+    """(frequency, phase) of the dominant and micro-band sine fits, as ``analyze_data`` picks them from the rfft.
+
+    None below 20 rounds.
+    """
+    scores = np.asarray(scores, dtype=float)
+    if len(scores) < 20:
+        return None
+    yf = rfft(scores - scores.mean())
+    xf = rfftfreq(len(scores), 1)
+    dominant = np.argmax(np.abs(yf[1:])) + 1
+    micro = micro_band_peak(yf, xf)
+    return {"harmonic_fit": (xf[dominant], np.angle(yf[dominant])), "micro_fit": (xf[micro], np.angle(yf[micro]))}
+
+
+def feature_schema():
+    import pyarrow as pa
+
+    types = {"int64": pa.int64(), "float64": pa.float64(), "float32": pa.float32(), "bool": pa.bool_(),
+             "timestamp[us]": pa.timestamp("us"), "dictionary<values=string, indices=int8>":
+             pa.dictionary(pa.int8(), pa.string())}
+    return pa.schema([(name, types[kind]) for name, kind in FEATURE_COLUMNS])
+
+
+def iter_feature_chunks(chunks, pink_threshold=10.0, window_size=20, start=0, stop=None, scores=None,
+                        first_index=0):
+    """Yield the derived table for rows ``[start, stop)`` as DataFrames, one per input chunk.
+
+    ``chunks`` yields consecutive round DataFrames (timestamp, multiplier and
+    optionally score) starting at row ``first_index``; ``start`` and ``stop``
+    are row numbers on the same scale. Rows before ``start`` are only used
+    as rolling-window context and for the running momentum. ``scores`` is the
+    score column of the selected range, for the harmonic fit columns (NaN
+    when omitted).
+    """
+    context_rows = window_size + LOOKBACK
+    fits = harmonic_fits(scores) if scores is not None else None
+    context = None
+    momentum = 0.0
+    offset = first_index
+    for chunk in chunks:
+        begin, end = offset, offset + len(chunk)
+        offset = end
+        if stop is not None and begin >= stop:
+            break
+        chunk = chunk.reset_index(drop=True)[["timestamp", "multiplier"] + (["score"] if "score" in chunk else [])]
+        if "score" not in chunk:
+            chunk = chunk.assign(score=score_multipliers(chunk["multiplier"].to_numpy(), pink_threshold))
+        chunk = chunk.astype({"score": float})
+        frame = chunk if context is None else pd.concat([context, chunk], ignore_index=True)
+        context = frame.iloc[-context_rows:].copy()
+        if end <= start:
+            momentum += chunk["score"].sum()
+            continue
+        frame = derive_features(frame.copy(), pink_threshold, window_size).iloc[len(frame) - len(chunk):]
+        frame.insert(0, "index", np.arange(begin, end))
+        frame["momentum"] = momentum + chunk["score"].cumsum().to_numpy()
+        momentum = float(frame["momentum"].iloc[-1])
+        keep = frame["index"] >= start
+        if stop is not None:
+            keep &= frame["index"] < stop
+        frame = frame[keep].reset_index(drop=True)
+        for name, (freq, phase) in (fits or {}).items():
+            frame[name] = np.sin(2 * np.pi * freq * (frame["index"].to_numpy() - start) + phase)
+        yield frame
+
+
+def write_features(chunks, sink, fmt="parquet", compression="zstd", **kwargs):
+    """Stream ``iter_feature_chunks(chunks, **kwargs)`` into ``sink`` (a path or binary file); returns the row count."""
+    import pyarrow as pa
+
+    schema = feature_schema()
+    if fmt == "parquet":
+        import pyarrow.parquet as pq
+        writer = pq.ParquetWriter(sink, schema, compression=compression)
+    else:
+        writer = pa.ipc.new_file(sink, schema, options=pa.ipc.IpcWriteOptions(compression=compression))
+    rows = 0
+    with writer:
+        for frame in iter_feature_chunks(chunks, **kwargs):
+            frame["timestamp"] = pd.to_datetime(frame["timestamp"])
+            # Same dictionary in every batch (IPC files allow only one per field)
+            frame["type"] = pd.Categorical(frame["type"], categories=ROUND_TYPES)
+            for name, _ in FEATURE_COLUMNS:
+                if name not in frame:
+                    frame[name] = np.nan
+            table = pa.Table.from_pandas(frame[[name for name, _ in FEATURE_COLUMNS]], preserve_index=False)
+            writer.write_table(table.cast(schema))
+            rows += len(frame)
+    return rows
+
+
+def frame_chunks(df, chunk_rows=CHUNK_ROWS):
+    return (df.iloc[i:i + chunk_rows] for i in range(0, len(df), chunk_rows))
+
+
+def read_round_chunks(path, chunk_rows=CHUNK_ROWS, columns=None):
+    """Yield DataFrames of ``chunk_rows`` rounds from a .parquet, .arrow/.feather or .csv file."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".parquet":
+        import pyarrow.parquet as pq
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    elif ext in (".arrow", ".feather", ".ipc"):
+        import pyarrow as pa
+        with pa.memory_map(path) as source:
+            reader = pa.ipc.open_file(source)
+            for i in range(reader.num_record_batches):
+                batch = reader.get_batch(i)
+                yield (batch.select(columns) if columns else batch).to_pandas()
+    else:
+        yield from pd.read_csv(path, chunksize=chunk_rows, usecols=columns)
+
+
+def range_scores(path, start, stop, pink_threshold, chunk_rows=CHUNK_ROWS):
+    """Score column of rows ``[start, stop)`` of a round file (computed from multipliers if absent)."""
+    parts, offset = [], 0
+    for chunk in read_round_chunks(path, chunk_rows):
+        lo, hi = max(start - offset, 0), len(chunk) if stop is None else min(stop - offset, len(chunk))
+        offset += len(chunk)
+        if lo < hi:
+            part = chunk.iloc[lo:hi]
+            parts.append(part["score"].to_numpy(dtype=float) if "score" in part
+                         else score_multipliers(part["multiplier"].to_numpy(), pink_threshold).astype(float))
+        if stop is not None and offset >= stop:
+            break
+    return np.concatenate(parts) if parts else np.zeros(0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("rounds", help=".parquet, .arrow/.feather or .csv with timestamp, multiplier[, score]")
+    parser.add_argument("-o", "--output", required=True, help=".parquet or .arrow")
+    parser.add_argument("--window", type=int, default=20, help="MSI window size")
+    parser.add_argument("--pink-threshold", type=float, default=10.0)
+    parser.add_argument("--start", type=int, default=0, help="first row to export")
+    parser.add_argument("--stop", type=int, default=None, help="row to stop before (default: end)")
+    parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    parser.add_argument("--compression", default="zstd")
+    parser.add_argument("--no-fits", action="store_true", help="skip the harmonic fit columns (single pass)")
+    args = parser.parse_args()
+
+    scores = None if args.no_fits else range_scores(args.rounds, args.start, args.stop, args.pink_threshold,
+                                                     args.chunk_rows)
+    rows = write_features(read_round_chunks(args.rounds, args.chunk_rows), args.output,
+                          fmt="parquet" if args.output.endswith(".parquet") else "arrow",
+                          compression=args.compression, pink_threshold=args.pink_threshold,
+                          window_size=args.window, start=args.start, stop=args.stop, scores=scores)
+    print(f"wrote {rows:,} rows to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
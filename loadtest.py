@@ -0,0 +1,178 @@
+"""Headless load test for app.py.
+
+Drives N concurrent sessions through Streamlit's AppTest, in-process, so the
+sessions share the process-wide caches and stream registry exactly as they
+would behind one server. Each session adds a round every 1/rate seconds
+with the chosen panel toggles. The test reports rerun latency percentiles,
+throughput and process RSS over time. The pattern archive and stream
+checkpoints go to a temporary directory, so generated rounds never reach the
+real ``.pattern_index`` / ``.engine_state``.
+
+    python loadtest.py -s 8 -r 0.5 -d 60
+    python loadtest.py -s 4 --history 20000 --stream table1 --off show_rqcf,show_sweep
+    python loadtest.py -s 2 --on FAST_ENTRY_MODE --json results.json
+    python loadtest.py -s 4 --history 20000 --on CLIENT_CHARTS
+"""
+
+import argparse
+import json
+import os
+import resource
+import sys
+import tempfile
+import threading
+import time
+import warnings
+
+import numpy as np
+
+from synth import generate_rounds
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+
+# Sidebar checkbox for each toggle variable in app.py
+TOGGLES = {
+    "STRICT_RTT": "Strict RTT Mode",
+    "FAST_ENTRY_MODE": "⚡ Fast Entry Mode",
+    "show_thre": "🌀 THRE Panel",
+    "show_cos_panel": "🌀 Cos Phase Panel",
+    "show_rqcf": "🔮 RQCF Panel",
+    "show_fpm": "🧬 FPM Panel",
+    "show_anchor": "🔗 Fractal Anchor",
+    "show_spectrogram": "📈 Cycle Drift Spectrogram",
+    "show_sweep": "🧪 Parameter Sweep",
+    "CLIENT_CHARTS": "📉 Client-Side Charts",
+}
+
+
+def rss_mb():
+    """Current resident set size; falls back to the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def widget(at, kind, label):
+    return next(w for w in getattr(at, kind) if w.label == label)
+
+
+def setup_session(args, index):
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(APP, default_timeout=args.timeout)
+    at.run()
+    if args.stream:
+        widget(at, "text_input", "Stream ID").input(args.stream)
+    for name, value in args.toggles.items():
+        widget(at, "checkbox", TOGGLES[name]).set_value(value)
+    at.run()
+    # Private histories are loaded per session, a shared stream only once
+    if args.history and (index == 0 or not args.stream):
+        widget(at, "number_input", "Rounds").set_value(args.history)
+        widget(at, "number_input", "Seed").set_value(args.seed + index)
+        widget(at, "button", "🎲 Load Synthetic Rounds").click()
+        at.run()
+    return at
+
+
+def run_session(args, at, index, start, samples, errors):
+    multipliers = generate_rounds(args.rounds or 10_000, seed=args.seed + 1000 + index)["multiplier"].values
+    interval = 1.0 / args.rate
+    # Stagger sessions so they do not all rerun in lockstep
+    next_at = start + interval * index / args.sessions
+    for n in range(args.rounds or sys.maxsize):
+        next_at += interval
+        now = time.perf_counter()
+        if args.duration and now - start >= args.duration:
+            break
+        if next_at > now:
+            time.sleep(next_at - now)
+        widget(at, "number_input", "Enter round multiplier").set_value(float(multipliers[n % len(multipliers)]))
+        widget(at, "button", "➕ Add Round").click()
+        t0 = time.perf_counter()
+        at.run()
+        t1 = time.perf_counter()
+        samples.append((t1 - start, t1 - t0))
+        if at.exception:
+            errors.append(at.exception[0].value)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-s", "--sessions", type=int, default=4)
+    parser.add_argument("-r", "--rate", type=float, default=0.5, help="rounds per second per session")
+    parser.add_argument("-d", "--duration", type=float, default=60, help="seconds (0 = until --rounds)")
+    parser.add_argument("-n", "--rounds", type=int, default=0, help="rounds per session (0 = until --duration)")
+    parser.add_argument("--history", type=int, default=0, help="synthetic rounds loaded before the test")
+    parser.add_argument("--stream", default="", help="shared Stream ID (default: private sessions)")
+    parser.add_argument("--on", default="", help="comma-separated toggles to enable, e.g. show_sweep")
+    parser.add_argument("--off", default="", help="comma-separated toggles to disable, e.g. show_rqcf")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--timeout", type=float, default=300, help="per-rerun timeout in seconds")
+    parser.add_argument("--rss-interval", type=float, default=5, help="seconds between RSS samples")
+    parser.add_argument("--json", help="also write the raw report to this file")
+    args = parser.parse_args()
+    if not args.duration and not args.rounds:
+        parser.error("set --duration or --rounds")
+    args.toggles = {}
+    for value, names in ((True, args.on), (False, args.off)):
+        for name in filter(None, names.split(",")):
+            if name not in TOGGLES:
+                parser.error(f"unknown toggle {name!r}; choose from {', '.join(TOGGLES)}")
+            args.toggles[name] = value
+
+    warnings.filterwarnings("ignore")
+    scratch = tempfile.TemporaryDirectory(prefix="cya-loadtest-")
+    os.environ["CYA_PATTERN_INDEX_DIR"] = os.path.join(scratch.name, "pattern_index")
+    os.environ["CYA_ENGINE_STATE_DIR"] = os.path.join(scratch.name, "engine_state")
+
+    rss = [(0.0, rss_mb())]
+    print(f"setting up {args.sessions} session(s)...", flush=True)
+    sessions = [setup_session(args, i) for i in range(args.sessions)]
+    rss.append((0.0, rss_mb()))
+
+    samples, errors = [], []
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run_session, args=(args, at, i, start, samples, errors), daemon=True)
+               for i, at in enumerate(sessions)]
+    for t in threads:
+        t.start()
+    while any(t.is_alive() for t in threads):
+        for t in threads:
+            t.join(args.rss_interval / len(threads))
+        rss.append((time.perf_counter() - start, rss_mb()))
+        print(f"  t={rss[-1][0]:6.1f}s  reruns={len(samples):5d}  rss={rss[-1][1]:7.1f} MB", flush=True)
+    elapsed = time.perf_counter() - start
+    scratch.cleanup()
+
+    latencies = np.array([lat for _, lat in samples]) * 1000
+    report = {
+        "sessions": args.sessions, "rate": args.rate, "history": args.history, "stream": args.stream or None,
+        "toggles": args.toggles, "elapsed_s": elapsed, "reruns": len(samples), "errors": len(errors),
+        "throughput_rps": len(samples) / elapsed if elapsed else 0.0,
+        "offered_rps": args.sessions * args.rate,
+        "latency_ms": ({f"p{p}": float(np.percentile(latencies, p)) for p in (50, 95, 99)}
+                       | {"mean": float(latencies.mean()), "max": float(latencies.max())}) if len(samples) else {},
+        "rss_mb": [{"t": t, "mb": mb} for t, mb in rss],
+    }
+
+    print()
+    print(f"sessions {args.sessions}  offered {report['offered_rps']:.2f} rounds/s  "
+          f"history {args.history}  stream {args.stream or '(private)'}")
+    print(f"reruns {len(samples)} in {elapsed:.1f}s -> {report['throughput_rps']:.2f} reruns/s, {len(errors)} error(s)")
+    for key, value in report["latency_ms"].items():
+        print(f"  latency {key:<4} {value:9.1f} ms")
+    print(f"  rss start {rss[0][1]:.1f} MB, after setup {rss[1][1]:.1f} MB, "
+          f"end {rss[-1][1]:.1f} MB, peak {max(mb for _, mb in rss):.1f} MB")
+    if errors:
+        print(f"first error: {errors[0]}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+
+if __name__ == "__main__":
+    main()
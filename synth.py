@@ -0,0 +1,103 @@
+"""Synthetic crash-game round streams for testing and benchmarking app.py.
+
+Everything is generated in a few vectorized numpy calls, so a million rounds
+takes well under a second. Multipliers follow the usual crash-game law
+
+    P(M >= x) = ((1 - edge) / x) ** (1 / tail)
+
+with a share of instant 1.00x crashes. The stream switches between named
+regimes (each with its own edge/tail/instant-crash rate) after geometric dwell
+times. Rounds are scored with the same Pink/Purple/Blue rule as "➕ Add Round",
+and timestamps follow a betting phase plus the flight time of the multiplier.
+
+    python synth.py -n 1000000 --seed 7 -o rounds.parquet
+"""
+
+import argparse
+
+import numpy as np
+import pandas as pd
+
+# edge: house edge, tail: >1 fattens the high-multiplier tail, instant: share of 1.00x crashes
+REGIMES = {
+    "normal": {"edge": 0.03, "tail": 1.0, "instant": 0.01},
+    "happy_hour": {"edge": 0.01, "tail": 1.25, "instant": 0.005},
+    "dead_zone": {"edge": 0.06, "tail": 0.85, "instant": 0.04},
+}
+
+
+def score_multipliers(multipliers, pink_threshold):
+    """Pink = 2, Purple (>= 2x) = 1, Blue = -1; works on scalars and arrays."""
+    m = np.asarray(multipliers)
+    return np.where(m >= pink_threshold, 2, np.where(m >= 2.0, 1, -1))
+
+
+def regime_sequence(rng, n, num_regimes, mean_length):
+    """Regime index per round: geometric dwell times, always switching to a different regime."""
+    if num_regimes == 1 or not mean_length:
+        return np.zeros(n, dtype=np.intp)
+    max_segments = max(4, int(2 * n / mean_length) + 16)
+    lengths = rng.geometric(1.0 / mean_length, size=max_segments)
+    while lengths.sum() < n:
+        lengths = np.concatenate([lengths, rng.geometric(1.0 / mean_length, size=max_segments)])
+    steps = rng.integers(1, num_regimes, size=len(lengths))
+    steps[0] = rng.integers(num_regimes)
+    return np.repeat(np.cumsum(steps) % num_regimes, lengths)[:n]
+
+
+def generate_rounds(n, seed=None, regimes=None, mean_regime_length=200, pink_threshold=10.0,
+                    start=None, betting_seconds=8.0, growth_rate=0.06, jitter_seconds=1.5):
+    """DataFrame of ``n`` rounds: timestamp, multiplier, score and regime.
+
+    ``regimes`` maps names to ``{"edge", "tail", "instant"}`` (default
+    ``REGIMES``); pass a single regime to disable switching. The same ``seed``
+    always yields the same stream.
+    """
+    rng = np.random.default_rng(seed)
+    regimes = regimes or REGIMES
+    names = list(regimes)
+    params = {k: np.array([regimes[name][k] for name in names], dtype=float) for k in ("edge", "tail", "instant")}
+
+    regime = regime_sequence(rng, n, len(names), mean_regime_length)
+    u = 1.0 - rng.random(n)  # (0, 1]
+    multipliers = np.maximum(1.0, (1.0 - params["edge"][regime]) / u ** params["tail"][regime])
+    multipliers[rng.random(n) < params["instant"][regime]] = 1.0
+    multipliers = np.floor(multipliers * 100) / 100
+
+    # Betting phase, then the multiplier climbs as exp(growth_rate * t) until it crashes
+    durations = (betting_seconds + np.log(multipliers) / growth_rate
+                 + rng.uniform(-jitter_seconds, jitter_seconds, size=n))
+    start = pd.Timestamp(start if start is not None else "2025-01-01")
+    offsets = np.concatenate([[0.0], np.cumsum(durations[:-1])])
+    timestamps = start + pd.to_timedelta(np.round(offsets * 1e3).astype(np.int64), unit="ms")
+
+    return pd.DataFrame({
+        "timestamp": timestamps,
+        "multiplier": multipliers,
+        "score": score_multipliers(multipliers, pink_threshold),
+        "regime": pd.Categorical.from_codes(regime, categories=names),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--rounds", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--regime-length", type=float, default=200, help="mean rounds per regime (0 = no switching)")
+    parser.add_argument("--pink-threshold", type=float, default=10.0)
+    parser.add_argument("-o", "--output", help=".parquet or .csv; prints a summary when omitted")
+    args = parser.parse_args()
+
+    df = generate_rounds(args.rounds, seed=args.seed, mean_regime_length=args.regime_length,
+                         pink_threshold=args.pink_threshold)
+    if args.output and args.output.endswith(".parquet"):
+        df.to_parquet(args.output, index=False)
+    elif args.output:
+        df.to_csv(args.output, index=False)
+    else:
+        print(df.head())
+        print(df.groupby("regime", observed=True)["score"].value_counts(normalize=True).unstack().round(3))
+
+
+if __name__ == "__main__":
+    main()
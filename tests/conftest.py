@@ -0,0 +1,13 @@
+import os
+import sys
+import tempfile
+import warnings
+
+# app.py is a Streamlit script: importing it runs the page once in bare mode,
+# so its on-disk state is pointed at a throwaway directory first.
+STATE_DIR = tempfile.mkdtemp(prefix="flvme-tests-")
+os.environ.setdefault("CYA_PATTERN_INDEX_DIR", os.path.join(STATE_DIR, "pattern_index"))
+os.environ.setdefault("CYA_ENGINE_STATE_DIR", os.path.join(STATE_DIR, "engine_state"))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.argv = ["app.py"]
+warnings.filterwarnings("ignore", module="streamlit")
@@ -0,0 +1,116 @@
+import logging
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+from synth import generate_rounds
+
+KEY = ("test",)
+
+
+def compute(snapshot, trackers):
+    scores = snapshot["frame"]["score"].to_numpy(dtype=float)
+    msi = pd.Series(scores).rolling(20).sum().to_numpy()
+    start = snapshot["start"]
+    features = app.sync_feature_store(trackers, scores, msi, 20, start)
+    ngram = app.sync_ngram_index(trackers, scores, start).current_stats()
+    return {
+        "total": start + len(scores),
+        # Ties among the top continuations may come out in either order
+        "ngram": ngram.drop(columns=[c for c in ngram if c.startswith("top next")]),
+        "spectrogram": app.sync_spectrogram(trackers, scores, start).n_seen,
+        "regime": app.sync_regime_tracker(trackers, scores, msi, 20, start).state(start)["score_changes"],
+        "signatures": features["signatures_8"].copy(),
+    }
+
+
+def assert_same_results(a, b):
+    assert a.keys() == b.keys()
+    for name in a:
+        if isinstance(a[name], pd.DataFrame):
+            pd.testing.assert_frame_equal(a[name], b[name])
+        elif isinstance(a[name], np.ndarray):
+            np.testing.assert_array_equal(a[name], b[name])
+        else:
+            assert a[name] == b[name], name
+
+
+@pytest.fixture(scope="module")
+def rounds():
+    return generate_rounds(400, seed=8)[["timestamp", "multiplier", "score"]].to_dict("records")
+
+
+def drain(engine):
+    engine.checkpoint_pool.submit(lambda: None).result()
+
+
+def fed_engine(state_dir, rounds, retention=300):
+    """Engine that computed every few rounds, so its trackers have seen rounds the ring dropped."""
+    engine = app.StreamEngine("s", retention=retention, state_dir=state_dir and str(state_dir),
+                              checkpoint_every=25)
+    for i, round_ in enumerate(rounds):
+        engine.append(round_)
+        if i % 7 == 0:
+            engine.results(KEY, compute)
+    drain(engine)
+    return engine
+
+
+def test_restart_replays_the_journal_after_the_checkpoint(tmp_path, rounds):
+    engine = fed_engine(tmp_path, rounds)
+    ckpt_path, journal_path = app.state_paths(str(tmp_path), "s")
+    saved = app.load_state(open(ckpt_path, "rb").read())
+    journal = np.fromfile(journal_path, dtype=app.JOURNAL_DTYPE)
+    assert 0 < saved["total"] < len(rounds)
+    assert np.array_equal(journal["index"], np.arange(saved["total"], len(rounds)))
+
+    restored = app.StreamEngine("s", retention=300, state_dir=str(tmp_path))
+    assert restored.history.total == len(rounds)
+    pd.testing.assert_frame_equal(restored.history.frame(), engine.history.frame())
+    pd.testing.assert_frame_equal(restored.history.archive_frame(), engine.history.archive_frame())
+    assert restored.trackers["spectrogram"].n_seen == saved["total"]
+    assert_same_results(restored.results(KEY, compute), fed_engine(None, rounds).results(KEY, compute))
+
+
+def test_undo_rolls_back_to_a_checkpoint_in_memory_and_on_disk(tmp_path, rounds):
+    # Undone rounds leave the ring short, so keep everything in it to compare with a fresh feed
+    engine = fed_engine(tmp_path, rounds, retention=1000)
+    assert engine.undo(30) == 30
+    drain(engine)
+    assert engine.history.total == len(rounds) - 30
+    assert engine.trackers["spectrogram"].n_seen <= len(rounds) - 30
+    expected = fed_engine(None, rounds[:-30], retention=1000).results(KEY, compute)
+    assert_same_results(engine.results(KEY, compute), expected)
+
+    restored = app.StreamEngine("s", retention=1000, state_dir=str(tmp_path))
+    pd.testing.assert_frame_equal(restored.history.frame(), engine.history.frame())
+    assert_same_results(restored.results(KEY, compute), expected)
+
+
+def test_checkpoints_are_taken_off_the_compute_path(tmp_path, rounds):
+    engine = fed_engine(tmp_path, rounds[:100])
+    assert [total for total, _ in engine.checkpoints] == sorted(total for total, _ in engine.checkpoints)
+    total, state = engine.checkpoints[-1]
+    saved = app.load_state(state)
+    trackers = app.load_trackers(saved)
+    assert saved["total"] == total and app.load_state(saved["history"]).total == total
+    assert {"ngram_index", "spectrogram", "features_20"} <= set(trackers)
+    assert trackers["spectrogram"].n_seen == total
+    # The n-gram table is checkpointed as a frozen view while later rounds keep arriving
+    assert trackers["ngram_index"].n_seen == total
+    for round_ in rounds[100:140]:
+        engine.append(round_)
+        engine.results(KEY, compute)
+    assert app.load_trackers(app.load_state(state))["spectrogram"].n_seen == total
+
+
+def test_unreadable_checkpoint_is_logged_and_ignored(tmp_path, rounds, caplog):
+    fed_engine(tmp_path, rounds[:60])
+    with open(app.state_paths(str(tmp_path), "s")[0], "wb") as f:
+        f.write(b"not a checkpoint")
+    with caplog.at_level(logging.WARNING):
+        engine = app.StreamEngine("s", retention=300, state_dir=str(tmp_path))
+    assert "unreadable checkpoint" in caplog.text
+    assert engine.trackers == {} and engine.history.total == 0
@@ -0,0 +1,62 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+import features
+from synth import generate_rounds
+
+
+@pytest.fixture(scope="module")
+def rounds():
+    return generate_rounds(1500, seed=9)[["timestamp", "multiplier", "score"]]
+
+
+def single_pass(rounds, pink_threshold, window_size, start, stop):
+    frame = features.derive_features(rounds.reset_index(drop=True).astype({"score": float}),
+                                     pink_threshold, window_size)
+    frame.insert(0, "index", np.arange(len(frame)))
+    return frame.iloc[start:stop].reset_index(drop=True)
+
+
+@pytest.mark.parametrize("chunk_rows, start, stop", [(1500, 0, None), (97, 0, None), (64, 300, 1200),
+                                                     (500, 1000, 1001)])
+def test_chunks_match_a_single_pass(rounds, chunk_rows, start, stop):
+    chunked = pd.concat(features.iter_feature_chunks(features.frame_chunks(rounds, chunk_rows), 10.0, 20,
+                                                     start=start, stop=stop), ignore_index=True)
+    expected = single_pass(rounds, 10.0, 20, start, stop)
+    assert chunked["index"].tolist() == expected["index"].tolist()
+    # The squeeze flag compares the bandwidth with its rolling quartile, which rounding drift can tip
+    flags = chunked.pop("bb_squeeze_flag"), expected.pop("bb_squeeze_flag")
+    assert (flags[0] == flags[1]).mean() > 0.99
+    pd.testing.assert_frame_equal(chunked, expected, check_exact=False, rtol=1e-9, atol=1e-9)
+
+
+def test_chunks_rescore_rounds_without_a_score_column(rounds):
+    chunked = pd.concat(features.iter_feature_chunks(
+        features.frame_chunks(rounds[["timestamp", "multiplier"]], 250), 5.0, 30), ignore_index=True)
+    expected = single_pass(rounds.assign(score=features.score_multipliers(rounds["multiplier"].to_numpy(), 5.0)),
+                           5.0, 30, 0, None)
+    np.testing.assert_array_equal(chunked["score"], expected["score"])
+    np.testing.assert_allclose(chunked["msi"], expected["msi"])
+
+
+def test_harmonic_fits_follow_the_selected_range(rounds):
+    start, stop = 200, 700
+    scores = rounds["score"].to_numpy()[start:stop]
+    chunked = pd.concat(features.iter_feature_chunks(features.frame_chunks(rounds, 128), start=start, stop=stop,
+                                                     scores=scores), ignore_index=True)
+    freq, phase = features.harmonic_fits(scores)["harmonic_fit"]
+    np.testing.assert_allclose(chunked["harmonic_fit"], np.sin(2 * np.pi * freq * np.arange(stop - start) + phase))
+
+
+def test_write_features_streams_every_row(rounds):
+    sink = io.BytesIO()
+    assert features.write_features(features.frame_chunks(rounds, 400), sink, "parquet", start=100, stop=1300) == 1200
+    table = pq.read_table(io.BytesIO(sink.getvalue()))
+    assert table.schema.equals(features.feature_schema())
+    assert table.column("index").to_pylist() == list(range(100, 1300))
+    # Without the range's scores there is no harmonic fit to write
+    assert table.column("harmonic_fit").null_count == 1200
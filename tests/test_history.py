@@ -0,0 +1,67 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+from synth import generate_rounds
+
+
+@pytest.fixture(scope="module")
+def rounds():
+    return generate_rounds(3000, seed=21)[["timestamp", "multiplier", "score"]]
+
+
+def small_history(**kwargs):
+    return app.RoundHistory(**{"capacity": 100, "bucket_size": 10, "fanout": 4, "max_buckets": 6,
+                               "num_tiers": 3, **kwargs})
+
+
+def test_ring_keeps_the_newest_rounds(rounds):
+    history = small_history()
+    for r in rounds.iloc[:250].itertuples():
+        history.append(r.timestamp, r.multiplier, r.score)
+    assert (history.total, history.start) == (250, 150)
+    frame = history.frame()
+    assert np.array_equal(frame["multiplier"], rounds["multiplier"].iloc[150:250])
+    assert np.array_equal(frame["timestamp"], rounds["timestamp"].iloc[150:250])
+
+
+def test_archive_tiers_account_for_every_dropped_round(rounds):
+    history = small_history()
+    history.extend(rounds["timestamp"], rounds["multiplier"], rounds["score"])
+    archive = history.archive_frame()
+    dropped = rounds["score"].iloc[:history.start]
+    assert archive["rounds"].sum() == history.start == len(rounds) - 100
+    assert archive["pink"].sum() == (dropped >= 2).sum()
+    assert archive["purple"].sum() == ((dropped > 0) & (dropped < 2)).sum()
+    assert archive["blue"].sum() == (dropped <= 0).sum()
+    # Oldest first, each tier bounded, the coarsest tier holding the merged oldest buckets
+    assert (archive["start"].diff().dropna() >= pd.Timedelta(0)).all()
+    assert all(len(tier) <= history.max_buckets for tier in history.tiers)
+    assert archive["tier"].iloc[0] == 2 and archive["rounds"].iloc[0] > 10 * 4
+    msi = pd.Series(rounds["score"]).rolling(20).sum().iloc[:history.start]
+    assert archive["msi_min"].min() == msi.min() and archive["msi_max"].max() == msi.max()
+    assert archive["msi_sum"].sum() == pytest.approx(msi.sum())
+
+
+def test_extend_matches_appending_one_by_one(rounds):
+    bulk, single = small_history(), small_history()
+    bulk.extend(rounds["timestamp"].iloc[:37], rounds["multiplier"].iloc[:37], rounds["score"].iloc[:37])
+    bulk.extend(rounds["timestamp"].iloc[37:], rounds["multiplier"].iloc[37:], rounds["score"].iloc[37:])
+    for r in rounds.itertuples():
+        single.append(r.timestamp, r.multiplier, r.score)
+    pd.testing.assert_frame_equal(bulk.frame(), single.frame())
+    pd.testing.assert_frame_equal(bulk.archive_frame(), single.archive_frame())
+
+
+def test_pop_and_resize(rounds):
+    history = small_history()
+    history.extend(rounds["timestamp"].iloc[:300], rounds["multiplier"].iloc[:300], rounds["score"].iloc[:300])
+    assert history.pop(120) == 100
+    assert (history.total, history.size) == (200, 0)
+    history.extend(rounds["timestamp"].iloc[200:300], rounds["multiplier"].iloc[200:300],
+                   rounds["score"].iloc[200:300])
+    history.resize(40)
+    assert (history.start, history.capacity) == (260, 40)
+    assert np.array_equal(history.frame()["multiplier"], rounds["multiplier"].iloc[260:300])
+    assert history.archive_frame()["rounds"].sum() == 260
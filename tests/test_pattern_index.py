@@ -0,0 +1,84 @@
+import glob
+import os
+
+import numpy as np
+import pytest
+
+import app
+
+
+def entries(n, window=8, seed=0, first=0):
+    rng = np.random.default_rng(seed)
+    return (rng.random((n, window // 2 + 1)), rng.integers(0, 3, (n, window)), rng.integers(0, 3, (n, 3)),
+            np.arange(first, first + n).astype("datetime64[s]"))
+
+
+def make_index(path, **kwargs):
+    kwargs = {"flush_every": 10**9, "flush_interval": 10**9, **kwargs}
+    return app.PatternIndex(str(path), 8, **kwargs)
+
+
+def test_pending_entries_merge_and_readding_is_a_no_op(tmp_path):
+    index = make_index(tmp_path, merge_every=100)
+    sig, codes, nxt, ts = entries(250)
+    for i in range(0, 250, 25):
+        index.add(sig[i:i + 25], codes[i:i + 25], nxt[i:i + 25], ts[i:i + 25])
+    assert len(index) == 250
+    assert len(index.signatures) == 200 and len(index.entry_ids) == 200
+    assert len(index.pending_ids) == 50
+    assert np.all(np.diff(index.entry_ids.astype(np.float64)) > 0)
+
+    index.add(sig[:150], codes[:150], nxt[:150], ts[:150])
+    assert len(index) == 250
+    index.add(*entries(10, seed=1, first=1000))
+    assert len(index) == 260
+
+
+def test_segments_reload_and_compact(tmp_path):
+    index = make_index(tmp_path, flush_every=10)
+    sig, codes, nxt, ts = entries(700)
+    for i in range(0, 700, 10):
+        index.add(sig[i:i + 10], codes[i:i + 10], nxt[i:i + 10], ts[i:i + 10])
+    index.add(sig[:5], codes[:5], nxt[:5], ts[:5])
+    index.flush()
+    # Windows another process archived as well are dropped when loading
+    index._write_segment(index.pending[:1])
+    assert len(glob.glob(os.path.join(tmp_path, "seg_*.npz"))) == 71
+
+    reloaded = make_index(tmp_path)
+    assert len(reloaded) == 700 and not reloaded.pending
+    assert len(glob.glob(os.path.join(tmp_path, "seg_*.npz"))) == 1
+    assert np.array_equal(np.sort(reloaded.timestamps), ts.astype("datetime64[ns]"))
+    assert len(make_index(tmp_path)) == 700
+
+
+@pytest.mark.parametrize("merge_every", [10**9, 100])
+def test_query_finds_the_stored_window(tmp_path, merge_every):
+    index = make_index(tmp_path, merge_every=merge_every)
+    sig, codes, nxt, ts = entries(5000, seed=2)
+    index.add(sig, codes, nxt, ts)
+    for i in (0, 1234, 4999):
+        matches = index.query(sig[i], codes[i], k=5)
+        assert len(matches) == 5
+        assert matches[0]["score"] == pytest.approx(1.0)
+        assert matches[0]["ended"] == ts[i]
+        assert [m["score"] for m in matches] == sorted((m["score"] for m in matches), reverse=True)
+
+
+def test_query_widens_the_probe_instead_of_scanning(tmp_path, monkeypatch):
+    index = make_index(tmp_path, merge_every=100)
+    sig, codes, nxt, ts = entries(3000, seed=3)
+    index.add(sig, codes, nxt, ts)
+    probed = []
+    candidates = index._candidates
+
+    def spy(sorted_keys, key_order, qkeys, flips):
+        found = candidates(sorted_keys, key_order, qkeys, flips)
+        probed.append((len(flips), len(found)))
+        return found
+
+    monkeypatch.setattr(index, "_candidates", spy)
+    q = np.random.default_rng(4).random(5)
+    assert len(index.query(q, codes[0], k=500)) == 500
+    assert probed[0][0] == 1 and probed[0][1] < 500 <= probed[-1][1]
+    assert all(found < len(index) for _, found in probed)
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import app
+from synth import REGIMES, generate_rounds
+
+
+def run(detector, values):
+    return [(i, d) for i, d in enumerate(detector.update(float(x)) for x in values) if d is not None]
+
+
+@pytest.mark.parametrize("direction", [1, -1])
+def test_cusum_locates_a_mean_shift(direction):
+    rng = np.random.default_rng(5)
+    values = np.r_[rng.normal(0, 1, 400), rng.normal(2 * direction, 1, 400)]
+    detector = app.CusumDetector(drift=0.5, threshold=12.0)
+    alarms = run(detector, values)
+    assert alarms and alarms[0][1] == direction and 400 <= alarms[0][0] < 420
+    start, side = detector.changes[0]
+    assert side == direction and abs(start - 400) <= 5
+    # The segment after the change becomes the new reference
+    assert detector.segment_mean == pytest.approx(2 * direction, abs=0.3)
+
+
+def test_cusum_is_quiet_on_a_stationary_series():
+    values = np.random.default_rng(6).normal(0, 1, 5000)
+    assert run(app.CusumDetector(drift=0.5, threshold=12.0), values) == []
+
+
+def test_cusum_skips_missing_values_but_counts_them():
+    detector = app.CusumDetector(warmup=3)
+    for x in [np.nan, np.nan, 1.0, 2.0, 3.0]:
+        detector.update(x)
+    assert detector.n_seen == 5 and detector.n == 3
+    assert detector.segment_mean == pytest.approx(2.0)
+
+
+def test_regime_tracker_stays_quiet_without_switching():
+    rounds = generate_rounds(4000, seed=3, regimes={"normal": REGIMES["normal"]})
+    scores = rounds["score"].to_numpy(dtype=float)
+    msi = np.r_[np.full(19, np.nan), np.convolve(scores, np.ones(20), "valid")]
+    tracker = app.RegimeTracker()
+    tracker.extend(scores, msi)
+    state = tracker.state()
+    assert tracker.n_seen == 4000
+    # About 0.5 alarms per 1000 rounds on each stream (see the RegimeTracker docstring)
+    assert len(state["score_changes"]) <= 6 and len(state["msi_changes"]) <= 6
+    assert state["label"] in app.REGIME_LABELS
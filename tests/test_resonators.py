@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from numpy.fft import rfft, rfftfreq
+
+import app
+from features import micro_band_peak
+from synth import generate_rounds
+
+
+@pytest.fixture(scope="module")
+def scores():
+    return generate_rounds(3000, seed=4)["score"].to_numpy(dtype=float)
+
+
+def dft(window, freqs):
+    centred = window - window.mean()
+    return np.exp(-2j * np.pi * np.outer(freqs, np.arange(len(window)))) @ centred
+
+
+def slid_bank(scores, length, step=1):
+    """Bank fed ``step`` rounds at a time, keeping the last ``length`` rounds like the history ring."""
+    bank = app.ResonatorBank()
+    for i in range(0, len(scores), step):
+        bank.extend(scores[i:i + step])
+        bank.evict_to(bank.n_seen - length)
+    return bank
+
+
+@pytest.mark.parametrize("step", [1, 37])
+def test_micro_grid_matches_a_direct_dft(scores, step):
+    bank = slid_bank(scores, 500, step)
+    window = scores[-500:]
+    np.testing.assert_allclose(bank.spectrum()[:len(bank.micro_freqs)], dft(window, bank.micro_freqs), atol=1e-8)
+    assert bank.micro_peak()[0] == bank.micro_freqs[np.argmax(np.abs(dft(window, bank.micro_freqs)))]
+
+
+def test_tracked_frequencies_match_a_direct_dft(scores):
+    bank = slid_bank(scores[:2000], 400)
+    bank.track([1 / 7, 1 / 23])
+    for chunk in np.array_split(scores[2000:], 9):
+        bank.extend(chunk)
+        bank.evict_to(bank.n_seen - 400)
+    window = scores[-400:]
+    for freq in (1 / 7, 1 / 23):
+        expected = dft(window, [freq])[0]
+        assert bank.at(freq) == pytest.approx((abs(expected), np.angle(expected)), abs=1e-8)
+
+
+def test_rfft_bins_match_rfft_once_the_window_is_full(scores):
+    length = 1000
+    bank = slid_bank(scores[:600], length)
+    bank.track_bins(length)
+    assert bank.rfft_bins() is None
+    bank = slid_bank(scores[:1800], length)
+    bank.track_bins(length)
+    for i in range(1800, 2400, 50):
+        bank.extend(scores[i:i + 50])
+        bank.evict_to(bank.n_seen - length)
+    window = scores[2400 - length:2400]
+    xf, yf = bank.rfft_bins()
+    np.testing.assert_allclose(xf, rfftfreq(length))
+    np.testing.assert_allclose(yf[1:], rfft(window - window.mean())[1:], atol=1e-8)
+    assert app.dominant_cycle_of(xf, yf) == app.detect_dominant_cycle(window)
+
+
+def test_micro_peak_agrees_with_the_rfft_path_at_full_resolution():
+    # At 5000 rounds the 0.0002 grid is the rfft bin spacing; shorter windows may pick between bins
+    window = generate_rounds(5000, seed=6)["score"].to_numpy(dtype=float)
+    bank = slid_bank(window, 5000, step=500)
+    yf, xf = rfft(window - window.mean()), rfftfreq(len(window))
+    peak = micro_band_peak(yf, xf)
+    freq, phase, amplitude = bank.micro_peak()
+    assert freq == pytest.approx(xf[peak])
+    assert (phase, amplitude) == pytest.approx((np.angle(yf[peak]), abs(yf[peak])), abs=1e-6)
@@ -0,0 +1,76 @@
+import pickle
+
+import numpy as np
+import pandas as pd
+
+import app
+
+
+def signals(score=1, msi=4.0, last_round="2026-01-01"):
+    return {
+        "hud": {"score": score, "banner": app.HUD_BANNERS[1], "reasons": [app.HUD_REASONS[0], app.HUD_REASONS[3]]},
+        "fractal_forecasts": {5: "p B", 8: "P p"},
+        "regime": {"label": app.REGIME_LABELS[2]},
+        "last_round": last_round,
+        "msi": msi,
+        "tpi": 0.25,
+        "rrqi": -0.1,
+        "next_round": {"classification": app.NEXT_ROUND_LABELS[3]},
+        "resonance_prediction": "DOWN",
+        "anchor_forecast": "B",
+    }
+
+
+def test_record_size_matches_the_docstring():
+    assert app.SIGNAL_LOG_DTYPE.itemsize == 37
+    assert "37 bytes" in app.SignalLog.__doc__
+
+
+def test_records_round_trip_through_the_frame():
+    log = app.SignalLog()
+    log.append(10, signals())
+    log.append(11, signals(score=-2, msi=None, last_round="2026-01-01 00:00:20"))
+    frame = log.frame()
+    assert frame["index"].tolist() == [10, 11]
+    row = frame.iloc[0]
+    assert row["hud_score"] == 1 and row["banner"] == app.HUD_BANNERS[1]
+    assert row["reasons"] == 0b1001
+    assert (row["msi"], row["tpi"]) == (np.float32(4.0), np.float32(0.25))
+    assert row["next_round"] == app.NEXT_ROUND_LABELS[3] and row["resonance"] == -1
+    assert (row["fractal"], row["anchor"], row["regime"]) == ("P", "B", app.REGIME_LABELS[2])
+    assert frame["timestamp"].iloc[1] == pd.Timestamp("2026-01-01 00:00:20")
+    assert np.isnan(frame["msi"].iloc[1])
+
+
+def test_grows_and_keeps_only_the_newest_records():
+    log = app.SignalLog(max_records=3000)
+    for index in range(5000):
+        log.append(index, signals(score=index % 7 - 3))
+    frame = log.frame()
+    assert len(log.records) <= log.max_records + 1024
+    assert frame["index"].iloc[-1] == 4999 and len(frame) >= log.max_records
+    assert np.array_equal(frame["index"], np.arange(5000 - len(frame), 5000))
+
+
+def test_an_older_index_truncates_the_log():
+    log = app.SignalLog()
+    for index in range(0, 100, 3):
+        log.append(index, signals())
+    # A recompute after an undo rewrites history from that index on
+    log.append(50, signals(score=3))
+    frame = log.frame()
+    assert frame["index"].tolist() == list(range(0, 50, 3)) + [50]
+    assert frame["hud_score"].iloc[-1] == 3
+    log.append(51, signals())
+    assert log.frame()["index"].iloc[-2:].tolist() == [50, 51]
+
+
+def test_pickles_only_the_filled_records():
+    log = app.SignalLog()
+    for index in range(5):
+        log.append(index, signals())
+    restored = pickle.loads(pickle.dumps(log))
+    assert len(restored.records) == 5
+    pd.testing.assert_frame_equal(restored.frame(), log.frame())
+    restored.append(5, signals())
+    assert restored.frame()["index"].tolist() == list(range(6))
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import app
+from synth import generate_rounds, score_multipliers
+
+
+@pytest.fixture(scope="module")
+def multipliers():
+    return generate_rounds(400, seed=11)["multiplier"].to_numpy()
+
+
+def round_frame(multipliers, pink_threshold):
+    df = pd.DataFrame({"multiplier": multipliers,
+                       "score": score_multipliers(multipliers, pink_threshold).astype(float)})
+    df["type"] = np.select([df["multiplier"] >= pink_threshold, df["multiplier"] >= 2], ["Pink", "Purple"], "Blue")
+    return df
+
+
+def test_latest_values_match_per_window_indicators(multipliers):
+    window_sizes, thresholds = [5, 10, 20, 45], [5.0, 10.0, 20.0]
+    result = app.parameter_sweep(multipliers, window_sizes, thresholds)
+    assert result["hit_rate"].shape == (len(thresholds), len(window_sizes))
+    for ti, thr in enumerate(thresholds):
+        df = round_frame(multipliers, thr)
+        for wi, win in enumerate(window_sizes):
+            assert result["latest_msi"][ti, wi] == df["score"].tail(win).sum()
+            assert result["latest_tpi"][ti, wi] == pytest.approx(app.compute_tpi(df, window=win), abs=0.011)
+            assert result["latest_rrqi"][ti, wi] == pytest.approx(app.rrqi(df, 30))
+
+
+def test_signals_match_a_round_by_round_backtest(multipliers):
+    win, thr = 10, 10.0
+    result = app.parameter_sweep(multipliers, [win], [thr])
+    df = round_frame(multipliers, thr)
+    signals = hits = 0
+    for end in range(1, len(df)):
+        recent = df.iloc[:end]
+        msi = recent["score"].tail(win).sum() if end >= win else np.nan
+        tpi = app.calculate_purple_pressure(recent, win) - app.calculate_blue_decay(recent, win)
+        quality = recent["score"].tail(30).sum() / 30
+        points = (int(msi >= 3) - int(msi <= -3) + int(tpi > 0.5) - int(tpi < -0.5)
+                  + int(quality >= 0.3) - int(quality <= -0.2))
+        if points >= 2:
+            signals += 1
+            hits += multipliers[end] >= 2
+    assert signals and result["signals"][0, 0] == signals
+    assert result["hit_rate"][0, 0] == pytest.approx(hits / signals)